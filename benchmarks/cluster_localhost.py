@@ -0,0 +1,201 @@
+"""
+Check coordinator, worker daemon and cluster pool end to end on localhost, with FakeGeckoRemoteObject instead of GeckoCIRCUITS.
+
+Checked are
+ * the results of a sweep against a local GeckoSimulation, also that a job does not inherit the parameters of earlier jobs,
+ * a job of a worker daemon which is lost (no heartbeat) is taken by another daemon,
+ * a job of a crashed instance is released, retried and finished on the restarted instance,
+ * cancelling a sweep removes its pending jobs from the queue and drops the results of its running jobs,
+ * the simulation files are removed from the coordinator when the pools are closed.
+
+Usage: python benchmarks/cluster_localhost.py [--instances 2]
+"""
+# python libraries
+import argparse
+import os
+import pathlib
+import sys
+import tempfile
+import time
+from typing import Callable, List
+
+# own libraries
+import pygeckocircuits2 as pgc
+from pygeckocircuits2.geckoCluster import _connect
+
+SIMFILE = pathlib.Path(__file__).parent.parent / 'examples' / 'remote_geckocircuits_example.ipes'
+AUTHKEY = 'cluster-localhost-check'
+SIMULATION_TIMES = {'timestep': 1e-7, 'simtime': 1e-4}
+WORKER_TIMEOUT = 2
+
+
+class CrashingFakeGeckoRemoteObject(pgc.FakeGeckoRemoteObject):
+    """Fake remote object which kills its process once, at the first simulation with the global parameter crash = 1."""
+
+    marker_file: str
+
+    def __init__(self, marker_file: str) -> None:
+        """
+        Create the fake remote object.
+
+        :param marker_file: file created at the crash, so the following simulations do not crash
+        :type marker_file: str
+        """
+        super().__init__(global_parameters={'f_s': 100e3, 'crash': 0})
+        self.marker_file = marker_file
+
+    def runSimulation(self) -> None:
+        """Run the simulation, or kill the process like a crash of the JVM."""
+        if self.global_parameters['$crash'] == 1 and not os.path.exists(self.marker_file):
+            pathlib.Path(self.marker_file).touch()
+            os._exit(1)
+        super().runSimulation()
+
+
+def expected_values(point: dict) -> dict:
+    """
+    Simulate an operating point locally.
+
+    :param point: operating point
+    :type point: dict
+    :return: values of 'v_in' and 'i_L'
+    :rtype: dict
+    """
+    simulation = pgc.GeckoSimulation(str(SIMFILE), remote_object=pgc.FakeGeckoRemoteObject(), interactive=False, **SIMULATION_TIMES)
+    simulation.set_global_parameters(point.get('global_parameters', {}))
+    simulation.run_simulation()
+    return simulation.get_values(['v_in', 'i_L'], ['mean', 'rms'])
+
+
+def check_lost_worker(address: tuple, start_daemon: Callable) -> str:
+    """
+    Let a worker take a job without sending heartbeats, then start the daemon which must finish the job.
+
+    :param address: address of the coordinator
+    :type address: tuple
+    :param start_daemon: function which starts the worker daemon
+    :type start_daemon: Callable
+    :return: error description, empty if the check passed
+    :rtype: str
+    """
+    board = _connect(address, AUTHKEY)
+    with open(SIMFILE, 'rb') as file:
+        key = board.put_file(file.read())
+    job_id = board.submit({'file': key, 'parameters': {}, 'nodes': ['v_in'], 'operations': ['mean'], 'range_start_stop': None,
+                           'scope_nodes': None, 'scope_dtype': 'float32', 'simulation_times': SIMULATION_TIMES})
+    board.release_file(key)
+    if board.take('lost-worker', 1) is None:
+        return 'the job was not given to the first worker'
+    start_daemon()
+    deadline = time.monotonic() + 10 * WORKER_TIMEOUT
+    results = {}
+    while job_id not in results and time.monotonic() < deadline:
+        results.update(board.wait_results([job_id]))
+    if job_id not in results:
+        return 'the job of the lost worker was not finished'
+    if results[job_id]['error'] is not None or results[job_id]['attempts'] != 2:
+        return f'unexpected result {results[job_id]}'
+    return ''
+
+
+def check_results(pool: pgc.GeckoClusterPool) -> str:
+    """
+    Run a sweep and compare the results to local simulations. Every second point sets no parameters.
+
+    :param pool: cluster pool
+    :type pool: pgc.GeckoClusterPool
+    :return: error description, empty if the check passed
+    :rtype: str
+    """
+    points = [{'global_parameters': {'f_s': 1e3 * (index + 1)}} if index % 2 else {} for index in range(12)]
+    for result in pool.run(points, ['v_in', 'i_L'], ['mean', 'rms']):
+        if result['error'] is not None:
+            return f"operating point {result['index']} failed: {result['error']}"
+        if result['values'] != expected_values(points[result['index']]):
+            return f"operating point {result['index']}: {result['values']} instead of {expected_values(points[result['index']])}"
+    return ''
+
+
+def check_crash(pool: pgc.GeckoClusterPool) -> str:
+    """
+    Crash an instance during a job, the job must be retried and finish.
+
+    :param pool: cluster pool
+    :type pool: pgc.GeckoClusterPool
+    :return: error description, empty if the check passed
+    :rtype: str
+    """
+    result = next(pool.run([{'global_parameters': {'crash': 1}}], ['v_in'], ['mean']))
+    if result['error'] is not None:
+        return f"the job failed: {result['error']}"
+    if result['attempts'] != 2:
+        return f"the job took {result['attempts']} attempts instead of 2"
+    return ''
+
+
+def check_cancel(pool: pgc.GeckoClusterPool) -> str:
+    """
+    Stop a sweep after the first result, its pending jobs must be removed and the results of its running jobs dropped.
+
+    :param pool: cluster pool
+    :type pool: pgc.GeckoClusterPool
+    :return: error description, empty if the check passed
+    :rtype: str
+    """
+    results = pool.run([{'global_parameters': {'f_s': 1e3 * (index + 1)}} for index in range(50)], ['v_in'], ['mean'])
+    next(results)
+    results.close()
+    status = pool.status()
+    if status['pending']:
+        return f"{status['pending']} jobs are still pending"
+    deadline = time.monotonic() + 10 * WORKER_TIMEOUT
+    while status['running'] and time.monotonic() < deadline:
+        time.sleep(0.1)
+        status = pool.status()
+    return f"{status['finished']} results of cancelled jobs are kept" if status['finished'] else ''
+
+
+def main() -> int:
+    """
+    Start a coordinator and a worker daemon on localhost and run all checks.
+
+    :return: exit code, 0 if all checks passed
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--instances', type=int, default=2, help='number of instances of the worker daemon')
+    args = parser.parse_args()
+
+    failures: List[str] = []
+    with tempfile.TemporaryDirectory() as directory, \
+            pgc.GeckoCoordinator(('127.0.0.1', 0), authkey=AUTHKEY, worker_timeout=WORKER_TIMEOUT) as coordinator:
+        daemon = pgc.GeckoWorkerDaemon(coordinator.address, authkey=AUTHKEY, instances=args.instances, heartbeat_interval=0.5,
+                                       cache_directory=directory, interactive=False,
+                                       remote_object=CrashingFakeGeckoRemoteObject(os.path.join(directory, 'crashed')))
+        try:
+            checks = [('lost worker', lambda: check_lost_worker(coordinator.address, daemon.start))]
+            with pgc.GeckoClusterPool(str(SIMFILE), coordinator.address, authkey=AUTHKEY, **SIMULATION_TIMES) as pool:
+                checks += [('results', lambda: check_results(pool)), ('crash', lambda: check_crash(pool)),
+                           ('cancel', lambda: check_cancel(pool))]
+                for name, check in checks:
+                    start = time.perf_counter()
+                    error = check()
+                    print(f'{name:15} {"FAILED: " + error if error else "passed"} ({time.perf_counter() - start:.1f} s)')
+                    if error:
+                        failures.append(name)
+            files = _connect(coordinator.address, AUTHKEY).status()['files']
+            if files:
+                failures.append('files')
+                print(f'FAILED: {files} simulation files are kept after closing the pool')
+        finally:
+            daemon.stop()
+        restarts = daemon.get_restart_statistics()
+        print(f'restarts: {restarts}')
+        if restarts.get('crash') != 1:
+            failures.append('restarts')
+            print('FAILED: expected exactly one restart after a crash')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
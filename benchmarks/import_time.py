@@ -0,0 +1,67 @@
+"""
+Check the import time of pygeckocircuits2 against a budget.
+
+Sweep workers are spawned as fresh python processes, so every worker pays the import time of the package again.
+Importing pygeckocircuits2 must not import pandas or jnius (both are imported where they are needed), and must stay
+within the budget. Measured on a development machine: about 0.18 s, thereof 0.10 s for numpy. Before pandas was imported lazily,
+the import took about 0.45 s.
+
+Usage: python benchmarks/import_time.py [--budget 0.4] [--repeat 5]
+"""
+# python libraries
+import argparse
+import subprocess
+import sys
+
+# modules that must not be imported by 'import pygeckocircuits2'
+FORBIDDEN_MODULES = ('pandas', 'jnius')
+
+MEASURE_SCRIPT = f"""
+import sys
+import time
+start = time.perf_counter()
+import pygeckocircuits2
+print(time.perf_counter() - start)
+print(','.join(module for module in {FORBIDDEN_MODULES!r} if module in sys.modules))
+"""
+
+
+def measure_import_time() -> tuple:
+    """
+    Import pygeckocircuits2 in a fresh python process.
+
+    :return: import time in seconds, list of imported forbidden modules
+    :rtype: tuple
+    """
+    output = subprocess.run([sys.executable, '-c', MEASURE_SCRIPT], capture_output=True, text=True, check=True).stdout
+    duration, modules = output.splitlines()
+    return float(duration), [module for module in modules.split(',') if module]
+
+
+def main() -> int:
+    """
+    Measure the import time several times and compare the fastest one to the budget.
+
+    :return: exit code, 0 if the budget is kept
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--budget', type=float, default=0.4, help='maximum import time in seconds')
+    parser.add_argument('--repeat', type=int, default=5, help='number of measurements, the fastest one counts')
+    args = parser.parse_args()
+
+    measurements = [measure_import_time() for _ in range(args.repeat)]
+    duration = min(duration for duration, _ in measurements)
+    forbidden_modules = measurements[0][1]
+    print(f'import pygeckocircuits2: {duration:.3f} s (budget {args.budget:.3f} s)')
+    if forbidden_modules:
+        print(f'FAILED: import pygeckocircuits2 imports {", ".join(forbidden_modules)}')
+        return 1
+    if duration > args.budget:
+        print('FAILED: import time exceeds the budget')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,258 @@
+"""
+Benchmark the hot paths of GeckoSimulation against FakeGeckoRemoteObject, so no GeckoCIRCUITS or java is needed.
+
+Measured are
+ * the overhead of the wrapper per call, compared to calling the remote object directly,
+ * the throughput of the scope data extraction (get_scope_arrays) in MB/s,
+ * the time of get_values() and get_values_local() over the number of nodes x operations.
+
+The fake remote object answers immediately (unless --latency is given), so the times are dominated by the wrapper and
+by the python side of the data transfer. The fake calculates the getSignal* results (mean, rms, ...) with the same numpy
+code as get_values_local(), so get_values() versus get_values_local() only compares the number of calls and the wrapper
+around them, not the JNI path and the evaluation in GeckoCIRCUITS. Use --latency to emulate the cost of a JNI call.
+
+With --baseline, the results are compared to a json file of earlier results: times may grow and the throughput may drop
+by the factor --tolerance at most. As the baseline may come from another machine, every result is first divided by a
+reference measured in the same run: call overheads by the time of a raw call of the fake remote object, all other values
+by the time to convert a python list of floats to a numpy array, the main work of the scope data transfer. --save writes
+the results including the references as new baseline.
+
+Usage: python benchmarks/wrapper_benchmark.py [--baseline benchmarks/wrapper_baseline.json] [--tolerance 3] [--save results.json]
+"""
+# python libraries
+import argparse
+import functools
+import json
+import pathlib
+import sys
+import time
+from typing import Callable, Dict
+
+# 3rd party libraries
+import numpy as np
+
+# own libraries
+import pygeckocircuits2 as pgc
+
+SIMFILE = pathlib.Path(__file__).parent.parent / 'examples' / 'remote_geckocircuits_example.ipes'
+NODE_COUNTS = (1, 4, 16)
+OPERATION_COUNTS = (1, 4, 7)
+# overheads below this value in µs are within the measurement noise
+MIN_OVERHEAD_US = 1
+
+
+def best_time(function: Callable, number: int, repeat: int) -> float:
+    """
+    Return the fastest time per call of several measurements, each calling the function number times.
+
+    :param function: function without arguments
+    :type function: Callable
+    :param number: calls per measurement
+    :type number: int
+    :param repeat: number of measurements
+    :type repeat: int
+    :return: time per call in seconds
+    :rtype: float
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        durations.append((time.perf_counter() - start) / number)
+    return min(durations)
+
+
+def create_simulation(nodes: list, simtime: float, latency: float) -> pgc.GeckoSimulation:
+    """
+    Create a GeckoSimulation with a fake remote object and run it.
+
+    :param nodes: names of the scope nodes
+    :type nodes: list
+    :param simtime: simulation time, at a time step of 1e-7 s
+    :type simtime: float
+    :param latency: latency of every call of the fake remote object in seconds
+    :type latency: float
+    :return: simulation with data
+    :rtype: pgc.GeckoSimulation
+    """
+    fake = pgc.FakeGeckoRemoteObject(nodes=nodes, latency=latency)
+    simulation = pgc.GeckoSimulation(str(SIMFILE), remote_object=fake, timestep=1e-7, simtime=simtime, interactive=False)
+    simulation.run_simulation()
+    return simulation
+
+
+def benchmark_references(latency: float, repeat: int, points: int) -> Dict[str, float]:
+    """
+    Measure the references of this machine, which the results are divided by before they are compared to the baseline.
+
+    :param latency: latency of every call of the fake remote object in seconds
+    :type latency: float
+    :param repeat: number of measurements
+    :type repeat: int
+    :param points: number of points per signal
+    :type points: int
+    :return: time of a raw call of the fake remote object in µs and time to convert a list of points floats to a numpy array in ms
+    :rtype: Dict[str, float]
+    """
+    fake = pgc.FakeGeckoRemoteObject(latency=latency)
+    values = [float(index) for index in range(points)]
+    return {'reference_call_us': best_time(functools.partial(fake.getGlobalParameterValue, '$f_s'), 2000, repeat) * 1e6,
+            'reference_list_to_array_ms': best_time(functools.partial(np.asarray, values, dtype=np.float64), 1, repeat) * 1e3}
+
+
+def benchmark_call_overhead(latency: float, repeat: int) -> Dict[str, float]:
+    """
+    Measure the wrapper overhead of setting and getting a global parameter.
+
+    :param latency: latency of every call of the fake remote object in seconds
+    :type latency: float
+    :param repeat: number of measurements
+    :type repeat: int
+    :return: overhead per call in µs
+    :rtype: Dict[str, float]
+    """
+    simulation = create_simulation(['v_in'], 1e-5, latency)
+    fake = simulation.ginst
+    number = 2000
+    raw_set = best_time(lambda: fake.setGlobalParameterValue('$f_s', 100e3), number, repeat)
+    raw_get = best_time(lambda: fake.getGlobalParameterValue('$f_s'), number, repeat)
+    wrapped_set = best_time(lambda: simulation.set_global_parameters({'f_s': 100e3}), number, repeat)
+    wrapped_get = best_time(lambda: simulation.get_global_parameters('f_s'), number, repeat)
+    return {'set_global_parameters_overhead_us': (wrapped_set - raw_set) * 1e6,
+            'get_global_parameters_overhead_us': (wrapped_get - raw_get) * 1e6}
+
+
+def benchmark_scope_extraction(latency: float, repeat: int, points: int) -> Dict[str, float]:
+    """
+    Measure the throughput of get_scope_arrays(), counting 8 bytes per value of the signals and the time vector.
+
+    :param latency: latency of every call of the fake remote object in seconds
+    :type latency: float
+    :param repeat: number of measurements
+    :type repeat: int
+    :param points: number of points per signal
+    :type points: int
+    :return: throughput in MB/s
+    :rtype: Dict[str, float]
+    """
+    nodes = ['v_in', 'i_L', 'v_C', 'i_C']
+    simulation = create_simulation(nodes, points * 1e-7, latency)
+    duration = best_time(lambda: simulation.get_scope_arrays(nodes), 1, repeat)
+    megabytes = 8 * (len(nodes) + 1) * points / 1e6
+    return {'scope_extraction_mb_per_s': megabytes / duration}
+
+
+def benchmark_get_values(latency: float, repeat: int, points: int) -> Dict[str, float]:
+    """
+    Measure get_values() and get_values_local() for every combination of NODE_COUNTS and OPERATION_COUNTS.
+
+    :param latency: latency of every call of the fake remote object in seconds
+    :type latency: float
+    :param repeat: number of measurements
+    :type repeat: int
+    :param points: number of points per signal
+    :type points: int
+    :return: time per call in ms, by method and nodes x operations
+    :rtype: Dict[str, float]
+    """
+    operations = list(pgc.OPERATIONS)
+    simulation = create_simulation([f'node_{index}' for index in range(max(NODE_COUNTS))], points * 1e-7, latency)
+    results = {}
+    for node_count in NODE_COUNTS:
+        nodes = [f'node_{index}' for index in range(node_count)]
+        for operation_count in OPERATION_COUNTS:
+            for method in (simulation.get_values, simulation.get_values_local):
+                duration = best_time(functools.partial(method, nodes, operations[:operation_count]), 1, repeat)
+                results[f'{method.__name__}_{node_count}x{operation_count}_ms'] = duration * 1e3
+    return results
+
+
+def normalize(results: Dict[str, float]) -> Dict[str, float]:
+    """
+    Divide the results by the references measured in the same run, see module description.
+
+    Overheads are raised to MIN_OVERHEAD_US before, so differences within the measurement noise are not compared.
+
+    :param results: measured values including the references
+    :type results: Dict[str, float]
+    :return: normalized values without the references
+    :rtype: Dict[str, float]
+    """
+    normalized = {}
+    for name, value in results.items():
+        if name.startswith('reference_'):
+            continue
+        if name.endswith('_us'):
+            normalized[name] = max(value, MIN_OVERHEAD_US) / results['reference_call_us']
+        elif name.endswith('_per_s'):
+            normalized[name] = value * results['reference_list_to_array_ms']
+        else:
+            normalized[name] = value / results['reference_list_to_array_ms']
+    return normalized
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], tolerance: float) -> list:
+    """
+    Compare the normalized results to the normalized baseline. Throughputs (_per_s) must not drop, all other values must not grow by more than the tolerance.
+
+    :param results: measured values including the references
+    :type results: Dict[str, float]
+    :param baseline: values of an earlier measurement including the references
+    :type baseline: Dict[str, float]
+    :param tolerance: allowed factor
+    :type tolerance: float
+    :return: descriptions of the regressions
+    :rtype: list
+    """
+    regressions = []
+    normalized_results = normalize(results)
+    for name, reference in normalize(baseline).items():
+        if name not in normalized_results:
+            continue
+        value = normalized_results[name]
+        if name.endswith('_per_s'):
+            if value * tolerance < reference:
+                regressions.append(f'{name}: {value:.3g} < {reference:.3g} / {tolerance} (normalized)')
+        elif value > reference * tolerance:
+            regressions.append(f'{name}: {value:.3g} > {reference:.3g} * {tolerance} (normalized)')
+    return regressions
+
+
+def main() -> int:
+    """
+    Run all benchmarks, print the results and compare them to the baseline.
+
+    :return: exit code, 0 if there is no regression
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--latency', type=float, default=0, help='latency of every call of the fake remote object in seconds')
+    parser.add_argument('--repeat', type=int, default=5, help='number of measurements, the fastest one counts')
+    parser.add_argument('--points', type=int, default=1000000, help='points per signal for the scope extraction')
+    parser.add_argument('--baseline', help='json file with earlier results to compare to')
+    parser.add_argument('--tolerance', type=float, default=3, help='allowed factor compared to the baseline')
+    parser.add_argument('--save', help='json file to write the results to')
+    args = parser.parse_args()
+
+    results = benchmark_references(args.latency, args.repeat, args.points)
+    results.update(benchmark_call_overhead(args.latency, args.repeat))
+    results.update(benchmark_scope_extraction(args.latency, args.repeat, args.points))
+    results.update(benchmark_get_values(args.latency, args.repeat, args.points // 100))
+    for name, value in results.items():
+        print(f'{name:45} {value:12.3f}')
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as file:
+            json.dump({name: float(f'{value:.4g}') for name, value in results.items()}, file, indent=2)
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f'FAILED: {regression}')
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,2 +1,16 @@
 """Package init file."""
 from pygeckocircuits2.geckoCircuitsRemote import *
+from pygeckocircuits2.geckoSweep import *
+from pygeckocircuits2.doeRunner import *
+from pygeckocircuits2.geckoWorker import *
+from pygeckocircuits2.geckoWatchdog import *
+from pygeckocircuits2.geckoCluster import *
+from pygeckocircuits2.asyncGecko import *
+from pygeckocircuits2.fakeGecko import *
+from pygeckocircuits2.instrumentation import *
+from pygeckocircuits2.ipesFile import *
+from pygeckocircuits2.resultCache import *
+from pygeckocircuits2.resultStore import *
+from pygeckocircuits2.sclFile import *
+from pygeckocircuits2.scopeData import *
+from pygeckocircuits2.signalAnalysis import *
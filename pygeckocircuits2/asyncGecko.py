@@ -0,0 +1,265 @@
+"""Control GeckoCIRCUITS from asyncio code without blocking the event loop."""
+# python libraries
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Union, TYPE_CHECKING
+import logging
+
+# own libraries
+from pygeckocircuits2.geckoWorker import GeckoWorker
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncGeckoSimulation:
+    """
+    Awaitable front-end of a GeckoSimulation, which runs in a dedicated worker process (see GeckoWorker).
+
+    The event loop only waits for the pipe of the worker, so one coroutine can drive many instances at once, e.g. by
+    asyncio.gather(). Every instance needs its own geckoport.
+
+    Every call can have a timeout, which also limits the start of GeckoCIRCUITS. If a call or the start times out or is
+    cancelled, the worker process is terminated, as a running simulation can not be interrupted otherwise. The next
+    call starts a new worker with the settings of this object, so parameters set before are lost.
+
+    :Example:
+
+    >>> import asyncio
+    >>> import pygeckocircuits2 as pgc
+    >>> async def simulate(v_in: float, geckoport: int):
+    >>>     async with pgc.AsyncGeckoSimulation('path/to/simfile.ipes', geckoport=geckoport, simtime=0.05, timestep=50e-9) as gecko:
+    >>>         await gecko.set_global_parameters({'V_in': v_in})
+    >>>         await gecko.run_simulation(timeout=600)
+    >>>         return await gecko.get_values(['i_L'], ['mean', 'rms'])
+    >>> async def main():
+    >>>     return await asyncio.gather(*[simulate(v_in, 43036 + i) for i, v_in in enumerate([40, 50, 60])])
+    >>> results = asyncio.run(main())
+    """
+
+    simfilepath: str
+    simulation_kwargs: Dict
+    timeout: Optional[float]
+
+    def __init__(self, simfilepath: str, timeout: float = None, **simulation_kwargs) -> None:
+        """
+        Store the settings. The worker process is started by start() or by the first call.
+
+        :param simfilepath: absolute or relative path to simulation file
+        :type simfilepath: str
+        :param timeout: default timeout in seconds of every call. Default None: no timeout
+        :type timeout: float
+        :param simulation_kwargs: keyword arguments passed to GeckoSimulation (geckoport, timestep, simtime, ...)
+        :type simulation_kwargs: Dict
+        """
+        self.simfilepath = simfilepath
+        self.timeout = timeout
+        self.simulation_kwargs = simulation_kwargs
+        self._worker: Optional[GeckoWorker] = None
+        # one thread per instance waits for the pipe, so the calls of this instance keep their order
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def __aenter__(self) -> 'AsyncGeckoSimulation':
+        """
+        Start the worker when entering the context manager.
+
+        :return: the instance itself
+        :rtype: AsyncGeckoSimulation
+        """
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        """
+        Close the worker when leaving the context manager.
+
+        :param exc_type: type of a raised exception, if any
+        :type exc_type: type
+        :param exc_value: raised exception, if any
+        :type exc_value: Exception
+        :param traceback: traceback of a raised exception, if any
+        :type traceback: traceback
+        """
+        await self.close()
+
+    def _get_lock(self) -> asyncio.Lock:
+        """
+        Return the lock, created in the running event loop.
+
+        :return: lock of the calls of this instance
+        :rtype: asyncio.Lock
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def _wait(self, name: str, function: Callable, timeout: Optional[float]) -> Any:
+        """
+        Run a blocking function of the worker in the thread of this instance. Call with the lock held.
+
+        :param name: name of the call, for the log
+        :type name: str
+        :param function: function which waits for the pipe of the worker
+        :type function: Callable
+        :param timeout: timeout in seconds, None for no timeout
+        :type timeout: float
+        :raises asyncio.TimeoutError: if the function does not finish within the timeout. The worker is terminated.
+        :raises asyncio.CancelledError: if the call is cancelled. The worker is terminated.
+        :return: result of the function
+        :rtype: Any
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, function)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            logger.warning(f'{name} timed out or was cancelled')
+            worker, self._worker = self._worker, None
+            # terminating joins the process, so it runs in the default executor, as the thread of this instance still
+            # waits for the pipe. Terminating the worker ends that wait. Shielded, so a second cancellation does not
+            # leave the worker running.
+            await asyncio.shield(loop.run_in_executor(None, worker.terminate))
+            raise
+
+    async def _start_worker(self, timeout: Optional[float]) -> None:
+        """
+        Start the worker process and wait for GeckoCIRCUITS. Call with the lock held.
+
+        :param timeout: timeout in seconds, None for no timeout
+        :type timeout: float
+        """
+        # starting the process does not wait for GeckoCIRCUITS, so the worker is known before the first await and can
+        # be terminated on a timeout or cancellation
+        self._worker = GeckoWorker(self.simfilepath, wait=False, **self.simulation_kwargs)
+        try:
+            await self._wait('start', self._worker.wait_started, timeout)
+        except Exception:
+            # GeckoCIRCUITS could not open the simulation file, the next call starts a new worker
+            worker, self._worker = self._worker, None
+            if worker is not None:
+                await asyncio.get_running_loop().run_in_executor(None, worker.terminate)
+            raise
+
+    async def start(self, timeout: float = None) -> None:
+        """
+        Start the worker process and GeckoCIRCUITS, if not yet running.
+
+        :param timeout: timeout in seconds. Default None: timeout of the instance
+        :type timeout: float
+        :raises asyncio.TimeoutError: if GeckoCIRCUITS does not start within the timeout. The worker is terminated.
+        """
+        async with self._get_lock():
+            if self._worker is None:
+                await self._start_worker(self.timeout if timeout is None else timeout)
+
+    async def call(self, method: str, *args, timeout: float = None, **kwargs) -> Any:
+        """
+        Call a method of GeckoSimulation in the worker process.
+
+        :param method: name of the GeckoSimulation method, e.g. 'run_simulation'
+        :type method: str
+        :param args: positional arguments of the method
+        :type args: Any
+        :param timeout: timeout in seconds, of the call and of a start of the worker before. Default None: timeout of the instance
+        :type timeout: float
+        :param kwargs: keyword arguments of the method
+        :type kwargs: Any
+        :raises asyncio.TimeoutError: if the call does not finish within the timeout. The worker is terminated.
+        :raises asyncio.CancelledError: if the call is cancelled. The worker is terminated.
+        :return: result of the method
+        :rtype: Any
+        """
+        timeout = self.timeout if timeout is None else timeout
+        async with self._get_lock():
+            if self._worker is None:
+                await self._start_worker(timeout)
+            return await self._wait(method, functools.partial(self._worker.call, method, *args, **kwargs), timeout)
+
+    async def run_simulation(self, *args, timeout: float = None, **kwargs) -> None:
+        """
+        Run the simulation, see GeckoSimulation.run_simulation().
+
+        :param args: positional arguments of GeckoSimulation.run_simulation()
+        :type args: Any
+        :param timeout: timeout in seconds. Default None: timeout of the instance
+        :type timeout: float
+        :param kwargs: keyword arguments of GeckoSimulation.run_simulation()
+        :type kwargs: Any
+        """
+        await self.call('run_simulation', *args, timeout=timeout, **kwargs)
+
+    async def set_global_parameters(self, params_dict: Dict, timeout: float = None) -> None:
+        """
+        Set global parameters, see GeckoSimulation.set_global_parameters().
+
+        :param params_dict: the name of the global parameters and their values
+        :type params_dict: Dict
+        :param timeout: timeout in seconds. Default None: timeout of the instance
+        :type timeout: float
+        """
+        await self.call('set_global_parameters', params_dict, timeout=timeout)
+
+    async def set_component_values(self, component_name: str, component_dict: Dict, timeout: float = None) -> None:
+        """
+        Set component values, see GeckoSimulation.set_component_values().
+
+        :param component_name: name of the selected component
+        :type component_name: str
+        :param component_dict: the key value pairs that need to be set on the selected component
+        :type component_dict: Dict
+        :param timeout: timeout in seconds. Default None: timeout of the instance
+        :type timeout: float
+        """
+        await self.call('set_component_values', component_name, component_dict, timeout=timeout)
+
+    async def get_values(self, nodes: Union[List, str], operations: Union[List, str], range_start_stop: List[Union[float, str]] = None,
+                         timeout: float = None) -> Dict:
+        """
+        Get mean, rms, ... of scope signals, see GeckoSimulation.get_values().
+
+        :param nodes: node names located on the scopes
+        :type nodes: List[str] or str
+        :param operations: Mean/RMS/THD/Ripple/Max/Min/Shape operations on the selected signals
+        :type operations: List or str
+        :param range_start_stop: the range of the data, see GeckoSimulation.get_values()
+        :type range_start_stop: [float, str] or [float, float]
+        :param timeout: timeout in seconds. Default None: timeout of the instance
+        :type timeout: float
+        :return: operation specific dict data
+        :rtype: Dict
+        """
+        return await self.call('get_values', nodes, operations, range_start_stop, timeout=timeout)
+
+    async def get_scope_data(self, node_names: Union[List, str], file_name: str, start_time: float = None, stop_time: float = None,
+                             skip_points: int = 0, timeout: float = None) -> 'pd.DataFrame':
+        """
+        Get the scope data and save it to a csv file, see GeckoSimulation.get_scope_data().
+
+        :param node_names: the name provided to the scope nodes
+        :type node_names: List[str] or str
+        :param file_name: name of the csv file, written by the worker process
+        :type file_name: str
+        :param start_time: the time from where the data needs to be recorded
+        :type start_time: float
+        :param stop_time: the time at which the data recording stops
+        :type stop_time: float
+        :param skip_points: the length of points that needs to be skipped
+        :type skip_points: int
+        :param timeout: timeout in seconds. Default None: timeout of the instance
+        :type timeout: float
+        :return: scope data
+        :rtype: pd.DataFrame
+        """
+        return await self.call('get_scope_data', node_names, file_name, start_time, stop_time, skip_points, timeout=timeout)
+
+    async def close(self) -> None:
+        """Shut down GeckoCIRCUITS and stop the worker process."""
+        async with self._get_lock():
+            if self._worker is not None:
+                await asyncio.get_running_loop().run_in_executor(self._executor, self._worker.close)
+                self._worker = None
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,295 @@
+"""Design of experiments: create grid, Latin hypercube and Sobol designs and run them resumable on a pool of GeckoCIRCUITS instances."""
+# python libraries
+import itertools
+import json
+import os
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple, Union
+import logging
+
+# 3rd party libraries
+import numpy as np
+
+# own libraries
+from pygeckocircuits2.geckoSweep import GeckoSweep
+from pygeckocircuits2.resultCache import file_hash, make_key
+from pygeckocircuits2.resultStore import ResultStore
+
+logger = logging.getLogger(__name__)
+
+
+def grid_design(parameters: Dict[str, List[float]]) -> List[Dict[str, float]]:
+    """
+    Return all combinations of the given parameter values.
+
+    Parameter names without '.' are global parameters (e.g. 'V_in'), names with '.' are component parameters in the
+    format component name and key (e.g. 'L.1.L'), see to_operating_point().
+
+    :param parameters: values by parameter name, e.g. {'V_in': [40, 60], 'L.1.L': [50e-6, 100e-6]}
+    :type parameters: Dict[str, List[float]]
+    :return: design points
+    :rtype: List[Dict[str, float]]
+    """
+    names = list(parameters)
+    return [{name: values[column] for column, name in enumerate(names)} for values in itertools.product(*parameters.values())]
+
+
+def _scale(unit_samples: np.ndarray, bounds: Dict[str, Tuple[float, float]]) -> List[Dict[str, float]]:
+    """
+    Scale samples of the unit hypercube to the parameter bounds.
+
+    :param unit_samples: samples in [0, 1), shape (samples, parameters)
+    :type unit_samples: np.ndarray
+    :param bounds: lower and upper bound by parameter name, in the order of the columns
+    :type bounds: Dict[str, Tuple[float, float]]
+    :return: design points
+    :rtype: List[Dict[str, float]]
+    """
+    lower = np.array([bound[0] for bound in bounds.values()], dtype=np.float64)
+    upper = np.array([bound[1] for bound in bounds.values()], dtype=np.float64)
+    samples = lower + unit_samples * (upper - lower)
+    names = list(bounds)
+    return [{name: float(row[column]) for column, name in enumerate(names)} for row in samples]
+
+
+def latin_hypercube_design(bounds: Dict[str, Tuple[float, float]], samples: int, seed: int = None) -> List[Dict[str, float]]:
+    """
+    Return a Latin hypercube design: every parameter range is split into samples intervals, each one is used exactly once.
+
+    :param bounds: lower and upper bound by parameter name, e.g. {'V_in': (40, 60), 'f_s': (100e3, 500e3)}
+    :type bounds: Dict[str, Tuple[float, float]]
+    :param samples: number of design points
+    :type samples: int
+    :param seed: seed of the random numbers, for a reproducible design
+    :type seed: int
+    :return: design points
+    :rtype: List[Dict[str, float]]
+    """
+    rng = np.random.default_rng(seed)
+    # a random position within every interval, the intervals in random order for every parameter
+    unit_samples = (rng.permuted(np.tile(np.arange(samples), (len(bounds), 1)), axis=1).T + rng.random((samples, len(bounds)))) / samples
+    return _scale(unit_samples, bounds)
+
+
+def sobol_design(bounds: Dict[str, Tuple[float, float]], samples: int, seed: int = None) -> List[Dict[str, float]]:
+    """
+    Return a scrambled Sobol design, a low-discrepancy sequence which fills the parameter space evenly. Needs scipy.
+
+    The balance properties of the sequence hold for a power of 2 as number of samples.
+
+    :param bounds: lower and upper bound by parameter name, e.g. {'V_in': (40, 60), 'f_s': (100e3, 500e3)}
+    :type bounds: Dict[str, Tuple[float, float]]
+    :param samples: number of design points
+    :type samples: int
+    :param seed: seed of the scrambling, for a reproducible design
+    :type seed: int
+    :raises ImportError: if scipy is not installed
+    :return: design points
+    :rtype: List[Dict[str, float]]
+    """
+    from scipy.stats import qmc
+    return _scale(qmc.Sobol(len(bounds), scramble=True, seed=seed).random(samples), bounds)
+
+
+def to_operating_point(design_point: Dict[str, float]) -> Dict:
+    """
+    Convert a design point to an operating point of GeckoSweep.
+
+    :param design_point: values by parameter name, e.g. {'V_in': 60, 'L.1.L': 100e-6}
+    :type design_point: Dict[str, float]
+    :return: operating point, e.g. {'global_parameters': {'V_in': 60}, 'component_values': {'L.1': {'L': 100e-6}}}
+    :rtype: Dict
+    """
+    point = {'global_parameters': {}, 'component_values': {}}
+    for name, value in design_point.items():
+        if '.' in name:
+            component_name, key = name.rsplit('.', 1)
+            point['component_values'].setdefault(component_name, {})[key] = value
+        else:
+            point['global_parameters'][name] = value
+    return point
+
+
+class DoeRunner:
+    """
+    Run a design of experiments on a pool of GeckoCIRCUITS instances, resumable after a crash or reboot.
+
+    Every finished point is written at once to its own json file in the directory, atomically by writing a temporary
+    file and renaming it. A file is named by a hash of the simulation file content, the simulation times, the point and
+    the requested values. So a second run() with the same design, e.g. after the first one was killed, only simulates
+    the missing points, and identical points within a design are simulated only once. Failed points are not stored and
+    are simulated again by the next run().
+
+    If a worker process dies, e.g. by a crash of the JVM, GeckoSweep restarts its pool and returns the point which
+    caused the crash as failed after retries repetitions, so run() continues with the other points. If the whole
+    process dies, e.g. by a reboot, the next run() continues from the stored points.
+
+    Progress and estimated remaining time are logged after every point and passed to an optional callback.
+
+    :Example:
+
+    >>> import pygeckocircuits2 as pgc
+    >>> design = pgc.latin_hypercube_design({'V_in': (40, 60), 'f_s': (100e3, 500e3), 'L.1.L': (50e-6, 200e-6)}, samples=500, seed=1)
+    >>> runner = pgc.DoeRunner('path/to/simfile.ipes', 'path/to/doe', processes=8, simtime=0.05, timestep=50e-9)
+    >>> results = runner.run(design, nodes=['i_L'], operations=['mean', 'rms'])
+    """
+
+    simfilepath: str
+    directory: str
+    processes: Optional[int]
+    geckoport: int
+    simulation_kwargs: Dict
+    recorded_nodes: Optional[Union[List, str]]
+    store: Optional[Union[ResultStore, str]]
+    retries: int
+
+    def __init__(self, simfilepath: str, directory: str, processes: int = None, geckoport: int = 43036, timestep: float = None,
+                 simtime: float = None, timestep_pre: float = 0, simtime_pre: float = 0, recorded_nodes: Union[List, str] = None,
+                 store: Union[ResultStore, str] = None, retries: int = 1) -> None:
+        """
+        Prepare the runner. GeckoCIRCUITS is started by run(), only if there are points to simulate.
+
+        :param simfilepath: absolute or relative path to simulation file
+        :type simfilepath: str
+        :param directory: directory of the finished points, created if it does not exist
+        :type directory: str
+        :param processes: number of parallel GeckoCIRCUITS instances. Defaults to the number of CPU cores
+        :type processes: int
+        :param geckoport: port of the first GeckoCIRCUITS instance, see GeckoSweep
+        :type geckoport: int
+        :param timestep: simulation fix timestep
+        :type timestep: float
+        :param simtime: total simulation time
+        :type simtime: float
+        :param timestep_pre: the dt time step of the pre simulation
+        :type timestep_pre: float
+        :param simtime_pre: simulation time of the pre simulation
+        :type simtime_pre: float
+        :param recorded_nodes: scope signals to record, see GeckoSweep
+        :type recorded_nodes: List[str] or str
+        :param store: result store or its directory, to store the new points in addition, see GeckoSweep
+        :type store: ResultStore or str
+        :param retries: number of repetitions of a point which killed its worker process, see GeckoSweep
+        :type retries: int
+        """
+        self.simfilepath = os.path.abspath(simfilepath)
+        self.directory = os.path.abspath(directory)
+        self.processes = processes
+        self.geckoport = geckoport
+        self.simulation_kwargs = {'timestep': timestep, 'simtime': simtime, 'timestep_pre': timestep_pre, 'simtime_pre': simtime_pre}
+        self.recorded_nodes = recorded_nodes
+        self.store = store
+        self.retries = retries
+        os.makedirs(os.path.join(self.directory, 'points'), exist_ok=True)
+
+    def _point_path(self, key: str) -> str:
+        """
+        Return the file path of a finished point.
+
+        :param key: key of the point
+        :type key: str
+        :return: file path
+        :rtype: str
+        """
+        return os.path.join(self.directory, 'points', key + '.json')
+
+    def _load(self, key: str) -> Optional[Dict]:
+        """
+        Read a finished point.
+
+        :param key: key of the point
+        :type key: str
+        :return: stored result, None if the point is not finished
+        :rtype: Dict
+        """
+        try:
+            with open(self._point_path(key), 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _save(self, key: str, result: Dict) -> None:
+        """
+        Write a finished point atomically, so a crash never leaves a partly written file.
+
+        :param key: key of the point
+        :type key: str
+        :param result: result to store
+        :type result: Dict
+        """
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.join(self.directory, 'points'), suffix='.tmp')
+        with os.fdopen(file_descriptor, 'w', encoding='utf-8') as file:
+            json.dump(result, file, default=float)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, self._point_path(key))
+
+    def run(self, design: List[Dict[str, float]], nodes: Union[List, str], operations: Union[List, str],
+            range_start_stop: List[Union[float, str]] = None, waveform_nodes: Union[List, str] = None,
+            progress: Callable[[Dict], None] = None) -> List[Dict]:
+        """
+        Simulate all points of the design which are not finished yet, and return the results of all points.
+
+        :param design: design points, e.g. from grid_design(), latin_hypercube_design() or sobol_design()
+        :type design: List[Dict[str, float]]
+        :param nodes: node names located on the scopes, see GeckoSimulation.get_values()
+        :type nodes: List[str] or str
+        :param operations: Mean/RMS/THD/Ripple/Max/Min/Shape operations, see GeckoSimulation.get_values()
+        :type operations: List[str] or str
+        :param range_start_stop: range of the data to evaluate, see GeckoSimulation.get_values()
+        :type range_start_stop: [float, str] or [float, float]
+        :param waveform_nodes: scope nodes to store as waveforms, if the runner has a store, see GeckoSweep.run()
+        :type waveform_nodes: List[str] or str
+        :param progress: function called after every simulated point with a dict of 'done', 'failed', 'total' (points
+            to simulate in this call), 'elapsed' and 'remaining' (estimated time in seconds)
+        :type progress: Callable[[Dict], None]
+        :return: results in the order of the design, dicts with the keys 'index', 'point', 'values', 'error' and
+            'resumed' (True if the point was finished before)
+        :rtype: List[Dict]
+        """
+        nodes = [nodes] if isinstance(nodes, str) else nodes
+        operations = [operations] if isinstance(operations, str) else operations
+        run_key = (file_hash(self.simfilepath), self.simulation_kwargs, nodes, operations, range_start_stop)
+        keys = [make_key(*run_key, point) for point in design]
+        results: List[Optional[Dict]] = [None] * len(design)
+        # identical points share a key and are simulated once
+        pending: Dict[str, List[int]] = {}
+        for index, point in enumerate(design):
+            stored = self._load(keys[index])
+            if stored is not None:
+                results[index] = {'index': index, 'point': point, 'values': stored['values'], 'error': None, 'resumed': True}
+            else:
+                pending.setdefault(keys[index], []).append(index)
+        logger.info(f'{len(design)} points: {len(design) - sum(len(indices) for indices in pending.values())} finished before, '
+                    f'{len(pending)} to simulate')
+
+        if pending:
+            pending_keys = list(pending)
+            points = [to_operating_point(design[pending[key][0]]) for key in pending_keys]
+            start = time.monotonic()
+            done = failed = 0
+            with GeckoSweep(self.simfilepath, processes=self.processes, geckoport=self.geckoport, recorded_nodes=self.recorded_nodes,
+                            store=self.store, retries=self.retries, **self.simulation_kwargs) as sweep:
+                for sweep_result in sweep.run(points, nodes, operations, range_start_stop, waveform_nodes):
+                    key = pending_keys[sweep_result['index']]
+                    if sweep_result['error'] is None:
+                        self._save(key, {'point': design[pending[key][0]], 'values': sweep_result['values'], 'finished': time.time()})
+                    else:
+                        failed += 1
+                    for index in pending[key]:
+                        results[index] = {'index': index, 'point': design[index], 'values': sweep_result['values'],
+                                          'error': sweep_result['error'], 'resumed': False}
+                    done += 1
+                    elapsed = time.monotonic() - start
+                    remaining = elapsed / done * (len(points) - done)
+                    logger.info(f'{done}/{len(points)} points ({failed} failed), elapsed {elapsed:.0f} s, remaining about {remaining:.0f} s')
+                    if progress is not None:
+                        progress({'done': done, 'failed': failed, 'total': len(points), 'elapsed': elapsed, 'remaining': remaining})
+        return results
+
+    def clear(self) -> None:
+        """Remove all finished points, so the next run() simulates everything again."""
+        for entry in os.scandir(os.path.join(self.directory, 'points')):
+            if entry.name.endswith(('.json', '.tmp')):
+                os.remove(entry.path)
@@ -0,0 +1,542 @@
+"""In-process stand-in for the GeckoCIRCUITS remote object, for benchmarks and development without java."""
+# python libraries
+import time
+from typing import Dict, List, Optional
+import logging
+
+# 3rd party libraries
+import numpy as np
+
+# own libraries
+from pygeckocircuits2.signalAnalysis import calculate_values
+
+logger = logging.getLogger(__name__)
+
+
+class FakeJavaException(Exception):
+    """Raised by FakeGeckoRemoteObject where GeckoCIRCUITS raises a java exception, e.g. for unknown components."""
+
+    @property
+    def innermessage(self) -> str:
+        """
+        Return the message, like jnius.JavaException.
+
+        :return: message
+        :rtype: str
+        """
+        return str(self)
+
+
+class FakeGeckoRemoteObject:
+    """
+    Implement the methods of gecko.GeckoRemoteObject used by GeckoSimulation, without java and GeckoCIRCUITS.
+
+    Every node is a sine wave with the frequency of the global parameter $f_s, plus a node specific phase and offset.
+    Data is available on the time grid of dt from 0 to the end of pre-simulation and simulation, and is returned as
+    python list, like pyjnius returns java arrays.
+
+    The latencies make it possible to emulate the JNI and GeckoCIRCUITS call costs.
+
+    :Example:
+
+    >>> import pygeckocircuits2 as pgc
+    >>> fake = pgc.FakeGeckoRemoteObject(nodes=['i_L', 'v_C'], latency=20e-6)
+    >>> gecko = pgc.GeckoSimulation('path/to/simfile.ipes', remote_object=fake, simtime=1e-3, timestep=1e-7)
+    >>> gecko.run_simulation()
+    >>> gecko.get_values(['i_L'], ['mean', 'rms'])
+    """
+
+    JavaException = FakeJavaException
+    nodes: List[str]
+    components: Dict[str, Dict[str, float]]
+    global_parameters: Dict[str, float]
+    latency: float
+    simulation_latency: float
+
+    def __init__(self, nodes: List[str] = None, components: Dict[str, Dict[str, float]] = None, global_parameters: Dict[str, float] = None,
+                 latency: float = 0, simulation_latency: float = 0, dt: float = 1e-7, simtime: float = 1e-3) -> None:
+        """
+        Create the fake remote object.
+
+        :param nodes: names of the scope nodes. Default: ['v_in', 'i_L', 'v_C']
+        :type nodes: List[str]
+        :param components: components with their parameters. Default: 'L.1' and 'C.1' with initial conditions
+        :type components: Dict[str, Dict[str, float]]
+        :param global_parameters: global parameters without '$'. Default: {'f_s': 100e3}
+        :type global_parameters: Dict[str, float]
+        :param latency: time in seconds every method call takes
+        :type latency: float
+        :param simulation_latency: additional time in seconds runSimulation() takes
+        :type simulation_latency: float
+        :param dt: time step, defines the number of data points
+        :type dt: float
+        :param simtime: simulation time, defines the number of data points
+        :type simtime: float
+        """
+        self.nodes = ['v_in', 'i_L', 'v_C'] if nodes is None else nodes
+        self.components = {'L.1': {'L': 100e-6, 'iL(0)': 0.0}, 'C.1': {'C': 10e-6, 'uC(0)': 0.0}} if components is None else components
+        global_parameters = {'f_s': 100e3} if global_parameters is None else global_parameters
+        self.global_parameters = {f'${key}': value for key, value in global_parameters.items()}
+        self.latency = latency
+        self.simulation_latency = simulation_latency
+        self._dt = dt
+        self._simtime = simtime
+        self._dt_pre = 0
+        self._simtime_pre = 0
+        self._simulated_time = 0.0
+        self.file_name: Optional[str] = None
+
+    def _wait(self) -> None:
+        """Emulate the latency of a call."""
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _component(self, component_name: str) -> Dict[str, float]:
+        """
+        Return the parameters of a component.
+
+        :param component_name: name of the component
+        :type component_name: str
+        :raises FakeJavaException: if the component does not exist
+        :return: parameters of the component
+        :rtype: Dict[str, float]
+        """
+        if component_name not in self.components:
+            raise FakeJavaException(f'Component {component_name} not found')
+        return self.components[component_name]
+
+    # simulation file and time
+
+    def openFile(self, file_name: str) -> None:
+        """
+        Open a simulation file, only its name is stored.
+
+        :param file_name: path of the simulation file
+        :type file_name: str
+        """
+        self._wait()
+        self.file_name = str(file_name)
+
+    def saveFileAs(self, file_name: str) -> None:
+        """
+        Save the simulation file, nothing is written.
+
+        :param file_name: path of the simulation file
+        :type file_name: str
+        """
+        self._wait()
+
+    def shutdown(self) -> None:
+        """Shut down the instance, nothing to do."""
+        self._wait()
+
+    def set_dt(self, dt: float) -> None:
+        """
+        Set the time step.
+
+        :param dt: time step
+        :type dt: float
+        """
+        self._wait()
+        self._dt = dt
+
+    def set_Tend(self, simtime: float) -> None:
+        """
+        Set the simulation time.
+
+        :param simtime: simulation time
+        :type simtime: float
+        """
+        self._wait()
+        self._simtime = simtime
+
+    def set_dt_pre(self, dt_pre: float) -> None:
+        """
+        Set the time step of the pre-simulation.
+
+        :param dt_pre: time step of the pre-simulation
+        :type dt_pre: float
+        """
+        self._wait()
+        self._dt_pre = dt_pre
+
+    def set_Tend_pre(self, simtime_pre: float) -> None:
+        """
+        Set the pre-simulation time.
+
+        :param simtime_pre: pre-simulation time
+        :type simtime_pre: float
+        """
+        self._wait()
+        self._simtime_pre = simtime_pre
+
+    def get_dt(self) -> float:
+        """
+        Return the time step.
+
+        :return: time step
+        :rtype: float
+        """
+        self._wait()
+        return self._dt
+
+    def get_Tend(self) -> float:
+        """
+        Return the simulation time.
+
+        :return: simulation time
+        :rtype: float
+        """
+        self._wait()
+        return self._simtime
+
+    def get_dt_pre(self) -> float:
+        """
+        Return the time step of the pre-simulation.
+
+        :return: time step of the pre-simulation
+        :rtype: float
+        """
+        self._wait()
+        return self._dt_pre
+
+    def get_Tend_pre(self) -> float:
+        """
+        Return the pre-simulation time.
+
+        :return: pre-simulation time
+        :rtype: float
+        """
+        self._wait()
+        return self._simtime_pre
+
+    # simulation
+
+    def runSimulation(self) -> None:
+        """Run the complete simulation."""
+        self._wait()
+        time.sleep(self.simulation_latency)
+        self._simulated_time = self._simtime_pre + self._simtime
+
+    def initSimulation(self) -> None:
+        """Start a simulation, which is continued by simulateTime()."""
+        self._wait()
+        self._simulated_time = 0.0
+
+    def simulateTime(self, time_span: float) -> None:
+        """
+        Continue the simulation.
+
+        :param time_span: simulated time
+        :type time_span: float
+        """
+        self._wait()
+        self._simulated_time += time_span
+
+    def endSimulation(self) -> None:
+        """End the simulation started by initSimulation()."""
+        self._wait()
+
+    # parameters
+
+    def setGlobalParameterValue(self, key: str, value: float) -> None:
+        """
+        Set a global parameter.
+
+        :param key: name of the parameter including '$'
+        :type key: str
+        :param value: value
+        :type value: float
+        """
+        self._wait()
+        self.global_parameters[key] = value
+
+    def getGlobalParameterValue(self, key: str) -> float:
+        """
+        Return a global parameter.
+
+        :param key: name of the parameter including '$'
+        :type key: str
+        :raises FakeJavaException: if the parameter does not exist
+        :return: value
+        :rtype: float
+        """
+        self._wait()
+        if key not in self.global_parameters:
+            raise FakeJavaException(f'Global parameter {key} not found')
+        return self.global_parameters[key]
+
+    def getCircuitElements(self) -> List[str]:
+        """
+        Return the names of all components.
+
+        :return: names of all components
+        :rtype: List[str]
+        """
+        self._wait()
+        return list(self.components)
+
+    def getCapacitors(self) -> List[str]:
+        """
+        Return the names of all capacitors.
+
+        :return: names of the capacitors
+        :rtype: List[str]
+        """
+        self._wait()
+        return [name for name in self.components if name.startswith('C.')]
+
+    def getAccessibleParameters(self, component_name: str) -> List[str]:
+        """
+        Return the parameters of a component, as GeckoCIRCUITS does with a tab separated description.
+
+        :param component_name: name of the component
+        :type component_name: str
+        :return: parameter names and descriptions
+        :rtype: List[str]
+        """
+        self._wait()
+        return [f'{key}\tparameter {key}' for key in self._component(component_name)]
+
+    def getParameter(self, component_name: str, key: str) -> float:
+        """
+        Return a parameter of a component.
+
+        :param component_name: name of the component
+        :type component_name: str
+        :param key: name of the parameter
+        :type key: str
+        :return: value
+        :rtype: float
+        """
+        self._wait()
+        return self._component(component_name)[key]
+
+    def setParameters(self, component_name: str, keys: List[str], values: List[float]) -> None:
+        """
+        Set parameters of a component.
+
+        :param component_name: name of the component
+        :type component_name: str
+        :param keys: names of the parameters
+        :type keys: List[str]
+        :param values: values
+        :type values: List[float]
+        """
+        self._wait()
+        parameters = self._component(component_name)
+        for index, key in enumerate(keys):
+            parameters[key] = values[index]
+
+    def doOperation(self, component_name: str, operation: str, argument: str) -> None:
+        """
+        Execute an operation on a component, e.g. 'setLossFile'. Nothing is done.
+
+        :param component_name: name of the component
+        :type component_name: str
+        :param operation: name of the operation
+        :type operation: str
+        :param argument: argument of the operation
+        :type argument: str
+        """
+        self._wait()
+
+    # scope data
+
+    def _time(self, start_time: float, stop_time: float, skip_points: int) -> np.ndarray:
+        """
+        Return the time grid between start and stop time, limited to the simulated time.
+
+        :param start_time: start time
+        :type start_time: float
+        :param stop_time: stop time
+        :type stop_time: float
+        :param skip_points: number of skipped points between two points
+        :type skip_points: int
+        :return: time points
+        :rtype: np.ndarray
+        """
+        stop_time = min(stop_time, self._simulated_time)
+        first = int(np.ceil(start_time / self._dt - 1e-9))
+        last = int(np.floor(stop_time / self._dt + 1e-9))
+        return np.arange(first, last + 1, skip_points + 1) * self._dt
+
+    def _signal(self, node: str, time_points: np.ndarray) -> np.ndarray:
+        """
+        Return the values of a node.
+
+        :param node: name of the node
+        :type node: str
+        :param time_points: time points
+        :type time_points: np.ndarray
+        :return: values
+        :rtype: np.ndarray
+        """
+        index = self.nodes.index(node)
+        frequency = self.global_parameters.get('$f_s', 100e3)
+        return index + np.sin(2 * np.pi * frequency * time_points + index)
+
+    def getTimeArray(self, node: str, start_time: float, stop_time: float, skip_points: int) -> List[float]:
+        """
+        Return the time points of a node.
+
+        :param node: name of the node
+        :type node: str
+        :param start_time: start time
+        :type start_time: float
+        :param stop_time: stop time
+        :type stop_time: float
+        :param skip_points: number of skipped points between two points
+        :type skip_points: int
+        :return: time points
+        :rtype: List[float]
+        """
+        self._wait()
+        return self._time(start_time, stop_time, skip_points).tolist() if node in self.nodes else []
+
+    def getSignalData(self, node: str, start_time: float, stop_time: float, skip_points: int) -> List[float]:
+        """
+        Return the values of a node, empty for unknown nodes.
+
+        :param node: name of the node
+        :type node: str
+        :param start_time: start time
+        :type start_time: float
+        :param stop_time: stop time
+        :type stop_time: float
+        :param skip_points: number of skipped points between two points
+        :type skip_points: int
+        :return: values
+        :rtype: List[float]
+        """
+        self._wait()
+        if node not in self.nodes:
+            return []
+        return self._signal(node, self._time(start_time, stop_time, skip_points)).tolist()
+
+    def _signal_value(self, operation: str, node: str, start_time: float, stop_time: float) -> float:
+        """
+        Calculate an operation of a node as GeckoCIRCUITS does in its getSignal* methods.
+
+        :param operation: operation, see signalAnalysis.calculate_values()
+        :type operation: str
+        :param node: name of the node
+        :type node: str
+        :param start_time: start time
+        :type start_time: float
+        :param stop_time: stop time
+        :type stop_time: float
+        :raises FakeJavaException: if the node does not exist
+        :return: value
+        :rtype: float
+        """
+        self._wait()
+        if node not in self.nodes:
+            raise FakeJavaException(f'Signal {node} not found')
+        time_points = self._time(start_time, stop_time, 0)
+        return calculate_values(time_points, {node: self._signal(node, time_points)}, operation)[operation][node]
+
+    def getSignalAvg(self, node: str, start_time: float, stop_time: float) -> float:
+        """
+        Return the mean value of a node.
+
+        :param node: name of the node
+        :type node: str
+        :param start_time: start time
+        :type start_time: float
+        :param stop_time: stop time
+        :type stop_time: float
+        :return: mean value
+        :rtype: float
+        """
+        return self._signal_value('mean', node, start_time, stop_time)
+
+    def getSignalRMS(self, node: str, start_time: float, stop_time: float) -> float:
+        """
+        Return the rms value of a node.
+
+        :param node: name of the node
+        :type node: str
+        :param start_time: start time
+        :type start_time: float
+        :param stop_time: stop time
+        :type stop_time: float
+        :return: rms value
+        :rtype: float
+        """
+        return self._signal_value('rms', node, start_time, stop_time)
+
+    def getSignalMax(self, node: str, start_time: float, stop_time: float) -> float:
+        """
+        Return the maximum value of a node.
+
+        :param node: name of the node
+        :type node: str
+        :param start_time: start time
+        :type start_time: float
+        :param stop_time: stop time
+        :type stop_time: float
+        :return: maximum value
+        :rtype: float
+        """
+        return self._signal_value('max', node, start_time, stop_time)
+
+    def getSignalMin(self, node: str, start_time: float, stop_time: float) -> float:
+        """
+        Return the minimum value of a node.
+
+        :param node: name of the node
+        :type node: str
+        :param start_time: start time
+        :type start_time: float
+        :param stop_time: stop time
+        :type stop_time: float
+        :return: minimum value
+        :rtype: float
+        """
+        return self._signal_value('min', node, start_time, stop_time)
+
+    def getSignalRipple(self, node: str, start_time: float, stop_time: float) -> float:
+        """
+        Return the peak-to-peak value of a node.
+
+        :param node: name of the node
+        :type node: str
+        :param start_time: start time
+        :type start_time: float
+        :param stop_time: stop time
+        :type stop_time: float
+        :return: peak-to-peak value
+        :rtype: float
+        """
+        return self._signal_value('ripple', node, start_time, stop_time)
+
+    def getSignalTHD(self, node: str, start_time: float, stop_time: float) -> float:
+        """
+        Return the total harmonic distortion of a node.
+
+        :param node: name of the node
+        :type node: str
+        :param start_time: start time
+        :type start_time: float
+        :param stop_time: stop time
+        :type stop_time: float
+        :return: total harmonic distortion
+        :rtype: float
+        """
+        return self._signal_value('thd', node, start_time, stop_time)
+
+    def getSignalShape(self, node: str, start_time: float, stop_time: float) -> float:
+        """
+        Return the form factor of a node.
+
+        :param node: name of the node
+        :type node: str
+        :param start_time: start time
+        :type start_time: float
+        :param stop_time: stop time
+        :type stop_time: float
+        :return: form factor
+        :rtype: float
+        """
+        return self._signal_value('shape', node, start_time, stop_time)
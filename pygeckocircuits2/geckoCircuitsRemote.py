@@ -3,15 +3,65 @@
 import pathlib
 import os
 import json
-from typing import Union, List, Tuple, Dict, Optional
+import contextlib
+import functools
+import tempfile
+import time
+from typing import Any, Union, List, Tuple, Dict, Optional, Iterator, Callable, ContextManager, TYPE_CHECKING
 import logging
 
 # 3rd party libraries
-import pandas as pd
+import numpy as np
 
-# configure logging for this module, set the default logging level to WARNING.
+# own libraries
+from pygeckocircuits2.signalAnalysis import (calculate_values, calculate_window_values, period_windows, edge_windows, window_values_to_dataframe,
+                                             fourier_coefficients, harmonic_spectrum)
+from pygeckocircuits2.instrumentation import GeckoInstrumentation
+from pygeckocircuits2.ipesFile import IpesWriter
+from pygeckocircuits2.scopeData import write_scope_file, decimate_scope_data
+
+if TYPE_CHECKING:
+    # pandas is imported where it is needed, as it would take most of the import time of this package
+    import pandas as pd
+
+# logger of this module. The logging configuration is up to the application, see examples.
 logger = logging.getLogger(__name__)
-logging.basicConfig(format='%(levelname)s,%(asctime)s:%(message)s', level=logging.WARNING)  # , filename='example.log')
+
+# environment variables with the GeckoCIRCUITS directory and the Java directory, used instead of config.json
+GECKO_PATH_ENV = 'PYGECKOCIRCUITS2_GECKO'
+JAVA_PATH_ENV = 'PYGECKOCIRCUITS2_JAVA'
+
+# GeckoCIRCUITS instances of this process that are kept alive (keep_alive=True), by port
+_remote_instances: Dict[int, object] = {}
+
+# shared no-op context manager for phases without instrumentation
+_NO_PHASE = contextlib.nullcontext()
+
+
+def _phase(name: str) -> Callable:
+    """
+    Decorate a method of GeckoSimulation to be measured as phase by its instrumentation, if there is one.
+
+    :param name: name of the phase, see GeckoInstrumentation
+    :type name: str
+    :return: decorator
+    :rtype: Callable
+    """
+    def decorator(method: Callable) -> Callable:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self._phase_context(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def shutdown_remote_instances() -> None:
+    """Shut down all GeckoCIRCUITS instances of this process that are kept alive by GeckoSimulation(keep_alive=True)."""
+    while _remote_instances:
+        geckoport, ginst = _remote_instances.popitem()
+        logger.info(f'Shutting down gecko on port {geckoport}')
+        ginst.shutdown()
 
 class GeckoSimulation:
     """
@@ -34,6 +84,15 @@ class GeckoSimulation:
     Method naming:
      * set   : e.g. to set values or parameters
      * get   : e.g: to get keys, values or parameters
+
+    Shadow model:
+     * every call to GeckoCIRCUITS goes through the java bridge, so the state of the opened file is mirrored on the python
+       side: global parameters, the parameter keys and values of components, loaded loss files and the simulation times.
+     * only changed values are sent, and all changed parameters of a component are sent in a single call. Reading a
+       mirrored value does not call GeckoCIRCUITS. The mirror is cleared when a file is opened.
+     * set verify=True to read back the component parameters after setting them, e.g. to find parameters that are
+       defined by a global parameter and can not be set directly.
+     * call invalidate_shadow() if the state is changed outside this object, e.g. in the GeckoCIRCUITS window.
     """
 
     timestep: float
@@ -45,14 +104,29 @@ class GeckoSimulation:
     javapath: pathlib.Path
     simfilepath: Optional[str]
     debug: bool
-
-    def __init__(self, simfilepath: str, geckoport: int = 43036, timestep: float = None, simtime: float = None, timestep_pre: float = 0, simtime_pre: float = 0
-                 ) -> None:
+    instrumentation: Optional[GeckoInstrumentation]
+    interactive: bool
+    attach: bool
+    keep_alive: bool
+    data_offset: float
+    warm_start_state: Dict[str, Dict[str, float]]
+    recorded_nodes: Optional[List[str]]
+    verify: bool
+
+    def __init__(self, simfilepath: str, geckoport: int = 43036, timestep: float = None, simtime: float = None, timestep_pre: float = 0, simtime_pre: float = 0,
+                 instrumentation: GeckoInstrumentation = None, geckopath: str = None, javapath: str = None, interactive: bool = True,
+                 attach: bool = False, keep_alive: bool = False, remote_object: Any = None, verify: bool = False) -> None:
         """
         Set up the required java configuration to run the GeckoCIRCUITS on your PC.
 
         Java (GeckoCIRCUITS.jar) file located inside the GeckoCIRCUITS directory needs to be provided
-        for remote configuration.
+        for remote configuration. The directories are taken from the arguments geckopath and javapath, then from the
+        environment variables PYGECKOCIRCUITS2_GECKO and PYGECKOCIRCUITS2_JAVA, then from config.json. If still unknown,
+        they are asked for interactively, unless interactive is False.
+
+        Starting GeckoCIRCUITS takes much longer than opening a file. To skip the startup, use keep_alive=True to keep the
+        instance running after this object is deleted: following GeckoSimulation objects on the same port in this process
+        reuse it, other processes can connect to it by attach=True. Call shutdown() to stop a kept-alive instance.
 
         :param simfilepath: absolute or relative path to simulation file
         :type simfilepath: str
@@ -64,9 +138,133 @@ class GeckoSimulation:
         :type simtime: float
         :param debug: Debug mode displays extra information
         :type debug: bool
+        :param instrumentation: records all calls to GeckoCIRCUITS and the phase timings. Default None: no recording, no overhead
+        :type instrumentation: GeckoInstrumentation
+        :param geckopath: GeckoCIRCUITS directory containing GeckoCIRCUITS.jar
+        :type geckopath: str
+        :param javapath: Java directory containing bin/
+        :type javapath: str
+        :param interactive: False to raise FileNotFoundError instead of asking for missing paths
+        :type interactive: bool
+        :param attach: True to connect to an already running GeckoCIRCUITS instance on geckoport instead of starting a new one.
+            An attached instance is not shut down when this object is deleted.
+        :type attach: bool
+        :param keep_alive: True to keep the GeckoCIRCUITS instance running after this object is deleted, for reuse
+        :type keep_alive: bool
+        :param remote_object: object to use instead of GeckoCIRCUITS, e.g. FakeGeckoRemoteObject. Java and the paths are not needed then.
+        :type remote_object: gecko.GeckoRemoteObject or FakeGeckoRemoteObject
+        :param verify: True to read back component parameters after setting them and log the ones that did not change
+        :type verify: bool
         :return: None
         :rtype: None
         """
+        self.instrumentation = instrumentation
+        self.interactive = interactive
+        self.attach = attach
+        self.keep_alive = keep_alive
+        self._owns_instance = False
+        # start of the evaluated data after a steady-state run, see run_steady_state_simulation()
+        self.data_offset = 0
+        # initial conditions for the next run, see run_warm_start_simulation()
+        self.warm_start_state = {}
+        self._cold_run_time = None
+        # values of the initial conditions before the first warm start, restored by reset_warm_start()
+        self._warm_start_file_values: Dict[str, Dict[str, float]] = {}
+        # scope signals of the opened variant and the original file, see set_recorded_nodes()
+        self.recorded_nodes = None
+        self._recording_source = None
+        self.verify = verify
+        self.invalidate_shadow()
+        # Fourier coefficients of the current run by (fundamental, periods, start, end) and node, see get_spectrum()
+        self._spectrum_cache: Dict[Tuple[float, Optional[int], float, float, str], Tuple[np.ndarray, int]] = {}
+        self.geckoport = geckoport
+        if remote_object is not None:
+            # no java: python strings, the remote object is owned by the caller
+            self.JString = str
+            self.JavaException = getattr(remote_object, 'JavaException', Exception)
+            self.ginst = remote_object if instrumentation is None else instrumentation.wrap(remote_object)
+        else:
+            self._start_java(geckopath, javapath, interactive)
+        self.simfilepath = simfilepath
+        self.open_file()
+
+        if simtime is None and timestep is None:
+            self.simtime, self.timestep, self.simtime_pre, self.timestep_pre = self.get_sim_time()
+        else:
+            self.timestep = timestep
+            self.simtime = simtime
+            self.timestep_pre = timestep_pre
+            self.simtime_pre = simtime_pre
+
+    # Shutting down any left instances
+    def __del__(self):
+        """Destructor to shut down any instances that are left opened after simulation, except attached and kept-alive instances."""
+        if hasattr(self, 'ginst') and self._owns_instance:
+            logger.info('Shutting down gecko')
+            self.ginst.shutdown()
+        self._remove_recording_variant()
+
+    def shutdown(self) -> None:
+        """Shut down the GeckoCIRCUITS instance, also if it is attached or kept alive."""
+        if hasattr(self, 'ginst'):
+            logger.info('Shutting down gecko')
+            _remote_instances.pop(self.geckoport, None)
+            self.ginst.shutdown()
+            del self.ginst
+        self._remove_recording_variant()
+
+    def _start_java(self, geckopath: Optional[str], javapath: Optional[str], interactive: bool) -> None:
+        """
+        Start the JVM and load the java classes to control GeckoCIRCUITS.
+
+        :param geckopath: GeckoCIRCUITS directory, see _set_paths()
+        :type geckopath: str
+        :param javapath: Java directory, see _set_paths()
+        :type javapath: str
+        :param interactive: False to raise FileNotFoundError instead of asking for missing paths
+        :type interactive: bool
+        """
+        self._set_paths(geckopath, javapath, interactive)
+
+        os.environ['CLASSPATH'] = self.geckopath.__str__()
+        # importing jnius starts the JVM
+        with self._phase_context('startup'):
+            try:
+                from jnius import autoclass
+            except Exception:
+                os.environ['JDK_HOME'] = self.javapath.__str__()
+                os.environ['JAVA_HOME'] = self.javapath.__str__()
+                from jnius import autoclass
+        from jnius import JavaException
+
+        # Note that parameters must be passed as java-strings to Gecko, as it otherwise throws a fit:
+        self.JString = autoclass('java.lang.String')
+        self.JavaException = JavaException
+        # The class to control GeckoCIRCUITS:
+        self.Inst = autoclass('gecko.GeckoRemoteObject')
+        logger.info(self.Inst)
+
+    def _set_paths(self, geckopath: Optional[str], javapath: Optional[str], interactive: bool) -> None:
+        """
+        Set the paths to GeckoCIRCUITS.jar and the Java bin directory.
+
+        :param geckopath: GeckoCIRCUITS directory, None to use the environment variable, config.json or the prompt
+        :type geckopath: str
+        :param javapath: Java directory, None to use the environment variable, config.json or the prompt
+        :type javapath: str
+        :param interactive: False to raise FileNotFoundError instead of asking for missing paths
+        :type interactive: bool
+        :raises FileNotFoundError: if given paths do not exist, or if paths are missing and interactive is False
+        """
+        geckopath = os.environ.get(GECKO_PATH_ENV) if geckopath is None else geckopath
+        javapath = os.environ.get(JAVA_PATH_ENV) if javapath is None else javapath
+        if geckopath is not None and javapath is not None:
+            self.geckopath = pathlib.Path(geckopath) / 'GeckoCIRCUITS.jar'
+            self.javapath = pathlib.Path(javapath) / 'bin'
+            if not self.geckopath.exists() or not self.javapath.exists():
+                raise FileNotFoundError(f'{self.geckopath} or {self.javapath} does not exist!')
+            return
+
         # Find out the onelab_path of installed module,
         # or in case of running directly from git, find the onelab_path of git repository
         module_file_path = pathlib.Path(__file__).parent.absolute()
@@ -82,6 +280,10 @@ class GeckoSimulation:
                 os.remove(module_file_path / 'config.json')
                 raise FileNotFoundError
         except FileNotFoundError:
+            if not interactive:
+                msg = (f'Paths to GeckoCIRCUITS and Java unknown. Set the arguments geckopath and javapath, '
+                       f'or the environment variables {GECKO_PATH_ENV} and {JAVA_PATH_ENV}.')
+                raise FileNotFoundError(msg) from None
             is_jar_exists = True
             is_bin_exists = True
             path_wrong = True
@@ -118,39 +320,18 @@ class GeckoSimulation:
             json.dump(path_dict, file, ensure_ascii=False)
             file.close()
 
-        os.environ['CLASSPATH'] = self.geckopath.__str__()
-        try:
-            from jnius import autoclass
-        except Exception:
-            os.environ['JDK_HOME'] = self.javapath.__str__()
-            os.environ['JAVA_HOME'] = self.javapath.__str__()
-            from jnius import autoclass
-        global jnius
-        import jnius
-
-        # Note that parameters must be passed as java-strings to Gecko, as it otherwise throws a fit:
-        self.JString = autoclass('java.lang.String')
-        # The class to control GeckoCIRCUITS:
-        self.Inst = autoclass('gecko.GeckoRemoteObject')
-        logger.info(self.Inst)
-        self.geckoport = geckoport
-        self.simfilepath = simfilepath
-        self.open_file()
-
-        if simtime is None and timestep is None:
-            self.simtime, self.timestep, self.simtime_pre, self.timestep_pre = self.get_sim_time()
-        else:
-            self.timestep = timestep
-            self.simtime = simtime
-            self.timestep_pre = timestep_pre
-            self.simtime_pre = simtime_pre
+    def _phase_context(self, name: str) -> ContextManager:
+        """
+        Return the timer of a phase, or a no-op context manager without instrumentation.
 
-    # Shutting down any left instances
-    def __del__(self):
-        """Destructor to shut down any instances that are left opened after simulation."""
-        if hasattr(self, 'ginst'):
-            logger.info('Shutting down gecko')
-            self.ginst.shutdown()
+        :param name: name of the phase, see GeckoInstrumentation
+        :type name: str
+        :return: context manager
+        :rtype: ContextManager
+        """
+        if self.instrumentation is None:
+            return _NO_PHASE
+        return self.instrumentation.phase(name)
 
     # -----------------------------------
     # simulation file handling
@@ -173,28 +354,137 @@ class GeckoSimulation:
         else:
             logger.warning('No instance is running!')
 
-    def open_file(self) -> None:
+    def _remove_recording_variant(self) -> None:
+        """Delete the file variant written by set_recorded_nodes(), if any."""
+        if getattr(self, '_recording_source', None) is not None:
+            try:
+                os.remove(self.simfilepath)
+            except OSError:
+                pass
+
+    @_phase('open_file')
+    def set_recorded_nodes(self, nodes: Optional[Union[List, str]]) -> None:
         """
-        Open the file that is provided as attribute value to the class object.
+        Record only the given scope signals from now on, so memory, simulation time and data scale with the requested signals.
+
+        GeckoCIRCUITS stores every scope input at every time step, also if only a single signal is evaluated. Here, a variant
+        of the simulation file is written next to it, with all other scope inputs removed (see IpesWriter.write_variant()),
+        and opened instead. The variant is deleted by the next call of this method or by shutdown().
+
+        Opening the variant resets all parameters set over the remote interface, so set the recorded nodes first.
+
+        :param nodes: scope signals to record, e.g. ['i_L']. None to record all signals of the original file again
+        :type nodes: List[str] or str or None
+        :raises KeyError: if a signal is not recorded by any scope of the file
+        :raises Exception: if the variant can not be written
+
+        :Example:
+
+        >>> import pygeckocircuits2 as pgc
+        >>> buck_converter = pgc.GeckoSimulation('path/to/gecko_file.ipes')
+        >>> buck_converter.set_recorded_nodes(['i_L'])
+        >>> buck_converter.set_global_parameters({'V_in': 60})
+        >>> buck_converter.run_simulation()
+        >>> buck_converter.get_values(['i_L'], ['rms'])
+        """
+        source = self.simfilepath if self._recording_source is None else self._recording_source
+        variant = None
+        if nodes is not None:
+            nodes = [nodes] if isinstance(nodes, str) else nodes
+            stem = os.path.splitext(os.path.basename(source))[0]
+            # next to the original file, so relative paths in the file stay valid
+            file_descriptor, variant = tempfile.mkstemp(suffix='.ipes', prefix=f'.{stem}_recorded_', dir=os.path.dirname(source))
+            os.close(file_descriptor)
+            try:
+                IpesWriter(source).write_variant(variant, scope_nodes=nodes)
+            except Exception:
+                os.remove(variant)
+                raise
+        self._remove_recording_variant()
+        self._recording_source = None
+        self.recorded_nodes = None
+        self.open_file(source if variant is None else variant)
+        if variant is not None:
+            self._recording_source = source
+            self.recorded_nodes = nodes
+
+    def invalidate_shadow(self) -> None:
+        """
+        Forget all mirrored values, so they are read from GeckoCIRCUITS again and the next set calls send all values.
+
+        Use this after the state of the instance was changed outside this object, e.g. in the GeckoCIRCUITS window or by
+        another process attached to the same instance.
+        """
+        # global parameters by their name including '$'
+        self._shadow_global_parameters: Dict[str, float] = {}
+        # accessible parameter keys and known parameter values by component name in capital letters
+        self._shadow_component_keys: Dict[str, List[str]] = {}
+        self._shadow_component_values: Dict[str, Dict[str, float]] = {}
+        # loaded files as (path, modification time) by (component name, operation)
+        self._shadow_files: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        # 'dt', 'Tend', 'dt_pre' and 'Tend_pre'
+        self._shadow_sim_time: Dict[str, float] = {}
+        # results of getCircuitElements() and getCapacitors()
+        self._shadow_elements: Dict[str, List[str]] = {}
+
+    def _connect(self) -> None:
+        """Start a new GeckoCIRCUITS instance, or use the kept-alive instance of this process or attach to a running instance."""
+        if self.geckoport in _remote_instances:
+            logger.info(f'Reuse GeckoCIRCUITS instance on port {self.geckoport}')
+            ginst = _remote_instances[self.geckoport]
+        elif self.attach:
+            logger.info(f'Attach to GeckoCIRCUITS instance on port {self.geckoport}')
+            with self._phase_context('startup'):
+                ginst = self.Inst.connectToExistingInstance(self.geckoport)
+        else:
+            # Start GeckoCIRCUITS. This opens the Gecko window:
+            with self._phase_context('startup'):
+                ginst = self.Inst.startNewRemoteInstance(self.geckoport)
+            self._owns_instance = not self.keep_alive
+        if self.keep_alive:
+            _remote_instances[self.geckoport] = ginst
+        self.ginst = ginst if self.instrumentation is None else self.instrumentation.wrap(ginst)
+
+    def open_file(self, simfilepath: str = None) -> None:
+        """
+        Open the simulation file. A running GeckoCIRCUITS instance is reused, so this switches the circuit without a restart.
 
         Gecko window loaded with the provided .ipes file
+
+        :param simfilepath: absolute or relative path to simulation file. Default None: the file of the class object
+        :type simfilepath: str
+        :raises FileNotFoundError: if the file does not exist and interactive is False
         """
+        if simfilepath is not None and self._recording_source is not None and os.path.abspath(simfilepath) != self.simfilepath:
+            # another file replaces the variant of set_recorded_nodes()
+            self._remove_recording_variant()
+            self._recording_source = None
+            self.recorded_nodes = None
+        self.simfilepath = self.simfilepath if simfilepath is None else simfilepath
         is_invalid_path = True
         while is_invalid_path:
             if isinstance(self.simfilepath, str) and self.simfilepath.endswith('.ipes') and pathlib.Path(self.simfilepath).exists():
                 # Note: absolute filepaths needed. Otherwise, there will occur java.lang.String error when using relative paths
                 self.simfilepath = os.path.abspath(self.simfilepath)
                 is_invalid_path = False
-                # Start GeckoCIRCUITS. This opens the Gecko window:
-                self.ginst = self.Inst.startNewRemoteInstance(self.geckoport)
+                if not hasattr(self, 'ginst'):
+                    self._connect()
                 # Open the simulation file. Use java-strings:
-                file_name = self.JString(self.simfilepath)
-                self.ginst.openFile(file_name)
+                with self._phase_context('open_file'):
+                    file_name = self.JString(self.simfilepath)
+                    self.ginst.openFile(file_name)
+                self.invalidate_shadow()
+                # the opened file brings its own initial conditions
+                self._warm_start_file_values = {}
+                self._spectrum_cache.clear()
+            elif not self.interactive:
+                raise FileNotFoundError(f'GeckoCIRCUITS file (.ipes) to simulate not found: {self.simfilepath}')
             else:
                 self.simfilepath = None
                 logger.error('GeckoCIRCUITS file (.ipes) to simulate not found. Check the file path.')
                 self.simfilepath = input("Enter the file path (e.g.: ~/myfolder/BuckConverter.ipes):")
                 
+    @_phase('run_simulation')
     def run_simulation(self, timestep: float = None, simtime: float = None, timestep_pre: float = None,
                        simtime_pre: float = None, save_file: bool = False) -> None:
         """
@@ -216,23 +506,187 @@ class GeckoSimulation:
         # pre-simulation if defined:
         self.timestep_pre = self.timestep_pre if timestep_pre is None else timestep_pre
         self.simtime_pre = self.simtime_pre if simtime_pre is None else simtime_pre
-        self.ginst.set_dt_pre(self.timestep_pre)
-        self.ginst.set_Tend_pre(self.simtime_pre)
+        self._set_remote_sim_time('dt_pre', self.timestep_pre)
+        self._set_remote_sim_time('Tend_pre', self.simtime_pre)
         # normal simulation:
         self.timestep = self.timestep if timestep is None else timestep
         self.simtime = self.simtime if simtime is None else simtime
-        self.ginst.set_dt(self.timestep)  # Simulation time step
-        self.ginst.set_Tend(self.simtime)  # Simulation time
+        self._set_remote_sim_time('dt', self.timestep)  # Simulation time step
+        self._set_remote_sim_time('Tend', self.simtime)  # Simulation time
         logger.debug(f"Simulation time: {self.simtime} s")
         logger.debug(f"Timestep time: {self.timestep} s")
         if save_file:
             self.save_file(self.simfilepath)
+        self.data_offset = 0
+        self._spectrum_cache.clear()
         self.ginst.runSimulation()
 
+    @_phase('run_simulation')
+    def run_steady_state_simulation(self, nodes: Union[List, str], period: float = None, frequency_parameter: str = 'f_s',
+                                    rel_tol: float = 1e-3, consecutive_periods: int = 2, max_periods: int = 10000,
+                                    timestep: float = None, simtime: float = None, reference_simtime_pre: float = None) -> Dict:
+        """
+        Run the simulation until the circuit is periodic, then run the measurement window of length simtime.
+
+        Instead of a fixed pre-simulation, the circuit is simulated period by period with the timestep. After every period,
+        mean, rms, min and max of the given nodes are compared to the previous period. The circuit is periodic, if all
+        of them changed less than rel_tol times the peak value of the node, for consecutive_periods periods in a row.
+        The measurement window follows directly. get_values(), get_scope_data(), ... evaluate the measurement window only.
+
+        :param nodes: node names located on the scopes, which need to be periodic, e.g. inductor currents and capacitor voltages
+        :type nodes: List[str] or str
+        :param period: switching period in seconds. Default None: 1 / value of the global parameter frequency_parameter
+        :type period: float
+        :param frequency_parameter: name of the global parameter with the switching frequency, used if period is None
+        :type frequency_parameter: str
+        :param rel_tol: allowed change from period to period, relative to the peak value of a node
+        :type rel_tol: float
+        :param consecutive_periods: number of periods in a row that need to be within the tolerance
+        :type consecutive_periods: int
+        :param max_periods: maximum number of periods to reach the steady state, the measurement starts anyway afterwards
+        :type max_periods: int
+        :param timestep: the dt time step of the simulation
+        :type timestep: float
+        :param simtime: simulation time of the measurement window
+        :type simtime: float
+        :param reference_simtime_pre: fixed pre-simulation time to compare the settling time with. Default None: simtime_pre
+        :type reference_simtime_pre: float
+        :return: dict with 'steady_state' (bool), 'settling_time' (simulated time until periodic), 'periods' and
+            'saved_time' (reference_simtime_pre minus settling_time, the simulated time saved compared to the fixed
+            pre-simulation, negative if the fixed pre-simulation was shorter; None without a fixed pre-simulation)
+        :rtype: Dict
+
+        :Example:
+
+        >>> import pygeckocircuits2 as pgc
+        >>> buck_converter = pgc.GeckoSimulation('path/to/gecko_file.ipes', simtime=0.05, timestep=50e-9)
+        >>> report = buck_converter.run_steady_state_simulation(['i_L', 'v_C'], frequency_parameter='f_s')
+        >>> values = buck_converter.get_values(['i_L'], ['mean', 'rms'])
+        """
+        nodes = [nodes] if isinstance(nodes, str) else nodes
+        if period is None:
+            period = 1 / self.get_global_parameters(frequency_parameter)[frequency_parameter]
+        self.timestep = self.timestep if timestep is None else timestep
+        self.simtime = self.simtime if simtime is None else simtime
+        # the pre-simulation is replaced by the periodic check
+        self._set_remote_sim_time('Tend_pre', 0)
+        self._set_remote_sim_time('dt', self.timestep)
+        self._set_remote_sim_time('Tend', max_periods * period + self.simtime)
+        self.data_offset = 0
+        self._spectrum_cache.clear()
+        self.ginst.initSimulation()
+
+        operations = ['mean', 'rms', 'min', 'max']
+        previous = None
+        periods_in_tolerance = 0
+        periods = 0
+        while periods < max_periods and periods_in_tolerance < consecutive_periods:
+            self.ginst.simulateTime(period)
+            periods += 1
+            time, signals = self._read_scope_arrays(nodes, (periods - 1) * period, periods * period, 0, np.float64)
+            current = calculate_values(time, signals, operations)
+            if previous is not None and signals:
+                tolerance = {node: rel_tol * max(abs(current['max'][node]), abs(current['min'][node])) for node in signals}
+                is_periodic = all(abs(current[operation][node] - previous[operation].get(node, np.inf)) <= tolerance[node]
+                                  for operation in operations for node in signals)
+                periods_in_tolerance = periods_in_tolerance + 1 if is_periodic else 0
+            previous = current
+
+        steady_state = periods_in_tolerance >= consecutive_periods
+        settling_time = periods * period
+        if not steady_state:
+            logger.warning(f'No steady state after {periods} periods, start measurement anyway')
+        self.ginst.simulateTime(self.simtime)
+        self.ginst.endSimulation()
+        # get_values() and get_scope_data() evaluate the measurement window after the settling time
+        self._set_remote_sim_time('Tend', self.simtime)
+        self.data_offset = settling_time
+        reference_simtime_pre = self.simtime_pre if reference_simtime_pre is None else reference_simtime_pre
+        saved_time = reference_simtime_pre - settling_time if reference_simtime_pre else None
+        saved_text = '' if saved_time is None else f', saved simulated time: {saved_time} s'
+        logger.info(f'Steady state: {steady_state} after {periods} periods ({settling_time} s){saved_text}')
+        return {'steady_state': steady_state, 'settling_time': settling_time, 'periods': periods, 'saved_time': saved_time}
+
+    @_phase('run_simulation')
+    def run_warm_start_simulation(self, state_map: Dict[str, Dict[str, str]], simtime_pre_warm: float = 0, timestep: float = None,
+                                  simtime: float = None) -> Dict[str, Dict[str, float]]:
+        """
+        Run the simulation starting from the end state of the previous run, e.g. for sweeps in small steps.
+
+        The first run (or the first after reset_warm_start()) uses the pre-simulation time simtime_pre. Afterwards, the
+        end values of the given nodes are written as initial conditions to the components, and the following runs use the
+        shorter pre-simulation time simtime_pre_warm. The carried over state and the saved time are logged.
+
+        The initial conditions stay set in GeckoCIRCUITS, also for run_simulation(), until reset_warm_start() restores
+        the values they had before the first warm start.
+
+        :param state_map: components, their initial condition keys and the nodes to take the end values from,
+            e.g. {'L.1': {'iL(0)': 'i_L'}, 'C.1': {'uC(0)': 'v_C'}}
+        :type state_map: Dict[str, Dict[str, str]]
+        :param simtime_pre_warm: pre-simulation time of warm-started runs
+        :type simtime_pre_warm: float
+        :param timestep: the dt time step of each simulation
+        :type timestep: float
+        :param simtime: simulation time, not including the optional pre simulation time
+        :type simtime: float
+        :return: end state of this run, in the format {'L.1': {'iL(0)': 10.2}}, which is the initial state of the next run
+        :rtype: Dict[str, Dict[str, float]]
+
+        :Example:
+
+        >>> import pygeckocircuits2 as pgc
+        >>> buck_converter = pgc.GeckoSimulation('path/to/gecko_file.ipes', simtime=0.05, timestep=50e-9, simtime_pre=100e-3, timestep_pre=20e-9)
+        >>> for duty_cycle in [0.40, 0.41, 0.42]:
+        >>>     buck_converter.set_global_parameters({'duty_cycle': duty_cycle})
+        >>>     buck_converter.run_warm_start_simulation({'L.1': {'iL(0)': 'i_L'}}, simtime_pre_warm=5e-3)
+        >>>     print(buck_converter.get_values(['i_L'], ['mean']))
+        """
+        simtime_pre = self.simtime_pre
+        start = time.perf_counter()
+        if self.warm_start_state:
+            for component_name, component_dict in self.warm_start_state.items():
+                file_values = self._warm_start_file_values.setdefault(component_name.upper(), {})
+                if not set(component_dict) <= set(file_values):
+                    current_values = self.get_component_values(component_name)
+                    file_values.update({key: current_values[key] for key in component_dict if key not in file_values})
+                self.set_component_values(component_name, component_dict)
+            self.run_simulation(timestep=timestep, simtime=simtime, simtime_pre=simtime_pre_warm)
+            # keep the pre-simulation time of cold runs
+            self.simtime_pre = simtime_pre
+            run_time = time.perf_counter() - start
+            cold_run_time = f'{self._cold_run_time:.3f} s' if self._cold_run_time is not None else 'unknown'
+            logger.info(f'Warm start from {self.warm_start_state}: saved simulated time {simtime_pre - simtime_pre_warm} s, '
+                        f'run time {run_time:.3f} s instead of {cold_run_time}')
+        else:
+            self.run_simulation(timestep=timestep, simtime=simtime)
+            self._cold_run_time = time.perf_counter() - start
+
+        # read the last data point of every node
+        nodes = list({node for component_dict in state_map.values() for node in component_dict.values()})
+        start_time, stop_time = self._get_scope_time_range(None, None)
+        _, signals = self._read_scope_arrays(nodes, max(start_time, stop_time - self._get_remote_sim_time('dt')), stop_time, 0, np.float64)
+        self.warm_start_state = {component_name: {key: float(signals[node][-1]) for key, node in component_dict.items() if node in signals}
+                                 for component_name, component_dict in state_map.items()}
+        logger.debug(f'End state: {self.warm_start_state}')
+        return self.warm_start_state
+
+    def reset_warm_start(self) -> None:
+        """
+        Forget the end state of the previous run and restore the initial conditions which the warm starts have overwritten.
+
+        The next run_warm_start_simulation() or run_simulation() starts cold from the values before the first warm start.
+        """
+        for component_name, component_dict in self._warm_start_file_values.items():
+            self.set_component_values(component_name, component_dict)
+        self._warm_start_file_values = {}
+        self.warm_start_state = {}
+        self._cold_run_time = None
+
     # -----------------------------------
     # working with global parameters
     # -----------------------------------
 
+    @_phase('set_parameters')
     def set_global_parameters(self, params_dict: Dict, save_file: bool = False) -> None:
         """
         Set the values for the declared and defined global parameters specific to the opened .ipes file.
@@ -253,16 +707,23 @@ class GeckoSimulation:
 
         """
         for key, value in params_dict.items():
+            if not isinstance(key, str) or not isinstance(value, (float, int)):
+                continue
+            key = key if '$' in key else '$' + key
+            if self._shadow_global_parameters.get(key) == value:
+                continue
+            # component parameters may be defined by global parameters
+            self._shadow_component_values.clear()
+            self._shadow_global_parameters.pop(key, None)
             try:
-                if isinstance(key, str) and isinstance(value, (float, int)) and '$' not in key:
-                    self.ginst.setGlobalParameterValue('$'+key, value)
-                elif isinstance(key, str) and isinstance(value, (float, int)) and '$' in key:
-                    self.ginst.setGlobalParameterValue(key, value)
-            except jnius.JavaException as e:
-                logger.error('Failed!:', e.innermessage)
+                self.ginst.setGlobalParameterValue(key, value)
+                self._shadow_global_parameters[key] = value
+            except self.JavaException as e:
+                logger.error(f'Failed!: {e.innermessage}')
         if save_file:
             self.save_file(self.simfilepath)
 
+    @_phase('get_parameters')
     def get_global_parameters(self, parameters: Union[List, str]) -> Dict:
         """
         Get the existing value of the provided global parameter variables.
@@ -284,11 +745,13 @@ class GeckoSimulation:
         
         for name in parameter_list:
             try:
-                parameter_value = self.ginst.getGlobalParameterValue('$'+name)
+                if '$' + name not in self._shadow_global_parameters:
+                    self._shadow_global_parameters['$' + name] = self.ginst.getGlobalParameterValue('$' + name)
+                parameter_value = self._shadow_global_parameters['$' + name]
                 parameter_dict[name] = parameter_value
                 logger.debug(f'{name} = {parameter_value}')
-            except jnius.JavaException as e:
-                logger.error('Failed!:', e.innermessage)
+            except self.JavaException as e:
+                logger.error(f'Failed!: {e.innermessage}')
         return parameter_dict
     
     def get_sim_time(self) -> Tuple:
@@ -298,10 +761,10 @@ class GeckoSimulation:
         :return: simtime, timestep
         :rtype: Tuple
         """
-        simtime = self.ginst.get_Tend()
-        timestep = self.ginst.get_dt()
-        simtime_pre = self.ginst.get_Tend_pre()
-        timestep_pre = self.ginst.get_dt_pre()
+        simtime = self._get_remote_sim_time('Tend')
+        timestep = self._get_remote_sim_time('dt')
+        simtime_pre = self._get_remote_sim_time('Tend_pre')
+        timestep_pre = self._get_remote_sim_time('dt_pre')
 
         logger.debug(f"read simtime: {simtime} s")
         logger.debug(f"read timestep: {timestep} s")
@@ -328,7 +791,34 @@ class GeckoSimulation:
             self.timestep = timestep
         self.simtime_pre = self.simtime_pre if simtime_pre is None else simtime_pre
         self.timestep_pre = self.timestep_pre if timestep_pre is None else timestep_pre
-    
+
+    def _get_remote_sim_time(self, name: str) -> float:
+        """
+        Return a simulation time setting of GeckoCIRCUITS, read only once per opened file.
+
+        :param name: 'dt', 'Tend', 'dt_pre' or 'Tend_pre'
+        :type name: str
+        :return: value
+        :rtype: float
+        """
+        if name not in self._shadow_sim_time:
+            self._shadow_sim_time[name] = getattr(self.ginst, f'get_{name}')()
+        return self._shadow_sim_time[name]
+
+    def _set_remote_sim_time(self, name: str, value: float) -> None:
+        """
+        Set a simulation time setting of GeckoCIRCUITS, if it differs from the mirrored value.
+
+        :param name: 'dt', 'Tend', 'dt_pre' or 'Tend_pre'
+        :type name: str
+        :param value: value
+        :type value: float
+        """
+        if self._shadow_sim_time.get(name) != value:
+            self._shadow_sim_time.pop(name, None)
+            getattr(self.ginst, f'set_{name}')(value)
+            self._shadow_sim_time[name] = value
+
     # -----------------------------------
     # working with standard components (R, L, C, ...)
     # -----------------------------------
@@ -338,6 +828,7 @@ class GeckoSimulation:
         Return the string list of all component names.
 
         This function is typically not used by the user. Helper-method for get_component_values()
+        The keys are read only once per component and opened file.
 
         :param component_name: the name of the component (ex: IGBT.1)
         :type component_name: str
@@ -345,6 +836,8 @@ class GeckoSimulation:
         :return: list of all the accessible component parameter keys
         :rtype: List
         """
+        if component_name.upper() in self._shadow_component_keys:
+            return list(self._shadow_component_keys[component_name.upper()])
         properties = []
         property_keys = []
         properties = self.ginst.getAccessibleParameters(component_name)
@@ -352,8 +845,10 @@ class GeckoSimulation:
         logger.debug(f'Component {component_name} has parameters: {properties}')
         for param in properties:
             property_keys.append(param.split("\t")[0])
-        return property_keys
+        self._shadow_component_keys[component_name.upper()] = property_keys
+        return list(property_keys)
 
+    @_phase('get_parameters')
     def get_component_values(self, component_name: str) -> Dict:
         """
         Return the values of the component parameters.
@@ -373,16 +868,45 @@ class GeckoSimulation:
         !NOTE!: all designators and indizees must be chosen with capital letters in the .ipes file
         """
         component_params = self.get_component_keys(component_name.upper())
-        values = {}
+        values = self._shadow_component_values.setdefault(component_name.upper(), {})
         for param in component_params:
-            values[param] = self.ginst.getParameter(component_name.upper(), param)
+            if param not in values:
+                values[param] = self.ginst.getParameter(component_name.upper(), param)
         logger.debug(values)
-        return values
+        return {param: values[param] for param in component_params}
+
+    def _send_component_values(self, component_name: str, component_dict: Dict) -> None:
+        """
+        Send the parameters of a component which differ from the mirrored values, in a single call.
+
+        :param component_name: name of the component, as used by GeckoCIRCUITS
+        :type component_name: str
+        :param component_dict: parameter keys and values
+        :type component_dict: Dict
+        """
+        mirrored = self._shadow_component_values.setdefault(component_name.upper(), {})
+        changed = {key: value for key, value in component_dict.items() if key not in mirrored or mirrored[key] != value}
+        if not changed:
+            return
+        # the state of these parameters is unknown if the call fails
+        for key in changed:
+            mirrored.pop(key, None)
+        self.ginst.setParameters(component_name, list(changed.keys()), list(changed.values()))
+        mirrored.update(changed)
+        if self.verify:
+            for key, value in changed.items():
+                mirrored[key] = self.ginst.getParameter(component_name.upper(), key)
+                if mirrored[key] != value:
+                    logger.error(f'Error! {key} of {component_name} can be a global parameter as value could not be updated')
     
+    @_phase('set_parameters')
     def set_component_values(self, component_name: str, component_dict: Dict) -> None:
         """
         Set the values for the configurable parameters of selected component other than switches.
 
+        Only the values which differ from the mirrored state are sent, see the class description. With verify=True, they
+        are read back and an error is logged for every parameter which did not take the value.
+
         :param component_name: name of the selected component that needs to be configured
         :param component_dict: the key value pairs that need to be set on the selected component
         :raises KeyError: if invalid keys are provided as the component parameters
@@ -395,21 +919,10 @@ class GeckoSimulation:
 
         !NOTE!: all designators and indizees must be chosen with capital letters in the .ipes file
         """
-        existing_pairs = self.get_component_values(component_name.upper())
-
         input_keys = list(component_dict.keys())
-        valid_keys = list(existing_pairs.keys())
+        valid_keys = self.get_component_keys(component_name.upper())
         if set(input_keys).issubset(valid_keys):
-            keys_to_check = {}
-            for key, value in component_dict.items():
-                if existing_pairs[key] != value:
-                    keys_to_check[key] = existing_pairs[key]
-            values = list(component_dict.values())
-            self.ginst.setParameters(component_name, input_keys, values)
-            new_pairs = self.get_component_values(component_name.upper())
-            for key, value in keys_to_check.items():
-                if new_pairs[key] == value:
-                    logger.error(f'Error! {key} of {component_name} can be a global parameter as value could not be updated')
+            self._send_component_values(component_name, component_dict)
         else:
             msg = 'Invalid keys provided for the selected component'
             raise KeyError(msg)
@@ -417,6 +930,7 @@ class GeckoSimulation:
     # -----------------------------------
     # working with switches (mosfet, igbt)
     # -----------------------------------
+    @_phase('set_parameters')
     def set_switch_values(self, sw_type: str, component_name: str, switch_key_value_dict: dict) -> None:
         """
         Set the configuration parameters of the selected switch type. Only switch types of mosfet/igbt/diode are allowed.
@@ -434,15 +948,15 @@ class GeckoSimulation:
         try:
             if config_items:
                 if set(input_keys).issubset(config_items):
-                    values = list(switch_key_value_dict.values())
-                    self.ginst.setParameters(component_name, input_keys, values)
+                    self._send_component_values(component_name, switch_key_value_dict)
                 else:
                     msg = 'Invalid keys are provided'
-                    logger.warning(f'Available settings for {sw_type} :', config_items)
+                    logger.warning(f'Available settings for {sw_type} : {config_items}')
                     raise KeyError(msg)
-        except jnius.JavaException as e:
-            logger.error('Failed: ', e.innermessage)
+        except self.JavaException as e:
+            logger.error(f'Failed: {e.innermessage}')
 
+    @_phase('set_parameters')
     def set_loss_file(self, component_names: Union[str, List], loss_file_path: str) -> None:
         """
         Set the total loss file to the selected switch. Location of the SCL files is required for loading them into the switches.
@@ -462,14 +976,14 @@ class GeckoSimulation:
             raise Exception(f'Loss file path "{loss_file_path}" does not exist!')
 
         component_names = [component_names] if isinstance(component_names, str) else component_names
-        available_components = self.ginst.getCircuitElements()
+        available_components = self._get_elements('getCircuitElements')
         if set(component_names).issubset(available_components):
-            for name in component_names:
-                self.ginst.doOperation(name, "setLossFile", loss_file_path)
+            self._load_file(component_names, "setLossFile", loss_file_path)
         else:
             msg = 'Not all provided component names exists!'
             raise Exception(msg)
 
+    @_phase('set_parameters')
     def set_nonlinear_file(self, capacitor_names: Union[str, List], loss_file_path: str) -> None:
         """
         Set the nonlinear loss file to the selected capacitor. Location of the NLC files is required for loading them into the capacitances.
@@ -489,14 +1003,46 @@ class GeckoSimulation:
             raise Exception(f'Loss file path "{loss_file_path}" does not exist!')
 
         capacitor_names = [capacitor_names] if isinstance(capacitor_names, str) else capacitor_names
-        available_capacitors = self.ginst.getCapacitors()
+        available_capacitors = self._get_elements('getCapacitors')
         if set(capacitor_names).issubset(available_capacitors):
-            for name in capacitor_names:
-                self.ginst.doOperation(name, "setNonLinear", loss_file_path)
+            self._load_file(capacitor_names, "setNonLinear", loss_file_path)
         else:
             msg = f'{capacitor_names} not all part of {available_capacitors}!'
             raise Exception(msg)
 
+    def _get_elements(self, method: str) -> List[str]:
+        """
+        Return the names of the circuit elements, read only once per opened file.
+
+        :param method: 'getCircuitElements' or 'getCapacitors'
+        :type method: str
+        :return: names of the elements
+        :rtype: List[str]
+        """
+        if method not in self._shadow_elements:
+            self._shadow_elements[method] = list(getattr(self.ginst, method)())
+        return self._shadow_elements[method]
+
+    def _load_file(self, component_names: List[str], operation: str, file_path: str) -> None:
+        """
+        Load a file into components, skipping components which already loaded the unchanged file.
+
+        :param component_names: names of the components
+        :type component_names: List[str]
+        :param operation: 'setLossFile' or 'setNonLinear'
+        :type operation: str
+        :param file_path: absolute path of the file
+        :type file_path: str
+        """
+        # a rewritten file with the same name is loaded again
+        loaded = (file_path, os.path.getmtime(file_path))
+        for name in component_names:
+            if self._shadow_files.get((name, operation)) != loaded:
+                self._shadow_files.pop((name, operation), None)
+                self._shadow_component_values.pop(name.upper(), None)
+                self.ginst.doOperation(name, operation, file_path)
+                self._shadow_files[(name, operation)] = loaded
+
     def get_switch_keys(self, sw_type: str) -> List:
         """
         Configure switch method to set the properties of the selected switch type. This function does _not_ interact with geckoCircuits.
@@ -524,12 +1070,196 @@ class GeckoSimulation:
     # working with signals (scope)
     # -----------------------------------
 
+    def _get_scope_time_range(self, start_time: Optional[float], stop_time: Optional[float]) -> Tuple[float, float]:
+        """
+        Convert the start and stop time of the scope data to the time axis of GeckoCIRCUITS, which includes the pre-simulation.
+
+        :param start_time: the time from where the data needs to be recorded. Defaults to 0 s.
+        :type start_time: float
+        :param stop_time: the time at which the data recording stops. Defaults to end of simulation time.
+        :type stop_time: float
+        :return: start_time, stop_time as used by GeckoCIRCUITS
+        :rtype: Tuple[float, float]
+        """
+        simtime_pre = self._get_remote_sim_time('Tend_pre') + self.data_offset
+        stop_time = stop_time if stop_time and stop_time > 0 else self._get_remote_sim_time('Tend')
+        stop_time = stop_time + simtime_pre - 2 * self._get_remote_sim_time('dt')
+        start_time = start_time if start_time and start_time < stop_time else 0
+        start_time = start_time + simtime_pre
+        return start_time, stop_time
+
+    @_phase('data_extraction')
+    def get_scope_arrays(self, node_names: Union[List, str], start_time: float = None, stop_time: float = None,
+                         skip_points: int = 0, dtype: type = np.float64) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Get the data from the scope as numpy arrays, without creating a DataFrame or a csv file.
+
+        Every signal is transferred once and converted directly into a preallocated array. All signals share the same
+        time vector, which is always float64 to keep the time resolution of long simulations.
+
+        :param node_names: the name provided to the scope nodes, e.g. ["v1", "i_l_1"]
+        :type node_names: List[str] or str
+        :param start_time: the time from where the data needs to be recorded. Defaults to 0 s.
+        :type start_time: float
+        :param stop_time: the time at which the data recording stops. Defaults to end of simulation time.
+        :type stop_time: float
+        :param skip_points: the length of points that needs to be skipped (ex: skip_points = 2 means data is recorded after every 2 data points)
+        :type skip_points: int
+        :param dtype: data type of the signal arrays, e.g. np.float32 to halve the memory. Default np.float64
+        :type dtype: type
+
+        :return: time, dict of node names and signal arrays. Nodes without data are not part of the dict.
+        :rtype: Tuple[np.ndarray, Dict[str, np.ndarray]]
+
+        :Example:
+
+        >>> import pygeckocircuits2 as pgc
+        >>> buck_converter = pgc.GeckoSimulation('path/to/gecko_file.ipes')
+        >>> buck_converter.run_simulation()
+        >>> time, signals = buck_converter.get_scope_arrays(['i_L', 'v_LS'], dtype=np.float32)
+        """
+        node_names = [node_names] if isinstance(node_names, str) else node_names
+        start_time, stop_time = self._get_scope_time_range(start_time, stop_time)
+        return self._read_scope_arrays(node_names, start_time, stop_time, skip_points, dtype)
+
+    def iter_scope_data(self, node_names: Union[List, str], chunk_points: int = 1000000, start_time: float = None,
+                        stop_time: float = None, skip_points: int = 0, dtype: type = np.float64) -> Iterator[Tuple[np.ndarray, Dict[str, np.ndarray]]]:
+        """
+        Get the data from the scope in chunks of a fixed number of points, so the memory stays bounded for long simulations.
+
+        The time range is the same as for get_scope_data() and get_scope_arrays(). Every chunk is requested separately from
+        GeckoCIRCUITS, chunk boundaries are aligned to skip_points and no point is delivered twice.
+
+        :param node_names: the name provided to the scope nodes, e.g. ["v1", "i_l_1"]
+        :type node_names: List[str] or str
+        :param chunk_points: number of points per chunk (after skipping points). Default 1e6
+        :type chunk_points: int
+        :param start_time: the time from where the data needs to be recorded. Defaults to 0 s.
+        :type start_time: float
+        :param stop_time: the time at which the data recording stops. Defaults to end of simulation time.
+        :type stop_time: float
+        :param skip_points: the length of points that needs to be skipped (ex: skip_points = 2 means data is recorded after every 2 data points)
+        :type skip_points: int
+        :param dtype: data type of the signal arrays, e.g. np.float32 to halve the memory. Default np.float64
+        :type dtype: type
+
+        :return: generator of (time, dict of node names and signal arrays) per chunk
+        :rtype: Iterator[Tuple[np.ndarray, Dict[str, np.ndarray]]]
+
+        :Example:
+
+        >>> import pygeckocircuits2 as pgc
+        >>> buck_converter = pgc.GeckoSimulation('path/to/gecko_file.ipes')
+        >>> buck_converter.run_simulation()
+        >>> pgc.write_scope_csv(buck_converter.iter_scope_data(['i_L', 'v_LS'], chunk_points=100000), 'scope_data')
+        """
+        node_names = [node_names] if isinstance(node_names, str) else node_names
+        start_time, stop_time = self._get_scope_time_range(start_time, stop_time)
+        chunk_time = chunk_points * (skip_points + 1) * self._get_remote_sim_time('dt')
+        last_time = None
+        chunk_start = start_time
+        while chunk_start < stop_time:
+            chunk_stop = min(chunk_start + chunk_time, stop_time)
+            time, signals = self._read_scope_arrays(node_names, chunk_start, chunk_stop, skip_points, dtype)
+            if not signals:
+                return
+            # only the nodes with data in the first chunk are requested again
+            node_names = list(signals)
+            if last_time is not None:
+                # the boundary point of two chunks is part of both requests
+                new_points = time > last_time
+                time = time[new_points]
+                signals = {node: values[new_points] for node, values in signals.items()}
+            if len(time) > 0:
+                last_time = time[-1]
+                yield time, signals
+            chunk_start = chunk_stop
+
+    def get_scope_preview(self, node_names: Union[List, str], points: int = 5000, method: str = 'minmax', start_time: float = None,
+                          stop_time: float = None, chunk_points: int = 1000000) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """
+        Get a decimated version of the scope signals with about the given number of points per signal, keeping the peaks.
+
+        In contrast to skip_points, no switching spike is lost: 'minmax' keeps the minimum and the maximum of every section
+        of the signal, so max/min checks of the preview give the values of the full signal. 'lttb' follows the visual shape
+        more closely. The data is read in chunks of chunk_points and reduced chunk by chunk, see decimate_scope_data().
+
+        :param node_names: the name provided to the scope nodes, e.g. ["v1", "i_l_1"]
+        :type node_names: List[str] or str
+        :param points: target number of points per signal
+        :type points: int
+        :param method: 'minmax' or 'lttb'
+        :type method: str
+        :param start_time: the time from where the data needs to be recorded. Defaults to 0 s.
+        :type start_time: float
+        :param stop_time: the time at which the data recording stops. Defaults to end of simulation time.
+        :type stop_time: float
+        :param chunk_points: number of points per transferred chunk, limits the memory. Default 1e6
+        :type chunk_points: int
+        :return: dict of node names to (time, values). The time vectors differ from signal to signal.
+        :rtype: Dict[str, Tuple[np.ndarray, np.ndarray]]
+
+        :Example:
+
+        >>> import pygeckocircuits2 as pgc
+        >>> buck_converter = pgc.GeckoSimulation('path/to/gecko_file.ipes')
+        >>> buck_converter.run_simulation()
+        >>> preview = buck_converter.get_scope_preview(['i_L', 'v_LS'], points=5000)
+        >>> time, i_L = preview['i_L']
+        """
+        node_names = [node_names] if isinstance(node_names, str) else node_names
+        range_start, range_stop = self._get_scope_time_range(start_time, stop_time)
+        length = int((range_stop - range_start) / self._get_remote_sim_time('dt')) + 1
+        chunks = self.iter_scope_data(node_names, chunk_points, start_time, stop_time)
+        return decimate_scope_data(chunks, points, length, method)
+
+    @_phase('data_extraction')
+    def _read_scope_arrays(self, node_names: List[str], start_time: float, stop_time: float, skip_points: int,
+                           dtype: type) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Transfer the scope data of the given time range (time axis of GeckoCIRCUITS) into numpy arrays.
+
+        :param node_names: the name provided to the scope nodes
+        :type node_names: List[str]
+        :param start_time: start time including the pre-simulation time
+        :type start_time: float
+        :param stop_time: stop time including the pre-simulation time
+        :type stop_time: float
+        :param skip_points: the length of points that needs to be skipped
+        :type skip_points: int
+        :param dtype: data type of the signal arrays
+        :type dtype: type
+        :return: time, dict of node names and signal arrays
+        :rtype: Tuple[np.ndarray, Dict[str, np.ndarray]]
+        """
+        # one buffer for all signals, sized by the first signal, the dict values are views on its rows. Every signal is
+        # copied into its row at once, so only one transferred list is alive at a time.
+        data = None
+        time = np.empty(0)
+        signals = {}
+        for node in node_names:
+            values = self.ginst.getSignalData(node, start_time, stop_time, skip_points)
+            if len(values) == 0:
+                logger.warning(f'No scope data for node {node}')
+                continue
+            if data is None:
+                data = np.empty((len(node_names), len(values)), dtype=dtype)
+                time = np.array(self.ginst.getTimeArray(node, start_time, stop_time, skip_points), dtype=np.float64)
+            data[len(signals)] = values
+            signals[node] = data[len(signals)]
+            del values
+        return time, signals
+
+    @_phase('data_extraction')
     def get_scope_data(self, node_names: Union[List, str], file_name: str, start_time: float = None,
-                       stop_time: float = None, skip_points: int = 0) -> pd.DataFrame:
+                       stop_time: float = None, skip_points: int = 0, file_format: str = 'csv', dtype: type = np.float64,
+                       compress: bool = False, implicit_time: bool = False) -> 'pd.DataFrame':
         """
         Get the data from the scope that has been recorded after the corresponding simulation.
 
-        The data with respect to specified scope nodes are extracted and save to csv file locally.
+        The data with respect to specified scope nodes are extracted and save to csv file locally, or to a binary file
+        (see write_scope_file()) which can be read back by ScopeFile. Use get_scope_arrays() to get the data as numpy
+        arrays without a file, and write_scope_file() to write a binary file without a DataFrame.
 
         :param node_names: the name provided to the scope nodes, e.g. ["v1", "i_l_1"]
         :type node_names: List[str] or str
@@ -541,57 +1271,60 @@ class GeckoSimulation:
         :type stop_time: float
         :param skip_points: the length of points that needs to be skipped (ex: skip_points = 2 means data is recorded after every 2 data points)
         :type skip_points: int
+        :param file_format: 'csv' (space-separated text, default), or 'npz', 'npy', 'hdf5', 'parquet', see write_scope_file()
+        :type file_format: str
+        :param dtype: data type of the signals, e.g. np.float32 to halve the size. Default np.float64
+        :type dtype: type
+        :param compress: True for lossless compression of the binary formats
+        :type compress: bool
+        :param implicit_time: True to store start and step of the time vector instead of the vector, binary formats only
+        :type implicit_time: bool
+
+        :return: scope data with a 'time' column and one column per node. Empty DataFrame in case of no data.
+        :rtype: pd.DataFrame
 
-        :return: None
-        :rtype: None
+        :Example:
+
+        >>> import numpy as np
+        >>> import pygeckocircuits2 as pgc
+        >>> buck_converter = pgc.GeckoSimulation('path/to/gecko_file.ipes')
+        >>> buck_converter.run_simulation()
+        >>> buck_converter.get_scope_data(['i_L', 'v_LS'], 'scope_data', file_format='npz', dtype=np.float32, compress=True, implicit_time=True)
+        >>> i_L = pgc.ScopeFile('scope_data').signal('i_L')
         """
-        stop_time = stop_time if stop_time and stop_time > 0 else self.ginst.get_Tend()
-        stop_time = stop_time + self.ginst.get_Tend_pre() - 2 * self.ginst.get_dt()
-        start_time = start_time if start_time and start_time < stop_time else 0
-        start_time = start_time + self.ginst.get_Tend_pre()
-        data = {}
-        if isinstance(node_names, list):
-            for node in node_names:
-                data[node] = self.ginst.getSignalData(node, start_time, stop_time, skip_points)
-                if data[node] == []:
-                    del data[node]
-        if data:
-            time = self.ginst.getTimeArray(list(data.keys())[0], start_time, stop_time, skip_points)
-            df = pd.DataFrame(data)
+        import pandas as pd
+        time, signals = self.get_scope_arrays(node_names, start_time, stop_time, skip_points, dtype)
+        if signals:
+            df = pd.DataFrame(signals)
             df.insert(0, 'time', time)
-            df.to_csv(path_or_buf=file_name+'.csv', encoding='utf-8', index=False, sep=' ', header=True)
+            if file_format == 'csv':
+                df.to_csv(path_or_buf=file_name+'.csv', encoding='utf-8', index=False, sep=' ', header=True)
+            else:
+                write_scope_file(time, signals, file_name, file_format, compress=compress, implicit_time=implicit_time)
         else:
             df = pd.DataFrame()
             logger.warning('No scope data. Nothing to be saved')
 
         return df
 
-    def get_values(self, nodes: Union[List, str], operations: Union[List, str],
-                   range_start_stop: List[Union[float, str]] = None) -> Dict:
+    def _get_value_range(self, range_start_stop: Optional[List[Union[float, str]]]) -> Tuple[float, float]:
         """
-        Provide the applicable mean, rms, THD, ripple, Max, Min operations on the selected field that is being provided as a node to the scope.
+        Convert the range of get_values() to start and end time on the time axis of GeckoCIRCUITS.
 
-        :param nodes: node names located on the scopes
-        :type nodes: name of the signal that is provided as node to the scope block
-        :param operations: Mean/RMS/THD/Ripple/Max/Min/Shape operations on the selected signals.
-            Multiple operations can be provided as a list
-        :type operations: List or str
-        :param range_start_stop: the range of the data that needs to be considered for applying the mentioned 
+        :param range_start_stop: the range of the data that needs to be considered for applying the mentioned
             operations (ex: [10e-3, start] considers data from 0 to 10e-3)
         :type range_start_stop: [float, str] or [float, float]
-
-        :return: returns operation specific dict data (ex: operations = [mean, rms] expected returns:
-             return_dict =  {'mean': {'signal_1': mean_signal_1, 'signal_2': mean_signal_2}, 
-             'rms': {'signal_1': rms_signal_1, 'signal_2': rms_signal_2}}
-        :rtype: Dict
+        :raises Exception: in case of an invalid range
+        :return: start, end
+        :rtype: Tuple[float, float]
         """
-        nodes = [nodes] if isinstance(nodes, str) else nodes
-        operations = [operations] if isinstance(operations, str) else operations
+        simtime_pre = self._get_remote_sim_time('Tend_pre') + self.data_offset
+        dt = self._get_remote_sim_time('dt')
         # Calculation of start and end time of useful data with respect to pre-simulation and simulation times
         # Note that the very first datapoint is mostly useless therefore we skipp the dt time at start
-        data_start_time = self.ginst.get_Tend_pre() + self.ginst.get_dt()
+        data_start_time = simtime_pre + dt
         # The end time is often shorter in Geckos own data analysis, therefore subtracting 2*dt as Gecko did
-        data_end_time = self.ginst.get_Tend_pre() + self.ginst.get_Tend() - 2 * self.ginst.get_dt()
+        data_end_time = simtime_pre + self._get_remote_sim_time('Tend') - 2 * dt
         range_start_stop = [data_start_time, data_end_time] if range_start_stop is None else range_start_stop
         try:
             if len(range_start_stop) > 2 or isinstance(range_start_stop[0], str) or abs(range_start_stop[0]) > data_end_time:
@@ -619,6 +1352,31 @@ class GeckoSimulation:
         except Exception as e:
             logger.error('Recheck the range format or time length')
             raise
+        return start, end
+
+    @_phase('data_extraction')
+    def get_values(self, nodes: Union[List, str], operations: Union[List, str],
+                   range_start_stop: List[Union[float, str]] = None) -> Dict:
+        """
+        Provide the applicable mean, rms, THD, ripple, Max, Min operations on the selected field that is being provided as a node to the scope.
+
+        :param nodes: node names located on the scopes
+        :type nodes: name of the signal that is provided as node to the scope block
+        :param operations: Mean/RMS/THD/Ripple/Max/Min/Shape operations on the selected signals.
+            Multiple operations can be provided as a list
+        :type operations: List or str
+        :param range_start_stop: the range of the data that needs to be considered for applying the mentioned 
+            operations (ex: [10e-3, start] considers data from 0 to 10e-3)
+        :type range_start_stop: [float, str] or [float, float]
+
+        :return: returns operation specific dict data (ex: operations = [mean, rms] expected returns:
+             return_dict =  {'mean': {'signal_1': mean_signal_1, 'signal_2': mean_signal_2}, 
+             'rms': {'signal_1': rms_signal_1, 'signal_2': rms_signal_2}}
+        :rtype: Dict
+        """
+        nodes = [nodes] if isinstance(nodes, str) else nodes
+        operations = [operations] if isinstance(operations, str) else operations
+        start, end = self._get_value_range(range_start_stop)
         operators = {'mean': lambda name, s_time, e_time: self.ginst.getSignalAvg(name, s_time, e_time),
                      'rms': lambda name, s_time, e_time: self.ginst.getSignalRMS(name, s_time, e_time),
                      'max': lambda name, s_time, e_time: self.ginst.getSignalMax(name, s_time, e_time),
@@ -635,7 +1393,7 @@ class GeckoSimulation:
                         signal_value = operators[operation_key.lower()](signal_node, start, end)
                         logger.debug(f"{operation_key} of {signal_node} : {signal_value}")
                         data[operation_key][signal_node] = signal_value
-                    except jnius.JavaException:
+                    except self.JavaException:
                         pass
         except KeyError as e:
             msg = 'Invalid operator: '+e.args[0]
@@ -643,6 +1401,159 @@ class GeckoSimulation:
         else:
             return data
 
+    @_phase('data_extraction')
+    def get_values_local(self, nodes: Union[List, str], operations: Union[List, str],
+                         range_start_stop: List[Union[float, str]] = None) -> Dict:
+        """
+        Provide the same operations as get_values(), but calculated in python from a single transfer of every signal.
+
+        get_values() needs one call to GeckoCIRCUITS for every operation and node, each one scanning the signal again. Here
+        every signal is transferred once and all operations are calculated for all nodes in one vectorized pass.
+        See signalAnalysis.calculate_values() for the definitions of the operations.
+
+        :param nodes: node names located on the scopes
+        :type nodes: List[str] or str
+        :param operations: Mean/RMS/THD/Ripple/Max/Min/Shape operations on the selected signals.
+            Multiple operations can be provided as a list
+        :type operations: List or str
+        :param range_start_stop: the range of the data that needs to be considered for applying the mentioned
+            operations (ex: [10e-3, start] considers data from 0 to 10e-3), see get_values()
+        :type range_start_stop: [float, str] or [float, float]
+
+        :return: returns operation specific dict data, see get_values()
+        :rtype: Dict
+        """
+        nodes = [nodes] if isinstance(nodes, str) else nodes
+        start, end = self._get_value_range(range_start_stop)
+        time, signals = self._read_scope_arrays(nodes, start, end, 0, np.float64)
+        return calculate_values(time, signals, operations)
+
+    @_phase('data_extraction')
+    def get_window_values(self, nodes: Union[List, str], operations: Union[List, str], windows: List[List[float]] = None,
+                          period: float = None, frequency_parameter: str = None, edge_node: str = None, threshold: float = None,
+                          as_dataframe: bool = False) -> Union[Tuple[np.ndarray, np.ndarray], 'pd.DataFrame']:
+        """
+        Calculate the operations of get_values() for many time windows at once, e.g. for every switching period.
+
+        Every signal is transferred once, all windows are evaluated in one vectorized pass by
+        signalAnalysis.calculate_window_values(). Times are counted from the start of the evaluated data, i.e. after
+        the pre-simulation, as start_time and stop_time of get_scope_data(). Provide one of the window definitions
+        windows, period, frequency_parameter or edge_node.
+
+        :param nodes: node names located on the scopes
+        :type nodes: List[str] or str
+        :param operations: Mean/RMS/THD/Ripple/Max/Min/Shape operations on the selected signals
+        :type operations: List or str
+        :param windows: explicit windows, e.g. [[0, 1e-3], [5e-3, 6e-3]]
+        :type windows: List[List[float]]
+        :param period: split the complete data into windows of this length
+        :type period: float
+        :param frequency_parameter: name of a global parameter with a frequency, e.g. 'f_s'. The windows are its periods.
+        :type frequency_parameter: str
+        :param edge_node: node name of a signal with edges, e.g. a gate signal. The windows lie between rising edges.
+        :type edge_node: str
+        :param threshold: level of the edge detection of edge_node. Default None: middle between minimum and maximum
+        :type threshold: float
+        :param as_dataframe: True to return a tidy DataFrame with the columns 'window', 'start', 'stop', 'node',
+            'operation' and 'value'
+        :type as_dataframe: bool
+        :raises Exception: if no window definition is given, or no data is found
+        :return: values of shape (windows, nodes, operations) and windows of shape (windows, 2), or the tidy DataFrame
+        :rtype: Tuple[np.ndarray, np.ndarray] or pd.DataFrame
+
+        :Example:
+
+        >>> import pygeckocircuits2 as pgc
+        >>> buck_converter = pgc.GeckoSimulation('path/to/gecko_file.ipes')
+        >>> buck_converter.run_simulation()
+        >>> df = buck_converter.get_window_values(['i_L'], ['mean', 'ripple'], frequency_parameter='f_s', as_dataframe=True)
+        """
+        nodes = [nodes] if isinstance(nodes, str) else nodes
+        operations = [operations] if isinstance(operations, str) else operations
+        start_time, stop_time = self._get_scope_time_range(None, None)
+        request_nodes = nodes + [edge_node] if edge_node is not None and edge_node not in nodes else nodes
+        time, signals = self._read_scope_arrays(request_nodes, start_time, stop_time, 0, np.float64)
+        if not signals:
+            raise Exception(f'No scope data for the nodes {nodes}')
+        # count the time from the start of the evaluated data
+        time = time - start_time
+
+        if windows is not None:
+            windows = np.asarray(windows, dtype=np.float64).reshape(-1, 2)
+        elif period is not None:
+            windows = period_windows(0, time[-1], period)
+        elif frequency_parameter is not None:
+            windows = period_windows(0, time[-1], 1 / self.get_global_parameters(frequency_parameter)[frequency_parameter])
+        elif edge_node is not None:
+            windows = edge_windows(time, signals[edge_node], threshold)
+        else:
+            raise Exception('Provide windows, period, frequency_parameter or edge_node')
+
+        signals = {node: signals[node] for node in nodes if node in signals}
+        values = calculate_window_values(time, signals, windows, operations)
+        if as_dataframe:
+            return window_values_to_dataframe(values, windows, list(signals), operations)
+        return values, windows
+
+    @_phase('data_extraction')
+    def get_spectrum(self, nodes: Union[List, str], fundamental: float = None, frequency_parameter: str = 'f_s', periods: int = None,
+                     harmonics: int = 50, bands: List[Tuple[float, float]] = None,
+                     range_start_stop: List[Union[float, str]] = None) -> Dict:
+        """
+        Calculate the harmonic spectrum of many signals: amplitudes and phases of the harmonics, THD and power per frequency band.
+
+        The signals are transferred once and analyzed over an integer number of periods of the fundamental at the end of
+        the range, by a single FFT for all nodes, see signalAnalysis.fourier_coefficients(). The Fourier coefficients are
+        kept until the next simulation run, so further queries of the same nodes and range, e.g. with other harmonics or
+        bands, do not transfer any data. The phases refer to the start of the evaluated data, after the pre-simulation.
+
+        :param nodes: node names located on the scopes
+        :type nodes: List[str] or str
+        :param fundamental: fundamental frequency in Hz. Default None: value of the global parameter frequency_parameter
+        :type fundamental: float
+        :param frequency_parameter: name of the global parameter with the fundamental frequency, used if fundamental is None
+        :type frequency_parameter: str
+        :param periods: number of periods to analyze. Default None: all complete periods of the range
+        :type periods: int
+        :param harmonics: highest harmonic order of the amplitudes and phases
+        :type harmonics: int
+        :param bands: frequency bands as (lower, upper) frequency in Hz, e.g. [(150e3, 30e6)]. Default None: no bands
+        :type bands: List[Tuple[float, float]]
+        :param range_start_stop: range of the data, see get_values()
+        :type range_start_stop: [float, str] or [float, float]
+        :return: result of signalAnalysis.harmonic_spectrum() with the additional keys 'fundamental' and 'periods'
+        :rtype: Dict
+
+        :Example:
+
+        >>> import pygeckocircuits2 as pgc
+        >>> buck_converter = pgc.GeckoSimulation('path/to/gecko_file.ipes')
+        >>> buck_converter.run_simulation()
+        >>> spectrum = buck_converter.get_spectrum(['i_L', 'v_LS'], harmonics=20, bands=[(150e3, 30e6)])
+        >>> spectrum['amplitude']['i_L'][1], spectrum['thd']['v_LS'], spectrum['band_power']['v_LS']
+        """
+        nodes = [nodes] if isinstance(nodes, str) else nodes
+        if fundamental is None:
+            fundamental = self.get_global_parameters(frequency_parameter)[frequency_parameter]
+        start, end = self._get_value_range(range_start_stop)
+        if periods is not None:
+            # transfer only the analyzed periods and two time steps
+            start = max(start, end - periods / fundamental - 2 * self._get_remote_sim_time('dt'))
+        key = (fundamental, periods, start, end)
+        missing = [node for node in nodes if key + (node,) not in self._spectrum_cache]
+        if missing:
+            time, signals = self._read_scope_arrays(missing, start, end, 0, np.float64)
+            if signals:
+                time = time - (self._get_remote_sim_time('Tend_pre') + self.data_offset)
+                _, coefficients, analyzed_periods = fourier_coefficients(time, signals, fundamental, periods)
+                for node, node_coefficients in coefficients.items():
+                    self._spectrum_cache[key + (node,)] = (node_coefficients, analyzed_periods)
+        cached = {node: self._spectrum_cache[key + (node,)] for node in nodes if key + (node,) in self._spectrum_cache}
+        analyzed_periods = next(iter(cached.values()))[1] if cached else periods
+        coefficients = {node: node_coefficients for node, (node_coefficients, _) in cached.items()}
+        spectrum = harmonic_spectrum(coefficients, fundamental, analyzed_periods or 1, harmonics, bands)
+        return {**spectrum, 'fundamental': fundamental, 'periods': analyzed_periods}
+
 
 if __name__ == '__main__':
     inst = GeckoSimulation(simfilepath=r'../examples/example_Gecko.ipes')
@@ -0,0 +1,890 @@
+"""Distribute simulations to worker daemons on several machines through a coordinator with a job queue."""
+# python libraries
+import argparse
+import hashlib
+import os
+import socket
+import tempfile
+import threading
+import time
+from multiprocessing.managers import BaseManager
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Union
+import logging
+
+# 3rd party libraries
+import numpy as np
+
+# own libraries
+from pygeckocircuits2.geckoWatchdog import SupervisedGeckoSimulation
+
+logger = logging.getLogger(__name__)
+
+# environment variable with the authentication key of the coordinator, used if no key is given
+AUTHKEY_ENV = 'PYGECKOCIRCUITS2_AUTHKEY'
+DEFAULT_ADDRESS = ('127.0.0.1', 43100)
+
+
+class JobBoard:
+    """
+    Job queue of the coordinator, shared with clients and worker daemons through a BaseManager server.
+
+    Jobs are taken by the worker daemons whenever one of their GeckoCIRCUITS instances is free, so the load is balanced by
+    free instances. Every daemon sends a heartbeat. The running jobs of a daemon without heartbeat for worker_timeout
+    seconds are queued again, as are the jobs a daemon releases after a crashed instance. A job fails after max_attempts
+    tries. Errors of the simulation itself (e.g. unknown components) are returned as result and are not repeated.
+
+    A stored simulation file is kept as long as a client uses it (put_file() until release_file()) or a job refers to it.
+    """
+
+    worker_timeout: float
+    max_attempts: int
+
+    def __init__(self, worker_timeout: float = 30, max_attempts: int = 3) -> None:
+        """
+        Create an empty job board.
+
+        :param worker_timeout: time in seconds without heartbeat after which a worker daemon is considered lost
+        :type worker_timeout: float
+        :param max_attempts: maximum number of tries of a job
+        :type max_attempts: int
+        """
+        self.worker_timeout = worker_timeout
+        self.max_attempts = max_attempts
+        self._condition = threading.Condition()
+        self._next_job_id = 0
+        self._pending: List[int] = []
+        self._jobs: Dict[int, Dict] = {}
+        self._attempts: Dict[int, int] = {}
+        # running jobs by job id: worker id
+        self._running: Dict[int, str] = {}
+        self._results: Dict[int, Dict] = {}
+        self._heartbeats: Dict[str, float] = {}
+        # running jobs which were cancelled, their results are dropped
+        self._cancelled: Set[int] = set()
+        self._files: Dict[str, bytes] = {}
+        # number of clients and unfinished jobs using a file, by file hash
+        self._file_references: Dict[str, int] = {}
+
+    def put_file(self, content: bytes) -> str:
+        """
+        Store a simulation file, so worker daemons without access to the file system of the client can load it.
+
+        Every call must be followed by a release_file(), when the client does not submit further jobs with the file.
+
+        :param content: content of the .ipes file
+        :type content: bytes
+        :return: sha256 hash of the content, to be used in the jobs
+        :rtype: str
+        """
+        key = hashlib.sha256(content).hexdigest()
+        with self._condition:
+            self._files[key] = content
+            self._file_references[key] = self._file_references.get(key, 0) + 1
+        return key
+
+    def release_file(self, key: str) -> None:
+        """
+        Give back a simulation file of put_file(). It is removed when no client and no unfinished job uses it.
+
+        :param key: sha256 hash of the content
+        :type key: str
+        """
+        with self._condition:
+            self._dereference_file(key)
+
+    def _dereference_file(self, key: str) -> None:
+        """
+        Decrease the number of users of a file and remove it if there are none. Call with the lock held.
+
+        :param key: sha256 hash of the content
+        :type key: str
+        """
+        self._file_references[key] -= 1
+        if self._file_references[key] <= 0:
+            del self._file_references[key]
+            del self._files[key]
+
+    def get_file(self, key: str) -> bytes:
+        """
+        Return a stored simulation file.
+
+        :param key: sha256 hash of the content
+        :type key: str
+        :return: content of the .ipes file
+        :rtype: bytes
+        """
+        with self._condition:
+            return self._files[key]
+
+    def submit(self, job: Dict) -> int:
+        """
+        Add a job to the queue.
+
+        :param job: job dict with the keys 'file' (hash, see put_file()), 'parameters', 'nodes', 'operations',
+            'range_start_stop', 'scope_nodes', 'scope_dtype' and 'simulation_times'
+        :type job: Dict
+        :return: job id
+        :rtype: int
+        """
+        with self._condition:
+            job_id = self._next_job_id
+            self._next_job_id += 1
+            self._jobs[job_id] = job
+            self._file_references[job['file']] = self._file_references.get(job['file'], 0) + 1
+            self._attempts[job_id] = 0
+            self._pending.append(job_id)
+            self._condition.notify_all()
+        return job_id
+
+    def heartbeat(self, worker_id: str) -> None:
+        """
+        Mark a worker daemon as alive.
+
+        :param worker_id: id of the worker daemon
+        :type worker_id: str
+        """
+        with self._condition:
+            self._heartbeats[worker_id] = time.monotonic()
+
+    def _requeue_lost_jobs(self) -> None:
+        """Queue the running jobs of lost worker daemons again, or fail them after max_attempts. Call with the lock held."""
+        now = time.monotonic()
+        lost_workers = {worker_id for worker_id, last_seen in self._heartbeats.items() if now - last_seen > self.worker_timeout}
+        for worker_id in lost_workers:
+            logger.warning(f'Worker {worker_id} lost')
+            del self._heartbeats[worker_id]
+        for job_id, worker_id in list(self._running.items()):
+            if worker_id in lost_workers:
+                self._retry(job_id, f'worker {worker_id} lost')
+
+    def _retry(self, job_id: int, reason: str) -> None:
+        """
+        Queue a running job again, or fail it after max_attempts. Call with the lock held.
+
+        :param job_id: job id
+        :type job_id: int
+        :param reason: reason of the retry, reported if the job fails
+        :type reason: str
+        """
+        del self._running[job_id]
+        if job_id in self._cancelled:
+            self._finish(job_id, {})
+        elif self._attempts[job_id] >= self.max_attempts:
+            self._finish(job_id, {'values': None, 'error': f'failed after {self._attempts[job_id]} attempts: {reason}'})
+        else:
+            logger.info(f'Retry job {job_id}: {reason}')
+            self._pending.insert(0, job_id)
+        self._condition.notify_all()
+
+    def _finish(self, job_id: int, result: Dict) -> None:
+        """
+        Store the result of a job, or drop it if the job was cancelled. Call with the lock held.
+
+        :param job_id: job id
+        :type job_id: int
+        :param result: result dict
+        :type result: Dict
+        """
+        self._dereference_file(self._jobs.pop(job_id)['file'])
+        result['attempts'] = self._attempts.pop(job_id)
+        if job_id in self._cancelled:
+            self._cancelled.discard(job_id)
+        else:
+            self._results[job_id] = result
+
+    def take(self, worker_id: str, timeout: float = 1) -> Optional[Tuple[int, Dict]]:
+        """
+        Take the next job, called by a worker daemon with a free GeckoCIRCUITS instance.
+
+        :param worker_id: id of the worker daemon
+        :type worker_id: str
+        :param timeout: time in seconds to wait for a job
+        :type timeout: float
+        :return: (job id, job dict), or None if there is no job
+        :rtype: Tuple[int, Dict]
+        """
+        with self._condition:
+            self._heartbeats[worker_id] = time.monotonic()
+            self._requeue_lost_jobs()
+            if not self._pending:
+                self._condition.wait(timeout)
+            if not self._pending:
+                return None
+            job_id = self._pending.pop(0)
+            self._running[job_id] = worker_id
+            self._attempts[job_id] += 1
+            return job_id, self._jobs[job_id]
+
+    def complete(self, worker_id: str, job_id: int, result: Dict) -> None:
+        """
+        Store the result of a job, called by the worker daemon which took it.
+
+        :param worker_id: id of the worker daemon
+        :type worker_id: str
+        :param job_id: job id
+        :type job_id: int
+        :param result: result dict
+        :type result: Dict
+        """
+        with self._condition:
+            # a late result of a job which was already given to another worker is dropped
+            if self._running.get(job_id) == worker_id:
+                del self._running[job_id]
+                self._finish(job_id, result)
+                self._condition.notify_all()
+
+    def release(self, worker_id: str, job_id: int, reason: str) -> None:
+        """
+        Give back a job which could not be finished, e.g. after a crash of the GeckoCIRCUITS instance.
+
+        :param worker_id: id of the worker daemon
+        :type worker_id: str
+        :param job_id: job id
+        :type job_id: int
+        :param reason: reason, reported if the job fails
+        :type reason: str
+        """
+        with self._condition:
+            if self._running.get(job_id) == worker_id:
+                self._retry(job_id, reason)
+
+    def wait_results(self, job_ids: List[int], timeout: float = 1) -> Dict[int, Dict]:
+        """
+        Wait until at least one of the jobs is finished and remove the finished results from the board.
+
+        :param job_ids: ids of the awaited jobs
+        :type job_ids: List[int]
+        :param timeout: time in seconds to wait
+        :type timeout: float
+        :return: dict of job ids to result dicts, empty if no job finished within the timeout
+        :rtype: Dict[int, Dict]
+        """
+        with self._condition:
+            self._requeue_lost_jobs()
+            if not any(job_id in self._results for job_id in job_ids):
+                self._condition.wait(timeout)
+            return {job_id: self._results.pop(job_id) for job_id in job_ids if job_id in self._results}
+
+    def cancel(self, job_ids: List[int]) -> None:
+        """
+        Remove pending jobs and the results of finished jobs. Running jobs are finished, their results are dropped.
+
+        :param job_ids: job ids
+        :type job_ids: List[int]
+        """
+        with self._condition:
+            for job_id in job_ids:
+                if job_id in self._pending:
+                    self._pending.remove(job_id)
+                    self._finish(job_id, {})
+                elif job_id in self._running:
+                    self._cancelled.add(job_id)
+                self._results.pop(job_id, None)
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Return the state of the queue.
+
+        :return: dict with the number of 'pending', 'running' and 'finished' jobs, the number of stored 'files' and the
+            ids of the alive 'workers'
+        :rtype: Dict[str, Any]
+        """
+        with self._condition:
+            self._requeue_lost_jobs()
+            return {'pending': len(self._pending), 'running': len(self._running), 'finished': len(self._results),
+                    'files': len(self._files), 'workers': sorted(self._heartbeats)}
+
+
+# job board of the coordinator process, created by _init_job_board()
+_job_board: Optional[JobBoard] = None
+
+
+def _init_job_board(worker_timeout: float, max_attempts: int) -> None:
+    """
+    Create the job board in the server process of the coordinator.
+
+    :param worker_timeout: see JobBoard
+    :type worker_timeout: float
+    :param max_attempts: see JobBoard
+    :type max_attempts: int
+    """
+    global _job_board
+    _job_board = JobBoard(worker_timeout, max_attempts)
+
+
+def _get_job_board() -> JobBoard:
+    """
+    Return the job board of the coordinator process, every client gets a proxy of the same board.
+
+    :return: job board
+    :rtype: JobBoard
+    """
+    return _job_board
+
+
+class _CoordinatorManager(BaseManager):
+    """Manager which serves the job board of the coordinator."""
+
+
+_CoordinatorManager.register('job_board', callable=_get_job_board)
+
+
+def _authkey(authkey: Optional[Union[str, bytes]]) -> bytes:
+    """
+    Return the authentication key as bytes, by default from the environment variable PYGECKOCIRCUITS2_AUTHKEY.
+
+    :param authkey: authentication key, or None
+    :type authkey: str or bytes
+    :raises Exception: if no key is given and the environment variable is not set
+    :return: authentication key
+    :rtype: bytes
+    """
+    authkey = os.environ.get(AUTHKEY_ENV) if authkey is None else authkey
+    if authkey is None:
+        raise Exception(f'No authentication key given. Set the argument authkey or the environment variable {AUTHKEY_ENV}.')
+    return authkey.encode('utf-8') if isinstance(authkey, str) else authkey
+
+
+def _connect(address: Tuple[str, int], authkey: Optional[Union[str, bytes]]) -> Any:
+    """
+    Connect to a coordinator and return a proxy of its job board.
+
+    :param address: (host, port) of the coordinator
+    :type address: Tuple[str, int]
+    :param authkey: authentication key of the coordinator
+    :type authkey: str or bytes
+    :return: proxy of the job board
+    :rtype: JobBoard
+    """
+    manager = _CoordinatorManager(address=tuple(address), authkey=_authkey(authkey))
+    manager.connect()
+    return manager.job_board()
+
+
+class GeckoCoordinator:
+    """
+    Serve the job queue for GeckoClusterPool clients and GeckoWorkerDaemon workers.
+
+    The coordinator uses multiprocessing.managers only, it needs no GeckoCIRCUITS. The authentication key protects the
+    (unencrypted) connections, run the coordinator in a trusted network only.
+
+    Start it in the background by start(), or as blocking service, e.g. from the command line:
+
+    python -m pygeckocircuits2.geckoCluster coordinator --address 0.0.0.0:43100 --authkey secret
+
+    :Example:
+
+    >>> import pygeckocircuits2 as pgc
+    >>> with pgc.GeckoCoordinator(('0.0.0.0', 43100), authkey='secret') as coordinator:
+    >>>     ...  # start GeckoWorkerDaemon on the worker machines, use GeckoClusterPool to run simulations
+    """
+
+    address: Tuple[str, int]
+    worker_timeout: float
+    max_attempts: int
+
+    def __init__(self, address: Tuple[str, int] = DEFAULT_ADDRESS, authkey: Union[str, bytes] = None, worker_timeout: float = 30,
+                 max_attempts: int = 3) -> None:
+        """
+        Set up the coordinator, it is started by start() or serve_forever().
+
+        :param address: (host, port) to listen on. Default ('127.0.0.1', 43100), use '0.0.0.0' for other machines
+        :type address: Tuple[str, int]
+        :param authkey: authentication key. Default None: environment variable PYGECKOCIRCUITS2_AUTHKEY
+        :type authkey: str or bytes
+        :param worker_timeout: time in seconds without heartbeat after which the jobs of a worker daemon are queued again
+        :type worker_timeout: float
+        :param max_attempts: maximum number of tries of a job
+        :type max_attempts: int
+        """
+        self.address = tuple(address)
+        self.worker_timeout = worker_timeout
+        self.max_attempts = max_attempts
+        self._manager = _CoordinatorManager(address=self.address, authkey=_authkey(authkey))
+
+    def __enter__(self) -> 'GeckoCoordinator':
+        """
+        Start the coordinator in the background when entering the context manager.
+
+        :return: the coordinator itself
+        :rtype: GeckoCoordinator
+        """
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        """
+        Stop the coordinator when leaving the context manager.
+
+        :param exc_type: type of a raised exception, if any
+        :type exc_type: type
+        :param exc_value: raised exception, if any
+        :type exc_value: Exception
+        :param traceback: traceback of a raised exception, if any
+        :type traceback: traceback
+        """
+        self.shutdown()
+
+    def start(self) -> None:
+        """Start the coordinator in a background process."""
+        self._manager.start(initializer=_init_job_board, initargs=(self.worker_timeout, self.max_attempts))
+        # the port may have been chosen by the operating system
+        self.address = self._manager.address
+        logger.info(f'Coordinator listens on {self.address}')
+
+    def serve_forever(self) -> None:
+        """Run the coordinator in this process until it is killed."""
+        _init_job_board(self.worker_timeout, self.max_attempts)
+        logger.info(f'Coordinator listens on {self.address}')
+        self._manager.get_server().serve_forever()
+
+    def shutdown(self) -> None:
+        """Stop the background process of the coordinator."""
+        self._manager.shutdown()
+
+
+def _pack_scope(time_array: np.ndarray, signals: Dict[str, np.ndarray], dtype: str) -> Dict:
+    """
+    Pack scope data into a single bytes buffer: the float64 time vector followed by the signals in the given dtype.
+
+    :param time_array: time vector
+    :type time_array: np.ndarray
+    :param signals: dict of node names and signal arrays
+    :type signals: Dict[str, np.ndarray]
+    :param dtype: data type of the signals, e.g. 'float32'
+    :type dtype: str
+    :return: dict with 'nodes', 'dtype', 'points' and the 'data' bytes
+    :rtype: Dict
+    """
+    data = np.empty((len(signals), len(time_array)), dtype=dtype)
+    for row, values in enumerate(signals.values()):
+        data[row] = values
+    return {'nodes': list(signals), 'dtype': dtype, 'points': len(time_array),
+            'data': np.asarray(time_array, dtype=np.float64).tobytes() + data.tobytes()}
+
+
+def unpack_scope(packed: Dict) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Unpack the scope data of a cluster result, without copying.
+
+    :param packed: packed scope data, as in the 'scope' entry of a result of GeckoClusterPool.run()
+    :type packed: Dict
+    :return: time, dict of node names and signal arrays, as GeckoSimulation.get_scope_arrays()
+    :rtype: Tuple[np.ndarray, Dict[str, np.ndarray]]
+    """
+    points = packed['points']
+    time_array = np.frombuffer(packed['data'], dtype=np.float64, count=points)
+    data = np.frombuffer(packed['data'], dtype=packed['dtype'], offset=8 * points).reshape(len(packed['nodes']), points)
+    return time_array, {node: data[row] for row, node in enumerate(packed['nodes'])}
+
+
+class GeckoWorkerDaemon:
+    """
+    Host a pool of warm GeckoCIRCUITS instances and run the jobs of a coordinator on them.
+
+    Every instance runs in its own GeckoWorker process on its own port (geckoport, geckoport + 1, ...). It stays open
+    between jobs, a job with another simulation file only opens that file. Before a job runs, all parameters changed by
+    earlier jobs on the instance and not set by this job are set back to their file values, so the result of a job does
+    not depend on the jobs that ran on the same instance before. Simulation files are loaded from the
+    coordinator and stored by their hash in cache_directory, so files referenced by relative paths from the .ipes file
+    (e.g. loss files) must exist relative to this directory or be referenced by absolute paths valid on every machine.
+
+    Every instance runs under the watchdog of SupervisedGeckoSimulation. If it crashes, or a job exceeds timeout or
+    max_rss, the instance is restarted. A job of a crashed instance is given back to the coordinator for another try, a
+    job which exceeded a limit fails, as another try would most likely hit the limit again. The restarts are part of the
+    job results and are counted by get_restart_statistics().
+
+    Start it on every worker machine, e.g. from the command line:
+
+    python -m pygeckocircuits2.geckoCluster worker --address coordinator-host:43100 --authkey secret --instances 4
+
+    :Example:
+
+    >>> import pygeckocircuits2 as pgc
+    >>> daemon = pgc.GeckoWorkerDaemon(('coordinator-host', 43100), authkey='secret', instances=4)
+    >>> daemon.serve_forever()
+    """
+
+    address: Tuple[str, int]
+    instances: int
+    geckoport: int
+    cache_directory: str
+    worker_id: str
+    timeout: Optional[float]
+    max_rss: Optional[float]
+    recycle_after: Optional[int]
+    simulation_kwargs: Dict
+
+    def __init__(self, address: Tuple[str, int] = DEFAULT_ADDRESS, authkey: Union[str, bytes] = None, instances: int = 1,
+                 geckoport: int = 43036, cache_directory: str = None, heartbeat_interval: float = 5, timeout: float = None,
+                 max_rss: float = None, recycle_after: int = None, **simulation_kwargs) -> None:
+        """
+        Set up the daemon, it is started by start() or serve_forever().
+
+        :param address: (host, port) of the coordinator
+        :type address: Tuple[str, int]
+        :param authkey: authentication key. Default None: environment variable PYGECKOCIRCUITS2_AUTHKEY
+        :type authkey: str or bytes
+        :param instances: number of GeckoCIRCUITS instances
+        :type instances: int
+        :param geckoport: port of the first GeckoCIRCUITS instance, the following instances count up from this port
+        :type geckoport: int
+        :param cache_directory: directory for the simulation files. Default: pygeckocircuits2_cluster in the temp directory
+        :type cache_directory: str
+        :param heartbeat_interval: time in seconds between two heartbeats, must be shorter than worker_timeout of the coordinator
+        :type heartbeat_interval: float
+        :param timeout: wall-clock limit of every call of a job in seconds. Default None: no limit
+        :type timeout: float
+        :param max_rss: memory limit of every instance in bytes, see SupervisedGeckoSimulation. Default None: no limit
+        :type max_rss: float
+        :param recycle_after: restart every instance after this number of simulations. Default None: never
+        :type recycle_after: int
+        :param simulation_kwargs: keyword arguments passed to GeckoSimulation (geckopath, javapath, ...)
+        :type simulation_kwargs: Dict
+        """
+        self.address = tuple(address)
+        self._authkey = _authkey(authkey)
+        self.instances = instances
+        self.geckoport = geckoport
+        self.cache_directory = os.path.join(tempfile.gettempdir(), 'pygeckocircuits2_cluster') if cache_directory is None else cache_directory
+        self.heartbeat_interval = heartbeat_interval
+        self.timeout = timeout
+        self.max_rss = max_rss
+        self.recycle_after = recycle_after
+        self.simulation_kwargs = simulation_kwargs
+        self._workers: Dict[int, SupervisedGeckoSimulation] = {}
+        self.worker_id = f'{socket.gethostname()}-{os.getpid()}'
+        self._stop_event = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def _load_file(self, board: Any, key: str) -> str:
+        """
+        Return the local path of a simulation file, loaded from the coordinator if not yet cached.
+
+        :param board: proxy of the job board
+        :type board: JobBoard
+        :param key: sha256 hash of the file content
+        :type key: str
+        :return: path of the .ipes file
+        :rtype: str
+        """
+        filepath = os.path.join(self.cache_directory, f'{key}.ipes')
+        if not os.path.exists(filepath):
+            os.makedirs(self.cache_directory, exist_ok=True)
+            # write to a temporary file first, so other daemons on the same machine never read a partial file
+            temporary_path = f'{filepath}.{os.getpid()}.{threading.get_ident()}'
+            with open(temporary_path, 'wb') as file:
+                file.write(board.get_file(key))
+            os.replace(temporary_path, filepath)
+        return filepath
+
+    @staticmethod
+    def _run_job(worker: SupervisedGeckoSimulation, job: Dict, file_values: Dict[str, Dict]) -> Dict:
+        """
+        Apply the parameters of a job, run the simulation and collect the requested outputs.
+
+        Parameters which earlier jobs changed and this job does not set are set back to their file values.
+
+        :param worker: worker with the simulation file of the job opened
+        :type worker: SupervisedGeckoSimulation
+        :param job: job dict, see JobBoard.submit()
+        :type job: Dict
+        :param file_values: file values of all parameters changed on this instance since the file was opened, in the
+            format of the job parameters. Extended by the parameters of this job.
+        :type file_values: Dict[str, Dict]
+        :return: result dict with 'values', 'scope' (packed, see unpack_scope()) and 'error'
+        :rtype: Dict
+        """
+        parameters = job['parameters']
+        global_parameters = parameters.get('global_parameters', {})
+        new_names = [name for name in global_parameters if name not in file_values['global_parameters']]
+        if new_names:
+            file_values['global_parameters'].update(worker.call('get_global_parameters', new_names))
+        global_parameters = {**file_values['global_parameters'], **global_parameters}
+        if global_parameters:
+            worker.call('set_global_parameters', global_parameters)
+
+        component_values = {component_name.upper(): component_dict for component_name, component_dict in
+                            parameters.get('component_values', {}).items()}
+        for component_name, component_dict in component_values.items():
+            component_file_values = file_values['component_values'].setdefault(component_name, {})
+            if not set(component_dict) <= set(component_file_values):
+                current_values = worker.call('get_component_values', component_name)
+                component_file_values.update({key: current_values[key] for key in component_dict if key not in component_file_values})
+        for component_name, component_file_values in file_values['component_values'].items():
+            worker.call('set_component_values', component_name, {**component_file_values, **component_values.get(component_name, {})})
+        worker.call('run_simulation', **job['simulation_times'])
+        result = {'values': None, 'scope': None, 'error': None}
+        if job['nodes'] and job['operations']:
+            result['values'] = worker.call('get_values', job['nodes'], job['operations'], job['range_start_stop'])
+        if job['scope_nodes']:
+            time_array, signals = worker.call('get_scope_arrays', job['scope_nodes'])
+            result['scope'] = _pack_scope(time_array, signals, job['scope_dtype'])
+        return result
+
+    def _serve_instance(self, index: int) -> None:
+        """
+        Take and run jobs on one GeckoCIRCUITS instance until the daemon is stopped.
+
+        :param index: number of the instance, defines its port
+        :type index: int
+        """
+        board = _connect(self.address, self._authkey)
+        worker = None
+        opened_file = None
+        # values of the opened file for all parameters changed by jobs, see _run_job()
+        file_values = {'global_parameters': {}, 'component_values': {}}
+        try:
+            while not self._stop_event.is_set():
+                task = board.take(self.worker_id, self.heartbeat_interval)
+                if task is None:
+                    continue
+                job_id, job = task
+                restarts = len(worker.restarts) if worker is not None else 0
+                try:
+                    filepath = self._load_file(board, job['file'])
+                    if worker is None:
+                        worker = SupervisedGeckoSimulation(filepath, timeout=self.timeout, max_rss=self.max_rss, retries=0,
+                                                           recycle_after=self.recycle_after, geckoport=self.geckoport + index,
+                                                           **self.simulation_kwargs)
+                        self._workers[index] = worker
+                    elif opened_file != filepath:
+                        worker.call('open_file', filepath)
+                    if opened_file != filepath:
+                        file_values = {'global_parameters': {}, 'component_values': {}}
+                    opened_file = filepath
+                    result = self._run_job(worker, job, file_values)
+                except Exception as e:
+                    crashed = worker is not None and any(restart['reason'] == 'crash' for restart in worker.restarts[restarts:])
+                    if worker is not None and worker.is_alive() and not crashed:
+                        logger.error(f'Job {job_id} failed: {e}')
+                        board.complete(self.worker_id, job_id, {'values': None, 'scope': None, 'error': repr(e),
+                                                                'restarts': worker.restarts[restarts:]})
+                        continue
+                    # the instance crashed or did not start: another try, maybe on another machine
+                    logger.warning(f'GeckoCIRCUITS instance {index} stopped during job {job_id}: {e}')
+                    board.release(self.worker_id, job_id, repr(e))
+                    if worker is not None and not worker.is_alive():
+                        worker.close()
+                        worker = None
+                    continue
+                result['restarts'] = worker.restarts[restarts:]
+                board.complete(self.worker_id, job_id, result)
+        finally:
+            if worker is not None:
+                worker.close()
+
+    def get_restart_statistics(self) -> Dict[str, int]:
+        """
+        Count the restarts of all instances by reason, see SupervisedGeckoSimulation.get_restart_statistics().
+
+        :return: dict with the total number of 'restarts' and the number per reason
+        :rtype: Dict[str, int]
+        """
+        statistics = {'restarts': 0}
+        for worker in list(self._workers.values()):
+            for key, count in worker.get_restart_statistics().items():
+                statistics[key] = statistics.get(key, 0) + count
+        return statistics
+
+    def _send_heartbeats(self) -> None:
+        """Send heartbeats to the coordinator until the daemon is stopped, also while all instances are busy."""
+        board = _connect(self.address, self._authkey)
+        while not self._stop_event.wait(self.heartbeat_interval):
+            board.heartbeat(self.worker_id)
+
+    def start(self) -> None:
+        """Start the instances and the heartbeat in background threads."""
+        self._stop_event.clear()
+        self._threads = [threading.Thread(target=self._send_heartbeats, daemon=True)]
+        self._threads += [threading.Thread(target=self._serve_instance, args=(index,), daemon=True) for index in range(self.instances)]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f'Worker daemon {self.worker_id} serves {self.instances} instances for {self.address}')
+
+    def stop(self) -> None:
+        """Stop taking jobs, wait for the running jobs and shut down the GeckoCIRCUITS instances."""
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def serve_forever(self) -> None:
+        """Run the daemon until it is interrupted, e.g. by Ctrl+C."""
+        self.start()
+        try:
+            while any(thread.is_alive() for thread in self._threads):
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+
+class GeckoClusterPool:
+    """
+    Run operating points on the worker daemons of a coordinator, with the same interface as GeckoSweep.
+
+    The simulation file is sent to the coordinator once, so the worker machines need no access to the file system of the
+    client. Results can contain scope data, transferred as packed binary buffer (see unpack_scope()).
+
+    :Example:
+
+    >>> import pygeckocircuits2 as pgc
+    >>> points = [{'global_parameters': {'V_in': v_in}} for v_in in [40, 50, 60]]
+    >>> with pgc.GeckoClusterPool('path/to/simfile.ipes', ('coordinator-host', 43100), authkey='secret', simtime=0.05, timestep=50e-9) as pool:
+    >>>     for result in pool.run(points, nodes=['i_L'], operations=['mean', 'rms']):
+    >>>         print(result['index'], result['values'])
+    """
+
+    simfilepath: str
+    address: Tuple[str, int]
+    simulation_times: Dict
+
+    def __init__(self, simfilepath: str, address: Tuple[str, int] = DEFAULT_ADDRESS, authkey: Union[str, bytes] = None, timestep: float = None,
+                 simtime: float = None, timestep_pre: float = None, simtime_pre: float = None) -> None:
+        """
+        Connect to the coordinator and upload the simulation file.
+
+        :param simfilepath: absolute or relative path to simulation file
+        :type simfilepath: str
+        :param address: (host, port) of the coordinator
+        :type address: Tuple[str, int]
+        :param authkey: authentication key. Default None: environment variable PYGECKOCIRCUITS2_AUTHKEY
+        :type authkey: str or bytes
+        :param timestep: simulation fix timestep. Default None: as in the simulation file
+        :type timestep: float
+        :param simtime: total simulation time. Default None: as in the simulation file
+        :type simtime: float
+        :param timestep_pre: the dt time step of the pre simulation. Default None: as in the simulation file
+        :type timestep_pre: float
+        :param simtime_pre: simulation time of the pre simulation. Default None: as in the simulation file
+        :type simtime_pre: float
+        """
+        self.simfilepath = os.path.abspath(simfilepath)
+        self.address = tuple(address)
+        self.simulation_times = {'timestep': timestep, 'simtime': simtime, 'timestep_pre': timestep_pre, 'simtime_pre': simtime_pre}
+        self._board = _connect(self.address, authkey)
+        with open(self.simfilepath, 'rb') as file:
+            self._file_key = self._board.put_file(file.read())
+
+    def __enter__(self) -> 'GeckoClusterPool':
+        """
+        Enter the context manager.
+
+        :return: the pool itself
+        :rtype: GeckoClusterPool
+        """
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        """
+        Leave the context manager and release the simulation file on the coordinator, see close().
+
+        :param exc_type: type of a raised exception, if any
+        :type exc_type: type
+        :param exc_value: raised exception, if any
+        :type exc_value: Exception
+        :param traceback: traceback of a raised exception, if any
+        :type traceback: traceback
+        """
+        self.close()
+
+    def close(self) -> None:
+        """Release the simulation file on the coordinator. Unfinished jobs are cancelled by run(), the pool cannot run afterwards."""
+        if self._file_key is not None:
+            self._board.release_file(self._file_key)
+            self._file_key = None
+
+    def run(self, points: List[Dict], nodes: Union[List, str] = None, operations: Union[List, str] = None,
+            range_start_stop: List[Union[float, str]] = None, scope_nodes: Union[List, str] = None,
+            scope_dtype: str = 'float32') -> Iterator[Dict]:
+        """
+        Simulate all operating points and yield the results in the order they finish.
+
+        :param points: operating points, see GeckoSweep for the format
+        :type points: List[Dict]
+        :param nodes: node names located on the scopes, see GeckoSimulation.get_values()
+        :type nodes: List[str] or str
+        :param operations: Mean/RMS/THD/Ripple/Max/Min/Shape operations, see GeckoSimulation.get_values()
+        :type operations: List[str] or str
+        :param range_start_stop: range of the data to evaluate, see GeckoSimulation.get_values()
+        :type range_start_stop: [float, str] or [float, float]
+        :param scope_nodes: nodes to transfer the complete scope data of. Default None: no scope data
+        :type scope_nodes: List[str] or str
+        :param scope_dtype: data type of the transferred scope signals, the time is always float64
+        :type scope_dtype: str
+
+        :return: generator of result dicts as GeckoSweep.run(), with the additional keys 'scope' (packed scope data,
+            see unpack_scope()), 'attempts' and 'restarts' (restarts of the instance during the job, see
+            SupervisedGeckoSimulation.restarts)
+        :rtype: Iterator[Dict]
+        """
+        nodes = [nodes] if isinstance(nodes, str) else nodes
+        operations = [operations] if isinstance(operations, str) else operations
+        scope_nodes = [scope_nodes] if isinstance(scope_nodes, str) else scope_nodes
+        job_indices = {}
+        for index, point in enumerate(points):
+            job = {'file': self._file_key, 'parameters': point, 'nodes': nodes, 'operations': operations, 'range_start_stop': range_start_stop,
+                   'scope_nodes': scope_nodes, 'scope_dtype': scope_dtype, 'simulation_times': self.simulation_times}
+            job_indices[self._board.submit(job)] = index
+        try:
+            while job_indices:
+                for job_id, result in self._board.wait_results(list(job_indices)).items():
+                    index = job_indices.pop(job_id)
+                    logger.debug(f'Operating point {index} finished')
+                    yield {'index': index, 'parameters': points[index], **result}
+        finally:
+            if job_indices:
+                self._board.cancel(list(job_indices))
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Return the state of the coordinator queue, see JobBoard.status().
+
+        :return: dict with the number of 'pending', 'running' and 'finished' jobs, the number of stored 'files' and the
+            ids of the alive 'workers'
+        :rtype: Dict[str, Any]
+        """
+        return self._board.status()
+
+
+def _parse_address(address: str) -> Tuple[str, int]:
+    """
+    Parse 'host:port'.
+
+    :param address: address as 'host:port'
+    :type address: str
+    :return: (host, port)
+    :rtype: Tuple[str, int]
+    """
+    host, port = address.rsplit(':', 1)
+    return host, int(port)
+
+
+def main() -> None:
+    """Start a coordinator or a worker daemon from the command line."""
+    parser = argparse.ArgumentParser(description='Coordinator and worker daemon for distributed GeckoCIRCUITS simulations')
+    parser.add_argument('role', choices=['coordinator', 'worker'])
+    parser.add_argument('--address', default=f'{DEFAULT_ADDRESS[0]}:{DEFAULT_ADDRESS[1]}', help='host:port of the coordinator')
+    parser.add_argument('--authkey', help=f'authentication key, default: environment variable {AUTHKEY_ENV}')
+    parser.add_argument('--worker-timeout', type=float, default=30, help='coordinator: seconds without heartbeat until a worker is lost')
+    parser.add_argument('--max-attempts', type=int, default=3, help='coordinator: maximum number of tries of a job')
+    parser.add_argument('--instances', type=int, default=1, help='worker: number of GeckoCIRCUITS instances')
+    parser.add_argument('--geckoport', type=int, default=43036, help='worker: port of the first GeckoCIRCUITS instance')
+    parser.add_argument('--cache-directory', help='worker: directory for the simulation files')
+    parser.add_argument('--timeout', type=float, help='worker: wall-clock limit of every call of a job in seconds')
+    parser.add_argument('--max-rss', type=float, help='worker: memory limit of every GeckoCIRCUITS instance in bytes')
+    parser.add_argument('--recycle-after', type=int, help='worker: restart every instance after this number of simulations')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.role == 'coordinator':
+        GeckoCoordinator(_parse_address(args.address), args.authkey, args.worker_timeout, args.max_attempts).serve_forever()
+    else:
+        GeckoWorkerDaemon(_parse_address(args.address), args.authkey, args.instances, args.geckoport, args.cache_directory,
+                          timeout=args.timeout, max_rss=args.max_rss, recycle_after=args.recycle_after, interactive=False).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
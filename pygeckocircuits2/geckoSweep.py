@@ -0,0 +1,342 @@
+"""Run parameter sweeps on several GeckoCIRCUITS instances in parallel."""
+# python libraries
+import collections
+import os
+import multiprocessing
+import queue
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import util
+from typing import Deque, Dict, List, Optional, Iterator, Union
+import logging
+
+# own libraries
+from pygeckocircuits2.geckoCircuitsRemote import GeckoSimulation
+from pygeckocircuits2.geckoWorker import descendant_pids, kill_processes
+from pygeckocircuits2.resultStore import ResultStore
+
+logger = logging.getLogger(__name__)
+
+# Every worker process owns exactly one GeckoSimulation, as pyjnius allows only one JVM per process.
+_worker_simulation: Optional[GeckoSimulation] = None
+# error message if GeckoCIRCUITS could not be started in this worker process
+_worker_error: Optional[str] = None
+# result store of the worker process if the sweep stores its results, and the simulation file for the stored file hash
+_worker_store: Optional[ResultStore] = None
+_worker_simfilepath: Optional[str] = None
+# all parameters set in this worker process, they stay set in GeckoCIRCUITS for the following operating points
+_worker_parameters: Dict[str, Dict] = {'global_parameters': {}, 'component_values': {}}
+
+# time in seconds a starting worker waits for a free port
+PORT_TIMEOUT = 60
+
+
+def _shutdown_worker() -> None:
+    """Shut down the GeckoCIRCUITS instance of this worker process."""
+    global _worker_simulation
+    # dropping the last reference calls GeckoSimulation.__del__(), which shuts down the instance
+    _worker_simulation = None
+
+
+def _init_worker(port_queue: multiprocessing.Queue, simfilepath: str, simulation_kwargs: Dict, recorded_nodes: Optional[List[str]],
+                 store: Optional[ResultStore]) -> None:
+    """
+    Start the GeckoCIRCUITS instance of a worker process on a port that is unique within the sweep.
+
+    If GeckoCIRCUITS can not be started, the error is kept and returned for every operating point of this worker, as an
+    exception here would break the whole pool.
+
+    :param port_queue: queue with the free ports, every worker takes one port from it
+    :type port_queue: multiprocessing.Queue
+    :param simfilepath: absolute or relative path to simulation file
+    :type simfilepath: str
+    :param simulation_kwargs: keyword arguments passed to GeckoSimulation (timestep, simtime, ...)
+    :type simulation_kwargs: Dict
+    :param recorded_nodes: scope signals to record, None for all, see GeckoSimulation.set_recorded_nodes()
+    :type recorded_nodes: List[str]
+    :param store: store for the results, None to return them only
+    :type store: ResultStore
+    """
+    global _worker_simulation, _worker_store, _worker_simfilepath, _worker_error
+    # the pickled store opens its own database connection in this process
+    _worker_store = store
+    _worker_simfilepath = simfilepath
+    try:
+        geckoport = port_queue.get(timeout=PORT_TIMEOUT)
+    except queue.Empty:
+        _worker_error = f'No free port for worker {os.getpid()} within {PORT_TIMEOUT} s'
+        logger.error(_worker_error)
+        return
+    logger.info(f'Worker {os.getpid()} starts GeckoCIRCUITS on port {geckoport}')
+    # the port is free again when this worker exits, also for a worker started later
+    util.Finalize(None, port_queue.put, args=(geckoport,), exitpriority=5)
+    try:
+        _worker_simulation = GeckoSimulation(simfilepath, geckoport=geckoport, **simulation_kwargs)
+        if recorded_nodes is not None:
+            _worker_simulation.set_recorded_nodes(recorded_nodes)
+    except Exception as e:
+        _worker_error = f'GeckoCIRCUITS could not start on port {geckoport}: {e!r}'
+        logger.error(_worker_error)
+    # worker processes leave by os._exit(), so the instance must be shut down by a finalizer and not by __del__
+    util.Finalize(None, _shutdown_worker, exitpriority=10)
+
+
+def _run_point(task: tuple) -> Dict:
+    """
+    Apply the parameters of a single operating point, run the simulation and read back the values.
+
+    :param task: (index, point, nodes, operations, range_start_stop, waveform_nodes)
+    :type task: tuple
+    :return: result dict with the keys 'index', 'parameters', 'values', 'error' and 'run_id'
+    :rtype: Dict
+    """
+    index, point, nodes, operations, range_start_stop, waveform_nodes = task
+    result = {'index': index, 'parameters': point, 'values': None, 'error': None, 'run_id': None}
+    if _worker_error is not None:
+        result['error'] = _worker_error
+        return result
+    try:
+        if point.get('global_parameters'):
+            _worker_simulation.set_global_parameters(point['global_parameters'])
+            _worker_parameters['global_parameters'].update(point['global_parameters'])
+        for component_name, component_dict in point.get('component_values', {}).items():
+            _worker_simulation.set_component_values(component_name, component_dict)
+            _worker_parameters['component_values'].setdefault(component_name.upper(), {}).update(component_dict)
+        _worker_simulation.run_simulation()
+        result['values'] = _worker_simulation.get_values(nodes, operations, range_start_stop)
+        if _worker_store is not None:
+            simulation = _worker_simulation
+            sim_time = {'timestep': simulation.timestep, 'simtime': simulation.simtime, 'timestep_pre': simulation.timestep_pre,
+                        'simtime_pre': simulation.simtime_pre}
+            waveforms = simulation.get_scope_arrays(waveform_nodes, dtype=_worker_store.waveform_dtype) if waveform_nodes else None
+            # the effective parameters of the run: the values of this point and those left over from earlier points
+            parameters = {'global_parameters': dict(_worker_parameters['global_parameters']),
+                          'component_values': {name: dict(values) for name, values in _worker_parameters['component_values'].items()},
+                          'sim_time': sim_time}
+            result['run_id'] = _worker_store.append(parameters, result['values'], waveforms, _worker_simfilepath)
+    except Exception as e:
+        logger.error(f'Operating point {index} failed: {e}')
+        result['error'] = repr(e)
+    return result
+
+
+class GeckoSweep:
+    """
+    Run a list of operating points on a pool of GeckoCIRCUITS instances.
+
+    Every worker process starts its own GeckoCIRCUITS instance on a separate port (geckoport, geckoport + 1, ...),
+    as pyjnius allows only one JVM per process. The instances stay open until the sweep is closed, so several
+    calls of run() reuse the running instances.
+
+    An operating point is a dict with the optional keys
+     * 'global_parameters': dict as used by GeckoSimulation.set_global_parameters(), e.g. {'V_in': 60}
+     * 'component_values': dict of component names to dicts as used by GeckoSimulation.set_component_values(),
+       e.g. {'L.1': {'iL(0)': 10}}
+
+    Note: parameters are not reset between two operating points on the same worker. Provide all parameters
+    that change within the sweep in every operating point.
+
+    If a worker process dies during a simulation (e.g. a crash of the JVM or an out-of-memory kill), the pool is
+    restarted with new GeckoCIRCUITS instances. The operating points which were running at that time are simulated
+    again one by one, to find the point which caused the crash. A point which kills its worker while running alone is
+    repeated up to retries times, then it is returned as failed point. So a crash never blocks run().
+
+    With a store, every worker appends its results to the ResultStore, together with the simulation times and optionally
+    the waveforms of run(), so the results of many sweeps can be queried later. The stored parameters are all parameters
+    set on the worker so far, including those left over from earlier operating points. Values which were never set are
+    the values of the simulation file, whose hash is stored as well.
+
+    :Example:
+
+    >>> import pygeckocircuits2 as pgc
+    >>> points = [{'global_parameters': {'V_in': v_in}} for v_in in [40, 50, 60]]
+    >>> with pgc.GeckoSweep('path/to/simfile.ipes', processes=3, simtime=0.05, timestep=50e-9) as sweep:
+    >>>     for result in sweep.run(points, nodes=['i_L'], operations=['mean', 'rms']):
+    >>>         print(result['index'], result['values'])
+    """
+
+    simfilepath: str
+    processes: int
+    geckoport: int
+    retries: int
+    store: Optional[ResultStore]
+
+    def __init__(self, simfilepath: str, processes: int = None, geckoport: int = 43036, timestep: float = None, simtime: float = None,
+                 timestep_pre: float = 0, simtime_pre: float = 0, recorded_nodes: Union[List, str] = None,
+                 store: Union[ResultStore, str] = None, retries: int = 1) -> None:
+        """
+        Start the worker processes, each one with its own GeckoCIRCUITS instance.
+
+        :param simfilepath: absolute or relative path to simulation file
+        :type simfilepath: str
+        :param processes: number of worker processes. Defaults to the number of CPU cores
+        :type processes: int
+        :param geckoport: port of the first GeckoCIRCUITS instance, the following workers count up from this port
+        :type geckoport: int
+        :param timestep: simulation fix timestep
+        :type timestep: float
+        :param simtime: total simulation time
+        :type simtime: float
+        :param timestep_pre: the dt time step of the pre simulation
+        :type timestep_pre: float
+        :param simtime_pre: simulation time of the pre simulation
+        :type simtime_pre: float
+        :param recorded_nodes: scope signals to record, e.g. the nodes of run(). Default None: all signals of the file.
+            See GeckoSimulation.set_recorded_nodes().
+        :type recorded_nodes: List[str] or str
+        :param store: result store or its directory, to store the results of all operating points. Default None: no storage
+        :type store: ResultStore or str
+        :param retries: number of repetitions of an operating point which killed its worker process
+        :type retries: int
+        """
+        self.store = ResultStore(store) if isinstance(store, str) else store
+        self.simfilepath = os.path.abspath(simfilepath)
+        self.processes = os.cpu_count() if processes is None else processes
+        self.geckoport = geckoport
+        self.retries = retries
+        simulation_kwargs = {'timestep': timestep, 'simtime': simtime, 'timestep_pre': timestep_pre, 'simtime_pre': simtime_pre}
+        self._initargs = (self.simfilepath, simulation_kwargs, recorded_nodes, self.store)
+        self._executor = self._start_executor()
+
+    def _start_executor(self) -> ProcessPoolExecutor:
+        """
+        Start a pool of worker processes with a queue of the free ports.
+
+        :return: process pool
+        :rtype: ProcessPoolExecutor
+        """
+        # spawn instead of fork: a forked JVM is not usable in the child process
+        context = multiprocessing.get_context('spawn')
+        port_queue = context.Queue()
+        for port in range(self.geckoport, self.geckoport + self.processes):
+            port_queue.put(port)
+        return ProcessPoolExecutor(max_workers=self.processes, mp_context=context, initializer=_init_worker,
+                                   initargs=(port_queue, *self._initargs))
+
+    def __enter__(self) -> 'GeckoSweep':
+        """
+        Enter the context manager.
+
+        :return: the sweep itself
+        :rtype: GeckoSweep
+        """
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        """
+        Close the sweep and shut down all GeckoCIRCUITS instances when leaving the context manager.
+
+        :param exc_type: type of a raised exception, if any
+        :type exc_type: type
+        :param exc_value: raised exception, if any
+        :type exc_value: Exception
+        :param traceback: traceback of a raised exception, if any
+        :type traceback: traceback
+        """
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
+
+    def run(self, points: List[Dict], nodes: Union[List, str], operations: Union[List, str],
+            range_start_stop: List[Union[float, str]] = None, waveform_nodes: Union[List, str] = None) -> Iterator[Dict]:
+        """
+        Simulate all operating points and yield the results in the order they finish.
+
+        :param points: operating points, see class description for the format
+        :type points: List[Dict]
+        :param nodes: node names located on the scopes, see GeckoSimulation.get_values()
+        :type nodes: List[str] or str
+        :param operations: Mean/RMS/THD/Ripple/Max/Min/Shape operations, see GeckoSimulation.get_values()
+        :type operations: List[str] or str
+        :param range_start_stop: range of the data to evaluate, see GeckoSimulation.get_values()
+        :type range_start_stop: [float, str] or [float, float]
+        :param waveform_nodes: scope nodes to store as waveforms, if the sweep has a store. Default None: no waveforms
+        :type waveform_nodes: List[str] or str
+
+        :return: generator of result dicts with the keys 'index' (position in points), 'parameters' (the operating point),
+            'values' (return dict of GeckoSimulation.get_values()), 'error' (None or the error message of a failed point)
+            and 'run_id' (id in the store, None without store)
+        :rtype: Iterator[Dict]
+        """
+        tasks: Deque[tuple] = collections.deque((index, point, nodes, operations, range_start_stop, waveform_nodes)
+                                                for index, point in enumerate(points))
+        # points which were running when a worker died, they are simulated one by one to find the point causing the crash
+        suspects: Deque[tuple] = collections.deque()
+        crashes: Dict[int, int] = {}
+        # at most one task per worker is submitted, so only the running points are affected if a worker dies
+        running: Dict[Future, tuple] = {}
+        while tasks or suspects or running:
+            if suspects:
+                if not running:
+                    task = suspects.popleft()
+                    running[self._executor.submit(_run_point, task)] = task
+            else:
+                while tasks and len(running) < self.processes:
+                    task = tasks.popleft()
+                    running[self._executor.submit(_run_point, task)] = task
+            alone = len(running) == 1
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            if any(isinstance(future.exception(), BrokenProcessPool) for future in finished):
+                # all futures of a broken pool finish at once, either with their result or with the exception
+                finished, _ = wait(running)
+            crashed = []
+            for future in finished:
+                task = running.pop(future)
+                if isinstance(future.exception(), BrokenProcessPool):
+                    crashed.append(task)
+                    continue
+                result = future.result()
+                logger.debug(f"Operating point {result['index']} finished")
+                yield result
+            if not crashed:
+                continue
+            logger.warning(f'A worker process died while simulating the operating points {sorted(task[0] for task in crashed)}, '
+                           f'restart the pool')
+            self._restart_executor()
+            if not alone:
+                suspects.extend(crashed)
+                continue
+            index = crashed[0][0]
+            crashes[index] = crashes.get(index, 0) + 1
+            if crashes[index] > self.retries:
+                logger.error(f'Operating point {index} failed: worker process died {crashes[index]} times')
+                yield {'index': index, 'parameters': crashed[0][1], 'values': None, 'error': f'worker process died {crashes[index]} times',
+                       'run_id': None}
+            else:
+                suspects.appendleft(crashed[0])
+
+    def _worker_processes(self) -> List[multiprocessing.Process]:
+        """
+        Return the running worker processes of the pool.
+
+        :return: worker processes
+        :rtype: List[multiprocessing.Process]
+        """
+        # ProcessPoolExecutor has no public access to its processes
+        return [process for process in (getattr(self._executor, '_processes', None) or {}).values() if process.is_alive()]
+
+    def _kill_workers(self) -> None:
+        """Kill all worker processes of the pool and the processes they started."""
+        processes = self._worker_processes()
+        descendants = [pid for process in processes for pid in descendant_pids(process.pid)]
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+        kill_processes(descendants)
+
+    def _restart_executor(self) -> None:
+        """Replace a broken pool by a new one, the remaining workers of the broken pool are killed."""
+        self._kill_workers()
+        self._executor.shutdown(wait=True)
+        self._executor = self._start_executor()
+
+    def close(self) -> None:
+        """Wait for all running simulations and shut down the GeckoCIRCUITS instances."""
+        self._executor.shutdown(wait=True)
+
+    def terminate(self) -> None:
+        """Stop all worker processes and their GeckoCIRCUITS instances immediately without waiting for running simulations."""
+        self._kill_workers()
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,261 @@
+"""Supervise a GeckoCIRCUITS instance with time and memory limits and restart it automatically."""
+# python libraries
+import inspect
+import time
+from typing import Any, Dict, List, Optional
+import logging
+
+# own libraries
+from pygeckocircuits2.geckoCircuitsRemote import GeckoSimulation
+from pygeckocircuits2.geckoWorker import GeckoWorker, process_tree_rss
+
+logger = logging.getLogger(__name__)
+
+# calls which change the state of the instance, they are applied again after a restart
+REPLAYED_METHODS = ('open_file', 'set_global_parameters', 'set_component_values', 'set_switch_values', 'set_loss_file',
+                    'set_nonlinear_file', 'set_sim_time')
+
+
+class SupervisedGeckoSimulation:
+    """
+    Run a GeckoSimulation in a worker process under a watchdog.
+
+    While a call is running, the watchdog checks its wall-clock time and the resident memory of the worker process
+    including the GeckoCIRCUITS JVM. If the timeout or the memory limit is exceeded, or the worker crashes, the worker and
+    its GeckoCIRCUITS instance are killed and started again on the same port. The simulation file is opened and all
+    parameters set before are applied again, then the call is repeated up to retries times. If it still fails, the
+    exception is raised, so the operating point can be marked as failed while the instance is ready for the next one.
+    Only the latest value of every parameter, file and simulation time is applied again, so a restart after thousands of
+    calls takes as long as after a few.
+
+    Every restart is recorded with its reason ('timeout', 'memory', 'crash' or 'recycle'), see restarts and
+    get_restart_statistics().
+
+    The memory is measured by psutil if installed, from /proc on Linux otherwise. Without both, max_rss is ignored.
+
+    :Example:
+
+    >>> import pygeckocircuits2 as pgc
+    >>> gecko = pgc.SupervisedGeckoSimulation('path/to/simfile.ipes', timeout=600, max_rss=4e9, retries=1, simtime=0.05, timestep=50e-9)
+    >>> for v_in in [40, 50, 60]:
+    >>>     gecko.call('set_global_parameters', {'V_in': v_in})
+    >>>     try:
+    >>>         gecko.call('run_simulation')
+    >>>         print(gecko.call('get_values', ['i_L'], ['mean', 'rms']))
+    >>>     except Exception as e:
+    >>>         print(f'V_in = {v_in} failed: {e}')
+    >>> print(gecko.get_restart_statistics())
+    >>> gecko.close()
+    """
+
+    simfilepath: str
+    timeout: Optional[float]
+    max_rss: Optional[float]
+    retries: int
+    recycle_after: Optional[int]
+    poll_interval: float
+    simulation_kwargs: Dict
+    restarts: List[Dict]
+
+    def __init__(self, simfilepath: str, timeout: float = None, max_rss: float = None, retries: int = 1, recycle_after: int = None,
+                 poll_interval: float = 1, **simulation_kwargs) -> None:
+        """
+        Start the worker process and GeckoCIRCUITS.
+
+        :param simfilepath: absolute or relative path to simulation file
+        :type simfilepath: str
+        :param timeout: default wall-clock limit of every call in seconds. Default None: no limit
+        :type timeout: float
+        :param max_rss: limit of the resident memory of the worker and GeckoCIRCUITS in bytes. Default None: no limit
+        :type max_rss: float
+        :param retries: number of repetitions of a call after a restart
+        :type retries: int
+        :param recycle_after: restart the instance after this number of simulations, to release leaked memory. Default None: never
+        :type recycle_after: int
+        :param poll_interval: time in seconds between two checks of the limits
+        :type poll_interval: float
+        :param simulation_kwargs: keyword arguments passed to GeckoSimulation (geckoport, timestep, simtime, ...)
+        :type simulation_kwargs: Dict
+        """
+        self.simfilepath = simfilepath
+        self.timeout = timeout
+        self.max_rss = max_rss
+        self.retries = retries
+        self.recycle_after = recycle_after
+        self.poll_interval = poll_interval
+        self.simulation_kwargs = simulation_kwargs
+        self.restarts = []
+        # latest values of the successful state changing calls since the last open_file(), see _record()
+        self._state = self._empty_state()
+        self._simulations = 0
+        self._worker = GeckoWorker(simfilepath, **simulation_kwargs)
+
+    def _restart(self, reason: str, method: str, detail: str) -> None:
+        """
+        Kill the worker and GeckoCIRCUITS, start them again and apply the recorded state changes.
+
+        :param reason: 'timeout', 'memory', 'crash' or 'recycle'
+        :type reason: str
+        :param method: method which was running
+        :type method: str
+        :param detail: description of the limit
+        :type detail: str
+        """
+        logger.warning(f'Restart GeckoCIRCUITS ({reason} in {method}: {detail})')
+        self.restarts.append({'time': time.time(), 'reason': reason, 'method': method, 'detail': detail})
+        self._worker.terminate()
+        self._worker = GeckoWorker(self.simfilepath, **self.simulation_kwargs)
+        self._simulations = 0
+        state = self._state
+        if state['sim_time']:
+            self._worker.call('set_sim_time', **state['sim_time'])
+        if state['global_parameters']:
+            self._worker.call('set_global_parameters', state['global_parameters'])
+        for method, files in (('set_loss_file', state['loss_files']), ('set_nonlinear_file', state['nonlinear_files'])):
+            for path in dict.fromkeys(files.values()):
+                self._worker.call(method, [name for name, name_path in files.items() if name_path == path], path)
+        for component_name, component_dict in state['component_values'].items():
+            self._worker.call('set_component_values', component_name, component_dict)
+
+    @staticmethod
+    def _empty_state() -> Dict[str, Dict]:
+        """
+        Return the state of a freshly opened file, without changes.
+
+        :return: state dict, see _record()
+        :rtype: Dict[str, Dict]
+        """
+        return {'sim_time': {}, 'global_parameters': {}, 'loss_files': {}, 'nonlinear_files': {}, 'component_values': {}}
+
+    def _record(self, method: str, args: tuple, kwargs: Dict) -> None:
+        """
+        Merge a successful state changing call into the state which is applied again after a restart.
+
+        :param method: name of the GeckoSimulation method, one of REPLAYED_METHODS except open_file
+        :type method: str
+        :param args: positional arguments of the method
+        :type args: tuple
+        :param kwargs: keyword arguments of the method
+        :type kwargs: Dict
+        """
+        arguments = inspect.signature(getattr(GeckoSimulation, method)).bind(None, *args, **kwargs).arguments
+        state = self._state
+        if method == 'set_sim_time':
+            state['sim_time'].update({name: value for name, value in arguments.items() if name != 'self' and value is not None})
+        elif method == 'set_global_parameters':
+            state['global_parameters'].update(arguments['params_dict'])
+        elif method == 'set_component_values':
+            state['component_values'].setdefault(arguments['component_name'].upper(), {}).update(arguments['component_dict'])
+        elif method == 'set_switch_values':
+            # the switch type only selects the valid keys, the values are component values
+            state['component_values'].setdefault(arguments['component_name'].upper(), {}).update(arguments['switch_key_value_dict'])
+        else:
+            names = arguments['component_names' if method == 'set_loss_file' else 'capacitor_names']
+            files = state['loss_files' if method == 'set_loss_file' else 'nonlinear_files']
+            for name in [names] if isinstance(names, str) else names:
+                files[name.upper()] = arguments['loss_file_path']
+
+    def _supervised_call(self, method: str, args: tuple, kwargs: Dict, timeout: Optional[float]) -> Any:
+        """
+        Call a method once and watch the limits.
+
+        :param method: name of the GeckoSimulation method
+        :type method: str
+        :param args: positional arguments of the method
+        :type args: tuple
+        :param kwargs: keyword arguments of the method
+        :type kwargs: Dict
+        :param timeout: wall-clock limit in seconds, None for no limit
+        :type timeout: float
+        :raises TimeoutError: if the call exceeds the timeout
+        :raises MemoryError: if the worker exceeds the memory limit
+        :return: result of the method
+        :rtype: Any
+        """
+        start = time.monotonic()
+        self._worker.send(method, *args, **kwargs)
+        while True:
+            wait = self.poll_interval if timeout is None else min(self.poll_interval, max(timeout - (time.monotonic() - start), 0))
+            if self._worker.poll(wait):
+                return self._worker.receive()
+            if timeout is not None and time.monotonic() - start >= timeout:
+                raise TimeoutError(f'{method} did not finish within {timeout} s')
+            if self.max_rss is not None:
+                rss = process_tree_rss(self._worker.pid)
+                if rss is not None and rss > self.max_rss:
+                    raise MemoryError(f'{rss / 1e6:.0f} MB resident memory exceeds the limit of {self.max_rss / 1e6:.0f} MB')
+
+    def call(self, method: str, *args, timeout: float = None, **kwargs) -> Any:
+        """
+        Call a method of the GeckoSimulation in the worker under the watchdog.
+
+        :param method: name of the GeckoSimulation method, e.g. 'run_simulation'
+        :type method: str
+        :param args: positional arguments of the method
+        :type args: Any
+        :param timeout: wall-clock limit in seconds. Default None: timeout of the instance
+        :type timeout: float
+        :param kwargs: keyword arguments of the method
+        :type kwargs: Any
+        :raises Exception: if the call exceeds a limit or crashes the worker after all retries. The instance is restarted.
+        :return: result of the method
+        :rtype: Any
+        """
+        timeout = self.timeout if timeout is None else timeout
+        if method.startswith('run_') and self.recycle_after is not None and self._simulations >= self.recycle_after:
+            self._restart('recycle', method, f'{self._simulations} simulations')
+        for attempt in range(self.retries + 1):
+            try:
+                result = self._supervised_call(method, args, kwargs, timeout)
+            except TimeoutError as e:
+                reason, detail = 'timeout', str(e)
+            except MemoryError as e:
+                reason, detail = 'memory', str(e)
+            except Exception as e:
+                if self._worker.is_alive() and not isinstance(e.__cause__, (EOFError, OSError)):
+                    # an error of the simulation itself, e.g. an unknown component. A restart would not help.
+                    raise
+                reason, detail = 'crash', repr(e.__cause__ or e)
+            else:
+                if method == 'open_file':
+                    self._state = self._empty_state()
+                    self.simfilepath = args[0] if args else kwargs.get('simfilepath', self.simfilepath)
+                elif method in REPLAYED_METHODS:
+                    self._record(method, args, kwargs)
+                elif method.startswith('run_'):
+                    self._simulations += 1
+                return result
+            self._restart(reason, method, detail)
+            if attempt < self.retries:
+                logger.info(f'Repeat {method} ({attempt + 1}/{self.retries})')
+        raise Exception(f'{method} failed after {self.retries + 1} attempts: {detail}')
+
+    def get_restart_statistics(self) -> Dict[str, int]:
+        """
+        Count the restarts by reason.
+
+        :return: dict with the total number of 'restarts' and the number per reason
+        :rtype: Dict[str, int]
+        """
+        statistics = {'restarts': len(self.restarts)}
+        for restart in self.restarts:
+            statistics[restart['reason']] = statistics.get(restart['reason'], 0) + 1
+        return statistics
+
+    def is_alive(self) -> bool:
+        """
+        Return whether the worker process is running.
+
+        :return: True if the worker process is running
+        :rtype: bool
+        """
+        return self._worker.is_alive()
+
+    def close(self, timeout: float = 30) -> None:
+        """
+        Shut down GeckoCIRCUITS and stop the worker process.
+
+        :param timeout: time in seconds to wait for the worker process
+        :type timeout: float
+        """
+        self._worker.close(timeout)
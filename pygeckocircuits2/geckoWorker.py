@@ -0,0 +1,324 @@
+"""Run a GeckoSimulation in a dedicated worker process and call its methods through a pipe."""
+# python libraries
+import multiprocessing
+import os
+import signal
+from multiprocessing.connection import Connection
+from typing import Any, Dict, List, Optional
+import logging
+
+# own libraries
+from pygeckocircuits2.geckoCircuitsRemote import GeckoSimulation
+
+logger = logging.getLogger(__name__)
+
+
+def _worker_main(connection: Connection, simfilepath: str, simulation_kwargs: Dict) -> None:
+    """
+    Start GeckoCIRCUITS and execute the method calls received through the pipe until None or the end of the pipe.
+
+    Every message is (method name, args, kwargs), every answer is (result, exception).
+
+    :param connection: worker end of the pipe
+    :type connection: multiprocessing.connection.Connection
+    :param simfilepath: absolute or relative path to simulation file
+    :type simfilepath: str
+    :param simulation_kwargs: keyword arguments passed to GeckoSimulation
+    :type simulation_kwargs: Dict
+    """
+    try:
+        simulation = GeckoSimulation(simfilepath, **simulation_kwargs)
+    except BaseException as e:
+        connection.send((None, Exception(f'GeckoCIRCUITS worker could not start: {e!r}')))
+        return
+    connection.send((None, None))
+    while True:
+        try:
+            message = connection.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        method, args, kwargs = message
+        try:
+            connection.send((getattr(simulation, method)(*args, **kwargs), None))
+        except Exception as e:
+            try:
+                connection.send((None, e))
+            except Exception:
+                # e.g. java exceptions can not be pickled
+                connection.send((None, Exception(repr(e))))
+    # dropping the last reference calls GeckoSimulation.__del__(), which shuts down the instance
+    del simulation
+
+
+def _child_pids(pid: int) -> Dict[int, List[int]]:
+    """
+    Return the child processes of all processes, read from /proc (Linux).
+
+    :param pid: process id, its children are always part of the result
+    :type pid: int
+    :return: dict of process ids to the ids of their children
+    :rtype: Dict[int, List[int]]
+    """
+    children = {pid: []}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r', encoding='utf-8') as file:
+                # the process name may contain spaces and brackets, the parent id is the second field after it
+                parent = int(file.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+    return children
+
+
+def descendant_pids(pid: int) -> List[int]:
+    """
+    Return the ids of all descendants of a process, e.g. the GeckoCIRCUITS JVM started by a worker.
+
+    Uses psutil if installed, /proc otherwise. Without both (e.g. Windows without psutil), the list is empty.
+
+    :param pid: process id
+    :type pid: int
+    :return: process ids of children, grandchildren, ...
+    :rtype: List[int]
+    """
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil is not None:
+        try:
+            return [child.pid for child in psutil.Process(pid).children(recursive=True)]
+        except psutil.Error:
+            return []
+    if not os.path.isdir('/proc'):
+        return []
+    children = _child_pids(pid)
+    descendants = []
+    parents = [pid]
+    while parents:
+        parent_children = children.get(parents.pop(), [])
+        descendants += parent_children
+        parents += parent_children
+    return descendants
+
+
+def process_tree_rss(pid: int) -> Optional[int]:
+    """
+    Return the resident memory of a process and all its descendants.
+
+    Uses psutil if installed, /proc otherwise.
+
+    :param pid: process id
+    :type pid: int
+    :return: resident memory in bytes, None if it can not be determined on this system
+    :rtype: int
+    """
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    rss = 0
+    for process_id in [pid] + descendant_pids(pid):
+        if psutil is not None:
+            try:
+                rss += psutil.Process(process_id).memory_info().rss
+            except psutil.Error:
+                pass
+        elif os.path.isdir('/proc'):
+            try:
+                with open(f'/proc/{process_id}/status', 'r', encoding='utf-8') as file:
+                    for line in file:
+                        if line.startswith('VmRSS:'):
+                            rss += int(line.split()[1]) * 1024
+            except OSError:
+                pass
+        else:
+            return None
+    return rss
+
+
+def kill_processes(pids: List[int]) -> None:
+    """
+    Kill processes, ignoring processes which already stopped.
+
+    :param pids: process ids
+    :type pids: List[int]
+    """
+    for pid in pids:
+        try:
+            os.kill(pid, getattr(signal, 'SIGKILL', signal.SIGTERM))
+        except OSError:
+            pass
+
+
+class GeckoWorker:
+    """
+    Own a GeckoSimulation in a separate process and call its methods remotely.
+
+    pyjnius allows only one JVM per process, so every worker process starts its own JVM and GeckoCIRCUITS instance.
+    Use a separate geckoport for every worker. Calls are executed one after another in the order they are sent.
+
+    :Example:
+
+    >>> import pygeckocircuits2 as pgc
+    >>> worker = pgc.GeckoWorker('path/to/simfile.ipes', geckoport=43037, simtime=0.05, timestep=50e-9)
+    >>> worker.call('set_global_parameters', {'V_in': 60})
+    >>> worker.call('run_simulation')
+    >>> values = worker.call('get_values', ['i_L'], ['mean', 'rms'])
+    >>> worker.close()
+    """
+
+    simfilepath: str
+    simulation_kwargs: Dict
+
+    def __init__(self, simfilepath: str, start_timeout: float = None, wait: bool = True, **simulation_kwargs) -> None:
+        """
+        Start the worker process and wait until GeckoCIRCUITS has opened the simulation file.
+
+        :param simfilepath: absolute or relative path to simulation file
+        :type simfilepath: str
+        :param start_timeout: time in seconds to wait for GeckoCIRCUITS, see wait_started(). Default None: no timeout
+        :type start_timeout: float
+        :param wait: False to return at once after starting the process, wait_started() must be called before the first call
+        :type wait: bool
+        :param simulation_kwargs: keyword arguments passed to GeckoSimulation (geckoport, timestep, simtime, ...).
+            interactive defaults to False, as the worker can not ask for input.
+        :type simulation_kwargs: Dict
+        """
+        self.simfilepath = simfilepath
+        self.simulation_kwargs = {'interactive': False, **simulation_kwargs}
+        # spawn instead of fork: a forked JVM is not usable in the child process
+        context = multiprocessing.get_context('spawn')
+        self._connection, worker_connection = context.Pipe()
+        self._process = context.Process(target=_worker_main, args=(worker_connection, simfilepath, self.simulation_kwargs), daemon=True)
+        self._process.start()
+        worker_connection.close()
+        if wait:
+            self.wait_started(start_timeout)
+
+    def wait_started(self, timeout: float = None) -> None:
+        """
+        Wait until GeckoCIRCUITS has opened the simulation file. The worker is terminated if it does not start within the timeout.
+
+        :param timeout: time in seconds to wait. Default None: no timeout
+        :type timeout: float
+        :raises TimeoutError: if GeckoCIRCUITS did not start within the timeout
+        :raises Exception: if the worker stopped or GeckoCIRCUITS could not open the simulation file
+        """
+        if timeout is not None and not self.poll(timeout):
+            self.terminate()
+            raise TimeoutError(f'GeckoCIRCUITS did not start within {timeout} s')
+        self.receive()
+
+    def receive(self) -> Any:
+        """
+        Wait for the answer of the worker.
+
+        :raises Exception: if the worker stopped or the call raised an exception in the worker
+        :return: result of the call
+        :rtype: Any
+        """
+        try:
+            result, error = self._connection.recv()
+        except (EOFError, OSError) as e:
+            raise Exception('GeckoCIRCUITS worker stopped') from e
+        if error is not None:
+            raise error
+        return result
+
+    def call(self, method: str, *args, **kwargs) -> Any:
+        """
+        Call a method of the GeckoSimulation in the worker and wait for the result.
+
+        :param method: name of the GeckoSimulation method, e.g. 'run_simulation'
+        :type method: str
+        :param args: positional arguments of the method
+        :type args: Any
+        :param kwargs: keyword arguments of the method
+        :type kwargs: Any
+        :return: result of the method
+        :rtype: Any
+        """
+        self.send(method, *args, **kwargs)
+        return self.receive()
+
+    def send(self, method: str, *args, **kwargs) -> None:
+        """
+        Send a method call to the worker without waiting, the result is returned by receive().
+
+        :param method: name of the GeckoSimulation method, e.g. 'run_simulation'
+        :type method: str
+        :param args: positional arguments of the method
+        :type args: Any
+        :param kwargs: keyword arguments of the method
+        :type kwargs: Any
+        """
+        self._connection.send((method, args, kwargs))
+
+    def poll(self, timeout: float = 0) -> bool:
+        """
+        Wait until the result of the sent call is available.
+
+        :param timeout: maximum time to wait in seconds
+        :type timeout: float
+        :return: True if the result is available or the worker stopped, False after the timeout
+        :rtype: bool
+        """
+        try:
+            return self._connection.poll(timeout)
+        except (EOFError, OSError):
+            return True
+
+    @property
+    def pid(self) -> int:
+        """
+        Return the process id of the worker.
+
+        :return: process id
+        :rtype: int
+        """
+        return self._process.pid
+
+    def is_alive(self) -> bool:
+        """
+        Return whether the worker process is running.
+
+        :return: True if the worker process is running
+        :rtype: bool
+        """
+        return self._process.is_alive()
+
+    def close(self, timeout: float = 30) -> None:
+        """
+        Shut down GeckoCIRCUITS and stop the worker process. The process is terminated if it does not stop within the timeout.
+
+        :param timeout: time in seconds to wait for the worker process
+        :type timeout: float
+        """
+        if self._process.is_alive():
+            try:
+                self._connection.send(None)
+            except OSError:
+                pass
+            self._process.join(timeout)
+        if self._process.is_alive():
+            self.terminate()
+        self._connection.close()
+
+    def terminate(self) -> None:
+        """
+        Stop the worker process and the GeckoCIRCUITS instance it started immediately, e.g. to abort a running simulation.
+
+        Note: without psutil, the GeckoCIRCUITS instance can only be found on Linux. Elsewhere, it is not shut down and may
+        need to be closed manually.
+        """
+        logger.warning(f'Terminate GeckoCIRCUITS worker {self._process.pid}')
+        descendants = descendant_pids(self._process.pid) if self._process.is_alive() else []
+        self._process.terminate()
+        self._process.join()
+        kill_processes(descendants)
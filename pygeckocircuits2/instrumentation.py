@@ -0,0 +1,270 @@
+"""Record the calls to GeckoCIRCUITS (counts, latencies, transferred bytes) and the phase timings of every run."""
+# python libraries
+import json
+import time
+import contextlib
+from typing import Any, Dict, Iterator, List, TYPE_CHECKING
+import logging
+
+# 3rd party libraries
+import numpy as np
+
+if TYPE_CHECKING:
+    # imported in to_dataframe() only, to keep the import of this module fast
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# percentiles of the call latencies in get_statistics()
+PERCENTILES = (50, 90, 99)
+
+
+def _payload_size(value: Any) -> int:
+    """
+    Estimate the number of bytes of a value transferred between python and java.
+
+    Numbers count 8 bytes, strings one byte per character, lists and arrays the sum of their elements.
+
+    :param value: argument or return value of a call
+    :type value: Any
+    :return: estimated number of bytes
+    :rtype: int
+    """
+    if isinstance(value, (bool, int, float)):
+        return 8
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (list, tuple)):
+        if value and isinstance(value[0], (int, float)):
+            # signal data: avoid a python loop over millions of points
+            return 8 * len(value)
+        return sum(_payload_size(element) for element in value)
+    return 0
+
+
+class _InstrumentedRemoteObject:
+    """Proxy of the GeckoCIRCUITS remote object, which times every method call and forwards it unchanged."""
+
+    def __init__(self, remote_object: Any, instrumentation: 'GeckoInstrumentation') -> None:
+        """
+        Wrap the remote object.
+
+        :param remote_object: remote object of GeckoCIRCUITS
+        :type remote_object: gecko.GeckoRemoteObject
+        :param instrumentation: recorder of the calls
+        :type instrumentation: GeckoInstrumentation
+        """
+        self._remote_object = remote_object
+        self._instrumentation = instrumentation
+
+    def __getattr__(self, name: str) -> Any:
+        """
+        Return the attribute of the remote object, methods are wrapped by a timer.
+
+        :param name: name of the attribute
+        :type name: str
+        :return: attribute of the remote object
+        :rtype: Any
+        """
+        attribute = getattr(self._remote_object, name)
+        if not callable(attribute):
+            return attribute
+        record_call = self._instrumentation.record_call
+
+        def timed_call(*args: Any) -> Any:
+            start = time.perf_counter()
+            result = None
+            try:
+                result = attribute(*args)
+                return result
+            finally:
+                record_call(name, time.perf_counter() - start, _payload_size(args) + _payload_size(result))
+
+        return timed_call
+
+
+class GeckoInstrumentation:
+    """
+    Record every call of a GeckoSimulation to GeckoCIRCUITS and the time spent in the phases of every run.
+
+    Pass an instance to GeckoSimulation(instrumentation=...). Without instrumentation, GeckoSimulation talks to
+    GeckoCIRCUITS directly, so there is no overhead when it is disabled.
+
+    Phases are 'startup' (JVM and GeckoCIRCUITS), 'open_file', 'set_parameters', 'get_parameters', 'run_simulation' and
+    'data_extraction'.
+    A run starts with the first parameter setting or run_simulation() after the previous simulation and includes the
+    following data extraction. Startup and opening the file belong to run 0.
+
+    :Example:
+
+    >>> import pygeckocircuits2 as pgc
+    >>> instrumentation = pgc.GeckoInstrumentation()
+    >>> buck_converter = pgc.GeckoSimulation('path/to/gecko_file.ipes', instrumentation=instrumentation)
+    >>> buck_converter.set_component_values('L.1', {'iL(0)': 10})
+    >>> buck_converter.run_simulation()
+    >>> print(instrumentation.to_dataframe())
+    >>> instrumentation.write_prometheus('gecko.prom')
+    """
+
+    call_durations: Dict[str, List[float]]
+    call_bytes: Dict[str, int]
+    phases: List[Dict]
+    run: int
+
+    def __init__(self) -> None:
+        """Create an empty recorder."""
+        self.call_durations = {}
+        self.call_bytes = {}
+        self.phases = []
+        self.run = 0
+        self._phase_depth = 0
+        self._simulated = False
+
+    def wrap(self, remote_object: Any) -> _InstrumentedRemoteObject:
+        """
+        Wrap the remote object of GeckoCIRCUITS, so all method calls are recorded.
+
+        :param remote_object: remote object of GeckoCIRCUITS
+        :type remote_object: gecko.GeckoRemoteObject
+        :return: proxy of the remote object
+        :rtype: _InstrumentedRemoteObject
+        """
+        return _InstrumentedRemoteObject(remote_object, self)
+
+    def record_call(self, method: str, duration: float, transferred_bytes: int) -> None:
+        """
+        Record a single call to GeckoCIRCUITS.
+
+        :param method: name of the java method
+        :type method: str
+        :param duration: duration of the call in seconds
+        :type duration: float
+        :param transferred_bytes: estimated bytes of arguments and return value
+        :type transferred_bytes: int
+        """
+        self.call_durations.setdefault(method, []).append(duration)
+        self.call_bytes[method] = self.call_bytes.get(method, 0) + transferred_bytes
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Measure the time of a phase. Nested phases are counted only once, as part of the outermost phase.
+
+        :param name: name of the phase, e.g. 'set_parameters'
+        :type name: str
+        :return: context manager
+        :rtype: Iterator[None]
+        """
+        if self._phase_depth == 0 and name in ('set_parameters', 'run_simulation'):
+            if self.run == 0 or self._simulated:
+                self.run += 1
+                self._simulated = False
+            if name == 'run_simulation':
+                self._simulated = True
+        self._phase_depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._phase_depth -= 1
+            if self._phase_depth == 0:
+                self.phases.append({'run': self.run, 'phase': name, 'duration': time.perf_counter() - start})
+
+    def reset(self) -> None:
+        """Delete all recorded calls and phases."""
+        self.call_durations = {}
+        self.call_bytes = {}
+        self.phases = []
+        self.run = 0
+        self._simulated = False
+
+    def get_statistics(self) -> Dict[str, Dict[str, float]]:
+        """
+        Summarize the recorded calls per java method.
+
+        :return: dict of method names to dicts with 'count', 'total', 'mean', 'p50', 'p90', 'p99', 'max' (seconds) and 'bytes'
+        :rtype: Dict[str, Dict[str, float]]
+        """
+        statistics = {}
+        for method, durations in self.call_durations.items():
+            durations = np.asarray(durations)
+            method_statistics = {'count': len(durations), 'total': float(durations.sum()), 'mean': float(durations.mean())}
+            percentile_values = np.percentile(durations, PERCENTILES)
+            for index, percentile in enumerate(PERCENTILES):
+                method_statistics[f'p{percentile}'] = float(percentile_values[index])
+            method_statistics['max'] = float(durations.max())
+            method_statistics['bytes'] = self.call_bytes[method]
+            statistics[method] = method_statistics
+        return statistics
+
+    def get_run_breakdown(self) -> Dict[int, Dict[str, float]]:
+        """
+        Sum up the phase timings of every run.
+
+        :return: dict of run numbers to dicts of phase names and durations in seconds
+        :rtype: Dict[int, Dict[str, float]]
+        """
+        breakdown = {}
+        for record in self.phases:
+            run_phases = breakdown.setdefault(record['run'], {})
+            run_phases[record['phase']] = run_phases.get(record['phase'], 0) + record['duration']
+        return breakdown
+
+    def to_dataframe(self) -> 'pd.DataFrame':
+        """
+        Return the call statistics as DataFrame, one row per java method, sorted by the total time.
+
+        :return: call statistics
+        :rtype: pd.DataFrame
+        """
+        import pandas as pd
+        df = pd.DataFrame.from_dict(self.get_statistics(), orient='index')
+        if not df.empty:
+            df = df.sort_values('total', ascending=False)
+        return df
+
+    def write_json_lines(self, file_name: str) -> None:
+        """
+        Write the call statistics and the phase records as JSON lines, one object per line with a 'type' of 'call' or 'phase'.
+
+        :param file_name: name of the file
+        :type file_name: str
+        """
+        with open(file_name, 'w', encoding='utf-8') as file:
+            for method, method_statistics in self.get_statistics().items():
+                file.write(json.dumps({'type': 'call', 'method': method, **method_statistics}) + '\n')
+            for record in self.phases:
+                file.write(json.dumps({'type': 'phase', **record}) + '\n')
+
+    def write_prometheus(self, file_name: str, prefix: str = 'pygeckocircuits2') -> None:
+        """
+        Write the call statistics and the total phase timings in the Prometheus text format, e.g. for the textfile collector.
+
+        :param file_name: name of the file
+        :type file_name: str
+        :param prefix: prefix of the metric names
+        :type prefix: str
+        """
+        lines = [f'# HELP {prefix}_call_seconds Duration of the calls to GeckoCIRCUITS',
+                 f'# TYPE {prefix}_call_seconds summary']
+        statistics = self.get_statistics()
+        for method, method_statistics in statistics.items():
+            for percentile in PERCENTILES:
+                lines.append(f'{prefix}_call_seconds{{method="{method}",quantile="{percentile / 100}"}} {method_statistics[f"p{percentile}"]}')
+            lines.append(f'{prefix}_call_seconds_sum{{method="{method}"}} {method_statistics["total"]}')
+            lines.append(f'{prefix}_call_seconds_count{{method="{method}"}} {method_statistics["count"]}')
+        lines += [f'# HELP {prefix}_call_bytes_total Estimated bytes transferred by the calls to GeckoCIRCUITS',
+                  f'# TYPE {prefix}_call_bytes_total counter']
+        for method, method_statistics in statistics.items():
+            lines.append(f'{prefix}_call_bytes_total{{method="{method}"}} {method_statistics["bytes"]}')
+        lines += [f'# HELP {prefix}_phase_seconds_total Time spent in the phases of all runs',
+                  f'# TYPE {prefix}_phase_seconds_total counter']
+        phase_totals = {}
+        for record in self.phases:
+            phase_totals[record['phase']] = phase_totals.get(record['phase'], 0) + record['duration']
+        for phase_name, duration in phase_totals.items():
+            lines.append(f'{prefix}_phase_seconds_total{{phase="{phase_name}"}} {duration}')
+        with open(file_name, 'w', encoding='utf-8') as file:
+            file.write('\n'.join(lines) + '\n')
@@ -0,0 +1,781 @@
+"""Read GeckoCIRCUITS simulation files (.ipes) without starting GeckoCIRCUITS."""
+# python libraries
+import gzip
+import os
+import zlib
+from typing import Union, List, Tuple, Dict, Optional, Iterable, Iterator
+import logging
+
+logger = logging.getLogger(__name__)
+
+# GeckoCIRCUITS writes this placeholder for empty strings, e.g. for not connected labels
+NOT_DEFINED = 'NIX_NIX_NIX'
+
+# text blocks containing user code, their content is not parsed
+_CODE_BLOCKS = ('scripterCode', 'scripterImports', 'scripterDeclarations', 'extraScriptSourceFiles')
+
+# fields every element has, these are no parameters of the component
+_STRUCTURE_KEYS = ('labelAnfangsKnoten[]', 'labelEndKnoten[]', 'enabledShorted', 'parentSheetIdentifier', 'typ',
+                   'uniqueObjectIdentifier', 'x', 'y', 'parameter[]', 'parameterString[]', 'nameOpt[]', 'orientierung',
+                   'idStringDialog', 'coupledReferenceID[]', 'copyCoupledReferenceID[]', 'internalIndex', 'internalString',
+                   'shiftLabelsIn[]', 'shiftLabelsOut[]', 'dxTxt', 'dyTxt')
+
+# names of the simulation time arguments of GeckoSimulation and the corresponding .ipes fields
+SIM_TIME_FIELDS = {'simtime': 'tDURATION', 'timestep': 'dt', 'simtime_pre': 'T_pre', 'timestep_pre': 'dt_pre'}
+
+
+def _parse_value(key: str, raw_value: str) -> Union[float, int, bool, str, List]:
+    """
+    Convert the raw text value of an .ipes field to a python value.
+
+    Array fields (key ending with '[]') are returned as list. String arrays are separated by '/', number arrays by spaces.
+
+    :param key: name of the field, e.g. 'inductance' or 'savedSignalNames[]'
+    :type key: str
+    :param raw_value: text value of the field as written in the file
+    :type raw_value: str
+    :return: value as int, float, bool, str or list of these
+    :rtype: Union[float, int, bool, str, List]
+    """
+    if key.endswith('[]'):
+        if raw_value.startswith('/'):
+            return raw_value.split('/')[1:]
+        return [_parse_value('', item) for item in raw_value.split()]
+    if raw_value in ('true', 'false'):
+        return raw_value == 'true'
+    for conversion in (int, float):
+        try:
+            return conversion(raw_value)
+        except ValueError:
+            pass
+    return raw_value
+
+
+def _format_value(value: Union[float, int, bool, str], raw_value: str = '') -> str:
+    """
+    Convert a python value to the text written into an .ipes file.
+
+    :param value: new value of the field
+    :type value: Union[float, int, bool, str]
+    :param raw_value: current text value of the field, integer fields stay integers
+    :type raw_value: str
+    :return: text value
+    :rtype: str
+    """
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, str):
+        return value
+    if isinstance(value, int) and isinstance(_parse_value('', raw_value), int):
+        return str(value)
+    return repr(float(value))
+
+
+def _gecko_file_id(data: bytes) -> int:
+    """
+    Return an identifier for a new file of the GeckoFileManager: the CRC-32 of the content as signed 32 bit integer.
+
+    GeckoCIRCUITS links the components to their loss file only by this value (lossFileHashValue of the component, hashValue
+    of the file entry). It does not recalculate the value from the file content, and the value GeckoCIRCUITS writes can
+    not be reproduced from the content, so any unique value works. The CRC-32 is used as it is unique per content and the
+    same for all variants.
+
+    :param data: file content
+    :type data: bytes
+    :return: signed 32 bit identifier
+    :rtype: int
+    """
+    hash_value = zlib.crc32(data)
+    return hash_value - (1 << 32) if hash_value >= (1 << 31) else hash_value
+
+
+def read_ipes_lines(filepath: str) -> List[str]:
+    """
+    Read the text lines of an .ipes file. The file is gzip-compressed, but also plain text files are accepted.
+
+    The text is decoded as latin-1, so every byte is kept and a rewritten file differs only in the changed values.
+
+    :param filepath: path to the .ipes file
+    :type filepath: str
+    :return: lines of the file without line endings
+    :rtype: List[str]
+    """
+    with open(filepath, 'rb') as file:
+        raw_data = file.read()
+    if raw_data[:2] == b'\x1f\x8b':
+        raw_data = gzip.decompress(raw_data)
+    return raw_data.decode('latin-1').split('\n')
+
+
+def _patch_field(patches: Dict[int, str], component: 'IpesComponent', key: str, value: str) -> None:
+    """
+    Replace a field of a component, if the component has this field.
+
+    :param patches: line patches, extended by the changed field
+    :type patches: Dict[int, str]
+    :param component: component of the base file
+    :type component: IpesComponent
+    :param key: name of the field, e.g. 'savedSignalNames[]'
+    :type key: str
+    :param value: new text value of the field
+    :type value: str
+    """
+    if key in component.fields:
+        patches[component.field_lines[key]] = f'{key} {value}'
+
+
+class IpesComponent:
+    """
+    A single component (e.g. 'L.1', 'MOSFET.1', 'SCOPE.1') of an .ipes file.
+
+    Fields are stored as raw text, see get_values() for the converted python values. Fields in nested blocks,
+    e.g. the loss file inside '<Verluste>', are stored in sections.
+    """
+
+    name: Optional[str]
+    element_type: str
+    fields: Dict[str, str]
+    field_lines: Dict[str, int]
+    sections: Dict[str, Dict[str, str]]
+    section_lines: Dict[str, Dict[str, int]]
+    parameter_names: Dict[str, str]
+    start_line: int
+    end_line: int
+
+    def __init__(self, element_type: str, start_line: int) -> None:
+        """
+        Create an empty component, the fields are filled by the parser.
+
+        :param element_type: type of the element block, e.g. 'ElementLK' for circuit or 'ElementCONTROL' for control components
+        :type element_type: str
+        :param start_line: index of the line opening the element block
+        :type start_line: int
+        """
+        self.name = None
+        self.element_type = element_type
+        self.fields = {}
+        self.field_lines = {}
+        self.sections = {}
+        self.section_lines = {}
+        # component field -> global parameter (with '$'), e.g. {'inductance': '$L'}
+        self.parameter_names = {}
+        self.start_line = start_line
+        self.end_line = start_line
+
+    def __repr__(self) -> str:
+        """
+        Return a short description of the component.
+
+        :return: description of the component
+        :rtype: str
+        """
+        return f'IpesComponent({self.name!r}, {self.element_type!r})'
+
+    def get_keys(self) -> List[str]:
+        """
+        Return the parameter keys of the component, without the structural fields every component has.
+
+        :return: list of parameter keys as named in the .ipes file, e.g. ['inductance', 'initialCurrent', ...]
+        :rtype: List[str]
+        """
+        return [key for key in self.fields if key not in _STRUCTURE_KEYS and not key.endswith('$ParameterName')]
+
+    def get_values(self) -> Dict:
+        """
+        Return the parameter values of the component.
+
+        :return: dict of parameter keys and values converted to python types
+        :rtype: Dict
+        """
+        return {key: _parse_value(key, self.fields[key]) for key in self.get_keys()}
+
+
+class IpesFile:
+    """
+    Indexed in-memory model of a GeckoCIRCUITS simulation file (.ipes).
+
+    The file is read in a single pass, so questions about components, global parameters, scope signals and simulation times
+    are answered without starting GeckoCIRCUITS. The methods follow the naming of GeckoSimulation.
+
+    Note: the component keys are named as in the .ipes file (e.g. 'inductance', 'initialCurrent'). These names differ from the
+    keys GeckoCIRCUITS offers over the remote interface (e.g. 'L', 'iL(0)').
+
+    :Example:
+
+    >>> import pygeckocircuits2 as pgc
+    >>> ipes_file = pgc.IpesFile('path/to/simfile.ipes')
+    >>> ipes_file.get_global_parameters(['V_in', 'f_s'])
+    >>> ipes_file.get_sim_time()
+    """
+
+    filepath: str
+    lines: List[str]
+    fields: Dict[str, str]
+    field_lines: Dict[str, int]
+    components: Dict[str, IpesComponent]
+    global_parameters: Dict[str, float]
+    global_parameter_usage: Dict[str, List[Tuple[str, str]]]
+    connection_labels: List[str]
+    gecko_files: List[Dict]
+    gecko_file_manager_lines: Optional[Tuple[int, int]]
+
+    def __init__(self, filepath: str) -> None:
+        """
+        Read and index the given .ipes file.
+
+        :param filepath: absolute or relative path to simulation file
+        :type filepath: str
+        """
+        self.filepath = os.path.abspath(filepath)
+        self.lines = read_ipes_lines(self.filepath)
+        self.fields = {}
+        self.field_lines = {}
+        self.components = {}
+        self.global_parameters = {}
+        # global parameter (with '$') -> [(component name, component field), ...]
+        self.global_parameter_usage = {}
+        self.connection_labels = []
+        # entries of the GeckoFileManager, e.g. loss files stored inside the .ipes file
+        self.gecko_files = []
+        # indices of the lines opening and closing the GeckoFileManager block
+        self.gecko_file_manager_lines = None
+        self._parse()
+
+    def _parse(self) -> None:
+        """Index the lines of the file in a single pass."""
+        stack = []
+        component = None
+        gecko_file = None
+        for index, line in enumerate(self.lines):
+            stripped = line.strip()
+            if stack and stack[-1] in _CODE_BLOCKS:
+                if stripped == f'<\\{stack[-1]}>':
+                    stack.pop()
+                continue
+            if stripped.startswith('<') and stripped.endswith('>') and ' ' not in stripped:
+                if stripped.startswith('<\\'):
+                    tag = stripped[2:-1]
+                    while stack and stack.pop() != tag:
+                        pass
+                    if component is not None and not stack:
+                        component.end_line = index
+                        self.components[component.name] = component
+                        component = None
+                    elif tag == 'GeckoFileManager' and not stack:
+                        self.gecko_file_manager_lines = (self.gecko_file_manager_lines[0], index)
+                    elif gecko_file is not None and tag == 'GeckoFile':
+                        gecko_file['end_line'] = index
+                        self.gecko_files.append(gecko_file)
+                        gecko_file = None
+                else:
+                    tag = stripped[1:-1]
+                    stack.append(tag)
+                    if len(stack) == 1 and tag.startswith('Element'):
+                        component = IpesComponent(tag, index)
+                    elif stack == ['GeckoFileManager']:
+                        self.gecko_file_manager_lines = (index, index)
+                    elif stack == ['GeckoFileManager', 'GeckoFile']:
+                        gecko_file = {'start_line': index, 'usage': []}
+                continue
+
+            key, _, raw_value = stripped.partition(' ')
+            raw_value = raw_value.strip()
+            if not key:
+                continue
+            if component is not None:
+                if len(stack) == 1:
+                    # keep the first occurrence, some components repeat a key without a value
+                    if key not in component.fields:
+                        component.fields[key] = raw_value
+                        component.field_lines[key] = index
+                    if key == 'idStringDialog':
+                        component.name = raw_value
+                elif len(stack) == 2:
+                    section = component.sections.setdefault(stack[1], {})
+                    if key not in section:
+                        section[key] = raw_value
+                        component.section_lines.setdefault(stack[1], {})[key] = index
+            elif gecko_file is not None:
+                if stack[-1] == 'usageList':
+                    gecko_file['usage'].append(key)
+                elif key != 'usageList[]':
+                    gecko_file[key] = raw_value if key != 'fileContents[]' else index
+            elif stack == ['Verbindung']:
+                if key == 'label' and raw_value != NOT_DEFINED:
+                    self.connection_labels.append(raw_value)
+            elif not stack and not raw_value.startswith('('):
+                self.fields[key] = raw_value
+                self.field_lines[key] = index
+
+        self._index_global_parameters()
+
+    def _index_global_parameters(self) -> None:
+        """Read the global parameter values and find the component fields using them."""
+        names = _parse_value('optimizerName[]', self.fields.get('optimizerName[]', ''))
+        values = _parse_value('optimizerValue[]', self.fields.get('optimizerValue[]', ''))
+        self.global_parameters = {name: values[index] for index, name in enumerate(names)}
+        self.global_parameter_usage = {name: [] for name in names}
+        for component in self.components.values():
+            for key, raw_value in component.fields.items():
+                if key.endswith('$ParameterName') and raw_value.startswith('$'):
+                    field = key[:-len('$ParameterName')]
+                    component.parameter_names[field] = raw_value
+                    self.global_parameter_usage.setdefault(raw_value, []).append((component.name, field))
+
+    # -----------------------------------
+    # working with global parameters
+    # -----------------------------------
+
+    def get_global_parameters(self, parameters: Union[List, str]) -> Dict:
+        """
+        Get the value of the provided global parameter variables, see also GeckoSimulation.get_global_parameters().
+
+        :param parameters: names of the global parameters (works with and without '$')
+        :type parameters: List[str] or str
+
+        :return: dict with available parameters
+        :rtype: Dict
+        """
+        parameter_list = [parameters] if isinstance(parameters, str) else parameters
+        parameter_dict = {}
+        for name in parameter_list:
+            key = name if name.startswith('$') else '$' + name
+            if key in self.global_parameters:
+                parameter_dict[name] = self.global_parameters[key]
+            else:
+                logger.error(f'Global parameter {name} does not exist in {self.filepath}')
+        return parameter_dict
+
+    def get_parameter_usage(self, parameter: str) -> List[Tuple[str, str]]:
+        """
+        Return the component fields which are set by the given global parameter.
+
+        :param parameter: name of the global parameter (works with and without '$')
+        :type parameter: str
+
+        :return: list of (component name, component field), e.g. [('L.1', 'inductance')]
+        :rtype: List[Tuple[str, str]]
+        """
+        key = parameter if parameter.startswith('$') else '$' + parameter
+        return self.global_parameter_usage.get(key, [])
+
+    def get_sim_time(self) -> Tuple:
+        """
+        Return the simulation time settings stored in the file, in the same order as GeckoSimulation.get_sim_time().
+
+        :return: simtime, timestep, simtime_pre, timestep_pre
+        :rtype: Tuple
+        """
+        return (float(self.fields['tDURATION']), float(self.fields['dt']),
+                float(self.fields.get('T_pre', 0)), float(self.fields.get('dt_pre', 0)))
+
+    # -----------------------------------
+    # working with components
+    # -----------------------------------
+
+    def get_component(self, component_name: str) -> IpesComponent:
+        """
+        Return the component of the given name.
+
+        :param component_name: the name of the component (ex: L.1), lower case names are accepted
+        :type component_name: str
+        :raises KeyError: if the component does not exist in the file
+
+        :return: the component
+        :rtype: IpesComponent
+        """
+        for name in (component_name, component_name.upper()):
+            if name in self.components:
+                return self.components[name]
+        raise KeyError(f'Component {component_name} does not exist in {self.filepath}')
+
+    def get_component_keys(self, component_name: str) -> List:
+        """
+        Return the parameter keys of a component as named in the .ipes file.
+
+        :param component_name: the name of the component (ex: IGBT.1)
+        :type component_name: str
+
+        :return: list of the component parameter keys
+        :rtype: List
+        """
+        return self.get_component(component_name).get_keys()
+
+    def get_component_values(self, component_name: str) -> Dict:
+        """
+        Return the values of the component parameters as stored in the .ipes file.
+
+        :param component_name: the name of the component (ex: IGBT.1)
+        :type component_name: str
+
+        :return: values of the component parameters in a dict
+        :rtype: Dict
+        """
+        return self.get_component(component_name).get_values()
+
+    def get_loss_files(self) -> Dict[str, str]:
+        """
+        Return the loss file paths of all components having a loss file (e.g. switches with .scl files).
+
+        :return: dict of component names and loss file paths
+        :rtype: Dict[str, str]
+        """
+        loss_files = {}
+        for name, component in self.components.items():
+            loss_file = component.sections.get('Verluste', {}).get('datnamGemesseneVerluste', 'not_defined')
+            if loss_file != 'not_defined':
+                loss_files[name] = loss_file
+        return loss_files
+
+    # -----------------------------------
+    # working with signals (scope)
+    # -----------------------------------
+
+    def get_scope_node_names(self) -> List[str]:
+        """
+        Return the names of all signals recorded by the scopes of the file.
+
+        :return: list of node names, e.g. ['v_HS', 'v_LS', 'i_L']
+        :rtype: List[str]
+        """
+        node_names = []
+        for component in self.components.values():
+            for node in _parse_value('savedSignalNames[]', component.fields.get('savedSignalNames[]', '')):
+                if node not in node_names and node != NOT_DEFINED:
+                    node_names.append(node)
+        return node_names
+
+    def get_missing_node_names(self, node_names: Union[List, str]) -> List[str]:
+        """
+        Check node names before requesting them by GeckoSimulation.get_scope_data() or get_values().
+
+        :param node_names: the name provided to the scope nodes, e.g. ["v1", "i_l_1"]
+        :type node_names: List[str] or str
+
+        :return: node names which are not recorded by any scope. Empty list in case all nodes exist.
+        :rtype: List[str]
+        """
+        node_names = [node_names] if isinstance(node_names, str) else node_names
+        scope_node_names = set(self.get_scope_node_names())
+        return [node for node in node_names if node not in scope_node_names]
+
+
+class IpesWriter:
+    """
+    Write variants of a base .ipes file with changed parameters, e.g. to prepare the files of a large sweep.
+
+    The base file is read once. Every variant only patches the changed lines and is written in one go, so writing many
+    variants is limited by compression and disk speed. A variant is opened by GeckoSimulation like any other file,
+    so no parameters need to be set over the remote interface before the simulation.
+
+    A parameter set is a dict with the optional keys
+     * 'global_parameters': e.g. {'V_in': 60, '$f_s': 200e3}. The values are also written to all components using them.
+     * 'component_values': component fields as named in the .ipes file, e.g. {'L.1': {'inductance': 10e-6}}
+     * 'loss_files': loss files (.scl) of switches, e.g. {'MOSFET.1': 'path/to/switch.scl'}
+     * 'sim_time': e.g. {'simtime': 0.05, 'timestep': 50e-9, 'simtime_pre': 0.1, 'timestep_pre': 20e-9}
+     * 'scope_nodes': signals to record, e.g. ['i_L']. All other scope inputs are removed, see write_variant().
+
+    :Example:
+
+    >>> import pygeckocircuits2 as pgc
+    >>> writer = pgc.IpesWriter('path/to/simfile.ipes')
+    >>> parameter_sets = [{'global_parameters': {'V_in': v_in}} for v_in in range(40, 61)]
+    >>> for variant_filepath in writer.write_variants(parameter_sets, 'path/to/variants'):
+    >>>     print(variant_filepath)
+    """
+
+    base_file: IpesFile
+    compresslevel: int
+
+    def __init__(self, base_filepath: str, compresslevel: int = 1) -> None:
+        """
+        Read the base file all variants are derived from.
+
+        :param base_filepath: absolute or relative path to the base simulation file
+        :type base_filepath: str
+        :param compresslevel: gzip compression level 0...9 of the written files. Default 1 (fastest)
+        :type compresslevel: int
+        """
+        self.base_file = IpesFile(base_filepath)
+        self.compresslevel = compresslevel
+        # loss file path -> (hash value, fileContents[] line), every loss file is read only once
+        self._loss_file_cache = {}
+
+    def write_variant(self, filepath: str, global_parameters: Dict = None, component_values: Dict[str, Dict] = None,
+                      loss_files: Dict[str, str] = None, sim_time: Dict[str, float] = None, scope_nodes: Union[List, str] = None) -> str:
+        """
+        Write a single variant of the base file.
+
+        GeckoCIRCUITS stores every scope input at every time step. With scope_nodes, the scopes keep only the inputs of
+        these signals, so memory and transferred data scale with the requested signals. Scopes without any of them keep
+        a single, disconnected input. get_values() and get_scope_data() work only for the kept signals.
+
+        :param filepath: path of the new .ipes file
+        :type filepath: str
+        :param global_parameters: global parameters to change (works with and without '$'), e.g. {'V_in': 60}
+        :type global_parameters: Dict
+        :param component_values: component fields to change, e.g. {'L.1': {'inductance': 10e-6}}
+        :type component_values: Dict[str, Dict]
+        :param loss_files: loss files of switches to change, e.g. {'MOSFET.1': 'path/to/switch.scl'}
+        :type loss_files: Dict[str, str]
+        :param sim_time: simulation times to change, keys are 'simtime', 'timestep', 'simtime_pre' and 'timestep_pre'
+        :type sim_time: Dict[str, float]
+        :param scope_nodes: signals to record. Default None: all scope inputs are kept
+        :type scope_nodes: List[str] or str
+        :raises KeyError: if a global parameter, component, component field, simulation time key or scope node does not exist
+
+        :return: absolute path of the written file
+        :rtype: str
+        """
+        filepath = os.path.abspath(filepath if filepath.endswith('.ipes') else filepath + '.ipes')
+        base_file = self.base_file
+        patches = {}
+        # line index -> values of a parameter[] array, as several global parameters may change the same array
+        parameter_arrays = {}
+
+        if global_parameters:
+            parameter_names = list(base_file.global_parameters)
+            parameter_values = [repr(float(value)) for value in base_file.global_parameters.values()]
+            for key, value in global_parameters.items():
+                name = key if key.startswith('$') else '$' + key
+                if name not in base_file.global_parameters:
+                    raise KeyError(f'Global parameter {key} does not exist in {base_file.filepath}')
+                parameter_values[parameter_names.index(name)] = repr(float(value))
+                for component_name, field in base_file.global_parameter_usage[name]:
+                    component = base_file.components[component_name]
+                    patches[component.field_lines[field]] = f'{field} {_format_value(value, component.fields[field])}'
+                    # the parameter[] array holds the values in the order of the nameOpt[] array
+                    name_options = _parse_value('nameOpt[]', component.fields.get('nameOpt[]', ''))
+                    if name in name_options:
+                        line_index = component.field_lines['parameter[]']
+                        array = parameter_arrays.setdefault(line_index, component.fields['parameter[]'].split())
+                        for position, option in enumerate(name_options):
+                            if option == name and position < len(array):
+                                array[position] = repr(float(value))
+            patches[base_file.field_lines['optimizerValue[]']] = f"optimizerValue[] {' '.join(parameter_values)}  "
+        for line_index, array in parameter_arrays.items():
+            patches[line_index] = f"parameter[] {' '.join(array)} "
+
+        for component_name, component_dict in (component_values or {}).items():
+            component = base_file.get_component(component_name)
+            for field, value in component_dict.items():
+                if field not in component.fields:
+                    raise KeyError(f'Invalid key {field} provided for the component {component_name}')
+                if field in component.parameter_names:
+                    logger.warning(f'{field} of {component_name} is set by the global parameter {component.parameter_names[field]}, '
+                                   f'GeckoCIRCUITS may overwrite the value')
+                patches[component.field_lines[field]] = f'{field} {_format_value(value, component.fields[field])}'
+
+        for key, value in (sim_time or {}).items():
+            if key not in SIM_TIME_FIELDS:
+                raise KeyError(f'Invalid simulation time key {key}, valid keys: {list(SIM_TIME_FIELDS)}')
+            patches[base_file.field_lines[SIM_TIME_FIELDS[key]]] = f'{SIM_TIME_FIELDS[key]} {repr(float(value))}'
+
+        if 'path' in base_file.field_lines:
+            patches[base_file.field_lines['path']] = f'path {filepath}'
+
+        removed_lines = set()
+        if scope_nodes is not None:
+            removed_lines = self._restrict_scopes(patches, [scope_nodes] if isinstance(scope_nodes, str) else scope_nodes)
+
+        lines = list(base_file.lines)
+        for line_index, line in patches.items():
+            lines[line_index] = line
+        for line_index in removed_lines:
+            # removed after the loss file replacement, which works with the line indices of the base file
+            lines[line_index] = None
+        if loss_files:
+            lines = self._replace_loss_files(lines, loss_files, os.path.dirname(filepath))
+        if removed_lines:
+            lines = [line for line in lines if line is not None]
+
+        with gzip.open(filepath, 'wb', compresslevel=self.compresslevel) as file:
+            file.write('\n'.join(lines).encode('latin-1'))
+        return filepath
+
+    def write_variants(self, parameter_sets: Iterable[Dict], output_directory: str, file_name: str = 'variant') -> Iterator[str]:
+        """
+        Write a variant of the base file for every parameter set.
+
+        The files are written one after another while iterating, so also very large or generated sweeps need no extra memory.
+
+        :param parameter_sets: parameter sets, see class description for the format
+        :type parameter_sets: Iterable[Dict]
+        :param output_directory: directory of the written files, created if it does not exist
+        :type output_directory: str
+        :param file_name: base name of the written files, the index of the parameter set is appended
+        :type file_name: str
+
+        :return: generator of the absolute paths of the written files
+        :rtype: Iterator[str]
+        """
+        os.makedirs(output_directory, exist_ok=True)
+        for index, parameter_set in enumerate(parameter_sets):
+            yield self.write_variant(os.path.join(output_directory, f'{file_name}_{index}.ipes'),
+                                     global_parameters=parameter_set.get('global_parameters'),
+                                     component_values=parameter_set.get('component_values'),
+                                     loss_files=parameter_set.get('loss_files'), sim_time=parameter_set.get('sim_time'),
+                                     scope_nodes=parameter_set.get('scope_nodes'))
+
+    def _restrict_scopes(self, patches: Dict[int, str], scope_nodes: List[str]) -> set:
+        """
+        Remove the inputs of all scopes which do not record one of the given signals.
+
+        Per input, a scope has an entry in labelAnfangsKnoten[], savedSignalNames[] and shiftLabelsIn[], and one
+        CurveDiagram block in every diagram. Signal indices in avgIndices[] and the power analysis are renumbered.
+
+        :param patches: line patches of the variant, extended by the changed scope fields
+        :type patches: Dict[int, str]
+        :param scope_nodes: signals to record
+        :type scope_nodes: List[str]
+        :raises KeyError: if a signal is not recorded by any scope
+        :return: indices of the lines to remove
+        :rtype: set
+        """
+        base_file = self.base_file
+        missing_nodes = base_file.get_missing_node_names(scope_nodes)
+        if missing_nodes:
+            raise KeyError(f'Signals {missing_nodes} are not recorded by any scope of {base_file.filepath}')
+        removed_lines = set()
+        for component in base_file.components.values():
+            if 'savedSignalNames[]' not in component.fields:
+                continue
+            labels = _parse_value('labelAnfangsKnoten[]', component.fields['labelAnfangsKnoten[]'])
+            kept = [index for index, label in enumerate(labels) if label in scope_nodes]
+            if len(kept) == len(labels):
+                continue
+            # a scope needs at least one input: keep the first one, disconnected
+            new_labels = [labels[index] for index in kept] if kept else [NOT_DEFINED]
+            kept = kept or [0]
+            new_index = {old_index: index for index, old_index in enumerate(kept)}
+
+            _patch_field(patches, component, 'labelAnfangsKnoten[]', '/' + '/'.join(new_labels))
+            _patch_field(patches, component, 'savedSignalNames[]', '/' + '/'.join(new_labels))
+            _patch_field(patches, component, 'tn', str(len(kept)))
+            shift_labels = component.fields.get('shiftLabelsIn[]', '').split()
+            _patch_field(patches, component, 'shiftLabelsIn[]', ''.join(f'{shift_labels[index]} ' for index in kept if index < len(shift_labels)))
+            average_indices = component.fields.get('avgIndices[]', '').split()
+            average_values = component.fields.get('avgValues[]', '').split()
+            kept_averages = [position for position, index in enumerate(average_indices) if int(index) in new_index]
+            _patch_field(patches, component, 'avgIndices[]', ''.join(f'{new_index[int(average_indices[position])]} ' for position in kept_averages))
+            kept_values = [average_values[position] for position in kept_averages if position < len(average_values)]
+            _patch_field(patches, component, 'avgValues[]', ''.join(f'{value} ' for value in kept_values))
+
+            curve_index = 0
+            curve_start = None
+            for line_index in range(component.start_line, component.end_line):
+                stripped = base_file.lines[line_index].strip()
+                key, _, raw_value = stripped.partition(' ')
+                if stripped == '<Diagram>':
+                    curve_index = 0
+                elif stripped == '<CurveDiagram>':
+                    curve_start = line_index
+                elif stripped == '<\\CurveDiagram>':
+                    if curve_index not in new_index:
+                        removed_lines.update(range(curve_start, line_index + 1))
+                    curve_index += 1
+                elif key in ('powerAnalCurIndices[]', 'powerAnalVoltIndices[]'):
+                    indices = [str(new_index.get(int(index), -1)) if int(index) >= 0 else index for index in raw_value.split()]
+                    patches[line_index] = f"{key} {' '.join(indices)} "
+        return removed_lines
+
+    def _read_loss_file(self, loss_file_path: str) -> Tuple[int, str]:
+        """
+        Read a loss file and convert it to the GeckoFileManager format.
+
+        :param loss_file_path: absolute path of the loss file
+        :type loss_file_path: str
+        :raises Exception: if the loss file does not exist
+
+        :return: identifier (see _gecko_file_id()), fileContents[] line
+        :rtype: Tuple[int, str]
+        """
+        if loss_file_path not in self._loss_file_cache:
+            if not os.path.exists(loss_file_path):
+                raise Exception(f'Loss file path "{loss_file_path}" does not exist!')
+            with open(loss_file_path, 'rb') as file:
+                data = file.read()
+            # java bytes are signed
+            contents = ' '.join(str(byte - 256 if byte > 127 else byte) for byte in data)
+            self._loss_file_cache[loss_file_path] = (_gecko_file_id(data), f'fileContents[] {contents} ')
+        return self._loss_file_cache[loss_file_path]
+
+    def _replace_loss_files(self, lines: List[str], loss_files: Dict[str, str], directory: str) -> List[str]:
+        """
+        Link new loss files to components and rebuild the GeckoFileManager block, which stores the loss file contents.
+
+        :param lines: lines of the variant, other patches are already applied
+        :type lines: List[str]
+        :param loss_files: component names and loss file paths
+        :type loss_files: Dict[str, str]
+        :param directory: directory of the variant, used for the relative loss file paths
+        :type directory: str
+        :raises Exception: if a loss file path contains a backslash or does not exist
+        :raises KeyError: if a component has no loss file settings
+
+        :return: lines of the variant
+        :rtype: List[str]
+        """
+        base_file = self.base_file
+        # loss file path -> ids of the components using it
+        new_usage = {}
+        changed_ids = set()
+        for component_name, loss_file_path in loss_files.items():
+            if '\\' in loss_file_path:
+                raise Exception("Use '/' instead of '\\'!")
+            loss_file_path = os.path.abspath(loss_file_path)
+            component = base_file.get_component(component_name)
+            if 'Verluste' not in component.sections:
+                raise KeyError(f'Component {component_name} has no loss file settings')
+            hash_value, _ = self._read_loss_file(loss_file_path)
+            section_lines = component.section_lines['Verluste']
+            lines[section_lines['datnamGemesseneVerluste']] = f'datnamGemesseneVerluste {loss_file_path}'
+            lines[section_lines['lossFileHashValue']] = f'lossFileHashValue {hash_value}'
+            if 'verlustTyp' in section_lines:
+                # loss type 2: losses calculated from the measured curves of the loss file
+                lines[section_lines['verlustTyp']] = 'verlustTyp 2'
+            object_id = component.fields['uniqueObjectIdentifier']
+            new_usage.setdefault(loss_file_path, []).append(object_id)
+            changed_ids.add(object_id)
+
+        manager_lines = []
+        for gecko_file in base_file.gecko_files:
+            usage = [object_id for object_id in gecko_file['usage'] if object_id not in changed_ids]
+            if usage == gecko_file['usage']:
+                manager_lines.extend(base_file.lines[gecko_file['start_line']:gecko_file['end_line'] + 1])
+            elif usage:
+                manager_lines.extend(self._gecko_file_lines(int(gecko_file['hashValue']), gecko_file['absPath'], gecko_file['relPath'],
+                                                            usage, base_file.lines[gecko_file['fileContents[]']]))
+        for loss_file_path, usage in new_usage.items():
+            hash_value, contents_line = self._read_loss_file(loss_file_path)
+            relative_path = os.path.relpath(loss_file_path, directory).replace(os.sep, '/')
+            manager_lines.extend(self._gecko_file_lines(hash_value, loss_file_path, relative_path, usage, contents_line))
+
+        if base_file.gecko_file_manager_lines is not None:
+            start, end = base_file.gecko_file_manager_lines
+            return lines[:start + 1] + manager_lines + lines[end:]
+        # files without any stored file get a new GeckoFileManager block in front of the simulation settings
+        start = base_file.field_lines['DtStor']
+        return lines[:start] + ['GeckoFileManager', '<GeckoFileManager>'] + manager_lines + ['<\\GeckoFileManager>', ''] + lines[start:]
+
+    @staticmethod
+    def _gecko_file_lines(hash_value: int, absolute_path: str, relative_path: str, usage: List[str], contents_line: str) -> List[str]:
+        """
+        Create the lines of a single file entry of the GeckoFileManager block.
+
+        :param hash_value: identifier linking the file to the components
+        :type hash_value: int
+        :param absolute_path: absolute path of the file
+        :type absolute_path: str
+        :param relative_path: path of the file relative to the .ipes file
+        :type relative_path: str
+        :param usage: unique object identifiers of the components using the file
+        :type usage: List[str]
+        :param contents_line: complete fileContents[] line
+        :type contents_line: str
+        :return: lines of the file entry
+        :rtype: List[str]
+        """
+        header = ['<GeckoFile>', f'hashValue {hash_value}', f'absPath {absolute_path}', f'relPath {relative_path}', 'fileSep /',
+                  'isExternal 0', f"usageList[] {' '.join(usage)} ", '<usageList>']
+        return header + usage + ['<\\usageList>', contents_line, '<\\GeckoFile>']
@@ -0,0 +1,464 @@
+"""Cache simulation results on disk, so identical operating points are not simulated twice."""
+# python libraries
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from typing import Union, List, Dict, Optional, Any, TYPE_CHECKING
+import logging
+
+# 3rd party libraries
+import numpy as np
+
+# own libraries
+from pygeckocircuits2.geckoCircuitsRemote import GeckoSimulation
+from pygeckocircuits2.ipesFile import IpesFile
+from pygeckocircuits2.scopeData import write_scope_file
+
+if TYPE_CHECKING:
+    # type hints only, the DataFrames are created by GeckoSimulation.get_scope_data()
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def file_hash(filepath: str) -> str:
+    """
+    Return the sha256 hash of a file content, e.g. of an .ipes or a loss file.
+
+    :param filepath: path to the file
+    :type filepath: str
+    :return: hexadecimal hash value
+    :rtype: str
+    """
+    sha256 = hashlib.sha256()
+    with open(filepath, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def make_key(*parts: Any) -> str:
+    """
+    Create a cache key from json-serializable parts. Dict keys are sorted, so the order of parameters does not matter.
+
+    :param parts: parts of the key, e.g. file hash, parameter dicts and simulation times
+    :type parts: Any
+    :return: hexadecimal sha256 hash value
+    :rtype: str
+    """
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=repr).encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """
+    On-disk store of simulation results with a size limit and least-recently-used eviction.
+
+    Every entry is a single pickle file named by its key, so several processes (e.g. the workers of a GeckoSweep) can share
+    the same cache directory. The access time of an entry is kept as file modification time.
+
+    The cache directory is only scanned for eviction if the size of the cache may exceed the limit: every object adds the
+    size of its entries to the size of the last scan. Entries of other processes are counted by a scan every
+    RESCAN_INTERVAL entries. An eviction frees EVICTION_MARGIN of the size limit, so a full cache is not scanned at
+    every put().
+
+    :Example:
+
+    >>> import pygeckocircuits2 as pgc
+    >>> cache = pgc.ResultCache('path/to/cache', max_size=1e9)
+    >>> cache.put(pgc.make_key('point', 1), {'mean': {'i_L': 5.0}})
+    >>> cache.get(pgc.make_key('point', 1))
+    """
+
+    # number of put() calls after which the directory is scanned, also if the size limit is not reached by this object
+    RESCAN_INTERVAL = 100
+    # part of the size limit which is freed by an eviction
+    EVICTION_MARGIN = 0.1
+
+    directory: str
+    max_size: float
+    hits: int
+    misses: int
+
+    def __init__(self, directory: str, max_size: float = 1e9) -> None:
+        """
+        Open or create a cache directory.
+
+        :param directory: directory of the cache entries, created if it does not exist
+        :type directory: str
+        :param max_size: maximum size of all entries in bytes. Default 1 GB
+        :type max_size: float
+        """
+        self.directory = os.path.abspath(directory)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        # size of the cache at the last scan plus the entries written since, None before the first scan
+        self._size_estimate: Optional[float] = None
+        self._puts_since_scan = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _entry_path(self, key: str) -> str:
+        """
+        Return the file path of a cache entry.
+
+        :param key: cache key
+        :type key: str
+        :return: file path
+        :rtype: str
+        """
+        return os.path.join(self.directory, key + '.pkl')
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Return a cached result and mark it as recently used.
+
+        :param key: cache key, see make_key()
+        :type key: str
+        :return: cached result or None in case of a cache miss
+        :rtype: Any
+        """
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, 'rb') as file:
+                value = pickle.load(file)
+            os.utime(entry_path)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            logger.debug(f'Cache miss: {key}')
+            return None
+        self.hits += 1
+        logger.debug(f'Cache hit: {key}')
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        """
+        Store a result and evict the least recently used entries if the cache exceeds its size limit.
+
+        :param key: cache key, see make_key()
+        :type key: str
+        :param value: result to store, must be picklable
+        :type value: Any
+        """
+        # write to a temporary file first, so concurrent readers never see a partly written entry
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(file_descriptor, 'wb') as file:
+            pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+            size = file.tell()
+        os.replace(temporary_path, self._entry_path(key))
+        self._puts_since_scan += 1
+        if self._size_estimate is not None:
+            self._size_estimate += size
+        if self._size_estimate is None or self._size_estimate > self.max_size or self._puts_since_scan >= self.RESCAN_INTERVAL:
+            self._evict()
+
+    def _evict(self) -> None:
+        """Scan the cache directory. If it exceeds the size limit, remove the least recently used entries until EVICTION_MARGIN is free."""
+        self._puts_since_scan = 0
+        entries = []
+        total_size = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pkl'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total_size += stat.st_size
+        self._size_estimate = total_size
+        if total_size <= self.max_size:
+            return
+        for _, size, entry_path in sorted(entries):
+            try:
+                os.remove(entry_path)
+            except FileNotFoundError:
+                # already evicted by another process
+                pass
+            total_size -= size
+            logger.debug(f'Cache entry evicted: {entry_path}')
+            if total_size <= (1 - self.EVICTION_MARGIN) * self.max_size:
+                break
+        self._size_estimate = total_size
+
+    def clear(self) -> None:
+        """Remove all entries and reset the statistics."""
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pkl'):
+                os.remove(entry.path)
+        self._size_estimate = None
+        self.hits = 0
+        self.misses = 0
+
+    def get_statistics(self) -> Dict:
+        """
+        Return the hit/miss statistics of this cache object and the current size of the cache directory.
+
+        :return: dict with the keys 'hits', 'misses', 'hit_rate', 'entries' and 'size'
+        :rtype: Dict
+        """
+        sizes = [entry.stat().st_size for entry in os.scandir(self.directory) if entry.name.endswith('.pkl')]
+        requests = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / requests if requests else 0.0,
+                'entries': len(sizes), 'size': sum(sizes)}
+
+
+class CachedGeckoSimulation:
+    """
+    Memoization layer around GeckoSimulation with the same methods to set parameters, run the simulation and read results.
+
+    Parameter changes are only recorded. The results of get_values() and get_scope_data() are looked up in the cache by a key of
+     * the hash of the .ipes file content,
+     * the applied global parameters, component values and switch values,
+     * the hashes of the applied loss files,
+     * timestep and simtime, including the pre-simulation values,
+     * the arguments of the requested method.
+
+    GeckoCIRCUITS is only started, configured and simulated in case of a cache miss. Cache hits do not need a JVM at all.
+
+    :Example:
+
+    >>> import pygeckocircuits2 as pgc
+    >>> buck_converter = pgc.CachedGeckoSimulation('path/to/simfile.ipes', cache='path/to/cache')
+    >>> buck_converter.set_global_parameters({'V_in': 60})
+    >>> buck_converter.run_simulation()
+    >>> buck_converter.get_values(nodes=['i_L'], operations=['mean', 'rms'])
+    >>> buck_converter.cache.get_statistics()
+    """
+
+    simfilepath: str
+    cache: ResultCache
+    simulation: Optional[GeckoSimulation]
+
+    def __init__(self, simfilepath: str, cache: Union[ResultCache, str], geckoport: int = 43036, timestep: float = None,
+                 simtime: float = None, timestep_pre: float = 0, simtime_pre: float = 0) -> None:
+        """
+        Prepare the cached simulation. GeckoCIRCUITS is not started here.
+
+        :param simfilepath: absolute or relative path to simulation file
+        :type simfilepath: str
+        :param cache: cache object or cache directory
+        :type cache: ResultCache or str
+        :param geckoport: Port to connect to GeckoCIRCUITS. Default port is 43036
+        :type geckoport: int
+        :param timestep: simulation fix timestep. Defaults to the value stored in the .ipes file
+        :type timestep: float
+        :param simtime: total simulation time. Defaults to the value stored in the .ipes file
+        :type simtime: float
+        :param timestep_pre: the dt time step of the pre simulation
+        :type timestep_pre: float
+        :param simtime_pre: simulation time of the pre simulation
+        :type simtime_pre: float
+        """
+        self.simfilepath = os.path.abspath(simfilepath)
+        self.cache = cache if isinstance(cache, ResultCache) else ResultCache(cache)
+        self.geckoport = geckoport
+        self.simulation = None
+        if simtime is None and timestep is None:
+            simtime, timestep, simtime_pre, timestep_pre = IpesFile(self.simfilepath).get_sim_time()
+        self._sim_time = {'timestep': timestep, 'simtime': simtime, 'timestep_pre': timestep_pre, 'simtime_pre': simtime_pre}
+        self._file_hash = file_hash(self.simfilepath)
+        self._global_parameters = {}
+        self._component_values = {}
+        self._switch_values = {}
+        self._loss_files = {}
+        # state key of the last simulation run by GeckoCIRCUITS
+        self._simulated_key = None
+
+    def _state_key(self) -> str:
+        """
+        Return the key of the current simulation state: file, parameters, loss files and simulation times.
+
+        :return: state key
+        :rtype: str
+        """
+        loss_file_hashes = {name: loss_file_hash for name, (_, loss_file_hash) in self._loss_files.items()}
+        return make_key(self._file_hash, self._global_parameters, self._component_values, self._switch_values,
+                        loss_file_hashes, self._sim_time)
+
+    def _simulate(self) -> GeckoSimulation:
+        """
+        Start GeckoCIRCUITS if needed, apply the recorded parameters and run the simulation of the current state.
+
+        :return: the simulation with the results of the current state
+        :rtype: GeckoSimulation
+        """
+        state_key = self._state_key()
+        if self.simulation is None:
+            self.simulation = GeckoSimulation(self.simfilepath, geckoport=self.geckoport, **self._sim_time)
+        if self._simulated_key != state_key:
+            if self._global_parameters:
+                self.simulation.set_global_parameters(self._global_parameters)
+            for component_name, component_dict in self._component_values.items():
+                self.simulation.set_component_values(component_name, component_dict)
+            for component_name, (sw_type, switch_dict) in self._switch_values.items():
+                self.simulation.set_switch_values(sw_type, component_name, switch_dict)
+            for component_name, (loss_file_path, _) in self._loss_files.items():
+                self.simulation.set_loss_file(component_name, loss_file_path)
+            self.simulation.run_simulation(**self._sim_time)
+            self._simulated_key = state_key
+        return self.simulation
+
+    # -----------------------------------
+    # recorded settings
+    # -----------------------------------
+
+    def set_global_parameters(self, params_dict: Dict) -> None:
+        """
+        Record global parameters, see GeckoSimulation.set_global_parameters().
+
+        :param params_dict: the name of the global parameters that are in use (works with and without '$')
+        :type params_dict: Dict
+        """
+        for key, value in params_dict.items():
+            self._global_parameters[key if key.startswith('$') else '$' + key] = value
+
+    def set_component_values(self, component_name: str, component_dict: Dict) -> None:
+        """
+        Record component values, see GeckoSimulation.set_component_values().
+
+        :param component_name: name of the selected component that needs to be configured
+        :type component_name: str
+        :param component_dict: the key value pairs that need to be set on the selected component
+        :type component_dict: Dict
+        """
+        self._component_values.setdefault(component_name.upper(), {}).update(component_dict)
+
+    def set_switch_values(self, sw_type: str, component_name: str, switch_key_value_dict: dict) -> None:
+        """
+        Record switch values, see GeckoSimulation.set_switch_values().
+
+        Values of the same switch type are merged. Another switch type replaces the recorded values, as the switch type
+        defines the valid keys.
+
+        :param sw_type: switch type can be either mosfet/igbt/diode
+        :type sw_type: str
+        :param component_name: name of the selected switch (ex: IGBT.1, MOSFET.1 etc.)
+        :type component_name: str
+        :param switch_key_value_dict: the configuration parameter names and their values
+        :type switch_key_value_dict: Dict
+        """
+        component_name = component_name.upper()
+        recorded_type, switch_dict = self._switch_values.get(component_name, (sw_type, {}))
+        if recorded_type != sw_type:
+            switch_dict = {}
+        self._switch_values[component_name] = (sw_type, {**switch_dict, **switch_key_value_dict})
+
+    def set_loss_file(self, component_names: Union[str, List], loss_file_path: str) -> None:
+        """
+        Record the loss file of switches, see GeckoSimulation.set_loss_file(). The cache key contains the hash of the file content.
+
+        :param component_names: name of the selected switch (ex: IGBT.1, MOSFET.1 etc.)
+        :type component_names: str or list
+        :param loss_file_path: the path of the .SCL file that needs to be loaded
+        :type loss_file_path: str
+        :raises Exception: if the loss file does not exist
+        """
+        loss_file_path = os.path.abspath(loss_file_path)
+        if os.path.exists(loss_file_path) is False:
+            raise Exception(f'Loss file path "{loss_file_path}" does not exist!')
+        loss_file_hash = file_hash(loss_file_path)
+        for name in [component_names] if isinstance(component_names, str) else component_names:
+            self._loss_files[name.upper()] = (loss_file_path, loss_file_hash)
+
+    def set_sim_time(self, simtime: float, timestep: float = None, simtime_pre: float = None, timestep_pre: float = None) -> None:
+        """
+        Record the simulation times, see GeckoSimulation.set_sim_time().
+
+        :param simtime: simulation time
+        :type simtime: float
+        :param timestep: simulation time step
+        :type timestep: float
+        :param simtime_pre: simulation time of the pre simulation
+        :type simtime_pre: float
+        :param timestep_pre: the dt time step of the pre simulation
+        :type timestep_pre: float
+        """
+        self.run_simulation(timestep=timestep, simtime=simtime, timestep_pre=timestep_pre, simtime_pre=simtime_pre)
+
+    def run_simulation(self, timestep: float = None, simtime: float = None, timestep_pre: float = None,
+                       simtime_pre: float = None) -> None:
+        """
+        Record the simulation times. The simulation itself only runs if a requested result is not in the cache.
+
+        :param timestep: the dt time step of each simulation
+        :type timestep: float
+        :param simtime: simulation time, not including the optional pre simulation time
+        :type simtime: float
+        :param timestep_pre: the dt time step of the pre simulation
+        :type timestep_pre: float
+        :param simtime_pre: simulation time of the pre simulation
+        :type simtime_pre: float
+        """
+        for key, value in {'timestep': timestep, 'simtime': simtime, 'timestep_pre': timestep_pre, 'simtime_pre': simtime_pre}.items():
+            if value is not None:
+                self._sim_time[key] = value
+
+    # -----------------------------------
+    # cached results
+    # -----------------------------------
+
+    def get_values(self, nodes: Union[List, str], operations: Union[List, str],
+                   range_start_stop: List[Union[float, str]] = None) -> Dict:
+        """
+        Return the cached result of GeckoSimulation.get_values(), simulate in case of a cache miss.
+
+        :param nodes: node names located on the scopes
+        :type nodes: List[str] or str
+        :param operations: Mean/RMS/THD/Ripple/Max/Min/Shape operations on the selected signals
+        :type operations: List[str] or str
+        :param range_start_stop: the range of the data that needs to be considered for applying the mentioned operations
+        :type range_start_stop: [float, str] or [float, float]
+
+        :return: operation specific dict data, see GeckoSimulation.get_values()
+        :rtype: Dict
+        """
+        nodes = [nodes] if isinstance(nodes, str) else nodes
+        operations = [operations] if isinstance(operations, str) else operations
+        key = make_key(self._state_key(), 'get_values', nodes, operations, range_start_stop)
+        values = self.cache.get(key)
+        if values is None:
+            values = self._simulate().get_values(nodes, operations, range_start_stop)
+            self.cache.put(key, values)
+        return values
+
+    def get_scope_data(self, node_names: Union[List, str], file_name: str, start_time: float = None,
+                       stop_time: float = None, skip_points: int = 0, file_format: str = 'csv', dtype: type = np.float64,
+                       compress: bool = False, implicit_time: bool = False) -> 'pd.DataFrame':
+        """
+        Return the cached result of GeckoSimulation.get_scope_data(), simulate in case of a cache miss.
+
+        As GeckoSimulation.get_scope_data() does, the data is also saved to a file in case of a cache hit.
+
+        :param node_names: the name provided to the scope nodes, e.g. ["v1", "i_l_1"]
+        :type node_names: List[str] or str
+        :param file_name: name of the csv file under which the extracted data needed to be exported
+        :type file_name: str
+        :param start_time: the time from where the data needs to be recorded. Defaults to 0 s.
+        :type start_time: float
+        :param stop_time: the time at which the data recording stops. Defaults to end of simulation time.
+        :type stop_time: float
+        :param skip_points: the length of points that needs to be skipped
+        :type skip_points: int
+        :param file_format: 'csv', 'npz', 'npy', 'hdf5' or 'parquet', see GeckoSimulation.get_scope_data()
+        :type file_format: str
+        :param dtype: data type of the signals
+        :type dtype: type
+        :param compress: True for lossless compression of the binary formats
+        :type compress: bool
+        :param implicit_time: True to store start and step of the time vector instead of the vector, binary formats only
+        :type implicit_time: bool
+
+        :return: scope data
+        :rtype: pd.DataFrame
+        """
+        node_names = [node_names] if isinstance(node_names, str) else node_names
+        key = make_key(self._state_key(), 'get_scope_data', node_names, start_time, stop_time, skip_points, np.dtype(dtype).str)
+        df = self.cache.get(key)
+        if df is None:
+            df = self._simulate().get_scope_data(node_names, file_name, start_time, stop_time, skip_points, file_format, dtype,
+                                                 compress, implicit_time)
+            self.cache.put(key, df)
+        elif not df.empty and file_format == 'csv':
+            df.to_csv(path_or_buf=file_name + '.csv', encoding='utf-8', index=False, sep=' ', header=True)
+        elif not df.empty:
+            signals = {node: df[node].to_numpy() for node in df.columns[1:]}
+            write_scope_file(df['time'].to_numpy(), signals, file_name, file_format, compress=compress, implicit_time=implicit_time)
+        return df
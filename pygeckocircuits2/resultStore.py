@@ -0,0 +1,367 @@
+"""Store the parameters, metrics and waveforms of many simulation runs and query them by parameter values."""
+# python libraries
+import json
+import numbers
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+from typing import Any, Dict, List, Tuple, TYPE_CHECKING
+import logging
+
+# 3rd party libraries
+import numpy as np
+
+# own libraries
+from pygeckocircuits2.resultCache import file_hash, make_key
+from pygeckocircuits2.scopeData import ScopeFile, write_scope_file
+
+if TYPE_CHECKING:
+    # pandas is imported where the DataFrames are created
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# comparison operators of ResultStore.query()
+QUERY_OPERATORS = ('=', '!=', '<', '<=', '>', '>=')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY, parameter_hash TEXT NOT NULL, simfile_hash TEXT, created REAL NOT NULL,
+                                 parameters TEXT NOT NULL, metrics TEXT NOT NULL, waveforms TEXT);
+CREATE INDEX IF NOT EXISTS runs_parameter_hash ON runs (parameter_hash);
+CREATE TABLE IF NOT EXISTS parameters (run_id INTEGER NOT NULL, name TEXT NOT NULL, value REAL, text TEXT);
+CREATE INDEX IF NOT EXISTS parameters_value ON parameters (name, value);
+CREATE INDEX IF NOT EXISTS parameters_text ON parameters (name, text);
+CREATE TABLE IF NOT EXISTS metrics (run_id INTEGER NOT NULL, name TEXT NOT NULL, value REAL);
+CREATE INDEX IF NOT EXISTS metrics_value ON metrics (name, value);
+"""
+
+
+def flatten_dict(nested: Dict, prefix: str = '') -> Dict[str, Any]:
+    """
+    Flatten nested dicts to a single dict, the keys are joined by '.'.
+
+    Operating points {'global_parameters': {'V_in': 60}, 'component_values': {'L.1': {'L': 1e-4}}} become
+    {'V_in': 60, 'L.1.L': 1e-4}, as the names of global parameters and components do not overlap. Results of
+    GeckoSimulation.get_values() {'mean': {'i_L': 5.0}} become {'mean.i_L': 5.0}.
+
+    :param nested: nested dicts
+    :type nested: Dict
+    :param prefix: prefix of all keys
+    :type prefix: str
+    :return: flat dict
+    :rtype: Dict[str, Any]
+    """
+    flat = {}
+    for key, value in nested.items():
+        if key == 'global_parameters':
+            # with and without '$', as GeckoSimulation.set_global_parameters() accepts both
+            flat.update(flatten_dict({name.lstrip('$'): parameter for name, parameter in value.items()}, prefix))
+        elif key == 'component_values':
+            flat.update(flatten_dict(value, prefix))
+        elif isinstance(value, dict):
+            flat.update(flatten_dict(value, f'{prefix}{key}.'))
+        else:
+            flat[f'{prefix}{key}'] = value
+    return flat
+
+
+def _plain_parameters(flat_parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert the values of flat parameters to json-serializable types. Numbers, also numpy numbers, become float.
+
+    So 60, 60.0 and np.int64(60) are stored and hashed the same way, and are found by numeric queries.
+
+    :param flat_parameters: parameters of flatten_dict()
+    :type flat_parameters: Dict[str, Any]
+    :return: parameters with float and plain python values
+    :rtype: Dict[str, Any]
+    """
+    plain = {}
+    for name, value in flat_parameters.items():
+        if isinstance(value, numbers.Real):
+            value = float(value)
+        elif isinstance(value, np.generic):
+            value = value.item()
+        plain[name] = value
+    return plain
+
+
+class ResultStore:
+    """
+    Store of simulation runs: input parameters and scalar metrics in an indexed sqlite database, waveforms as memory-mappable files.
+
+    Every run is a row with its parameters (global parameters, component values, simulation times, loss files, ...) and
+    metrics (e.g. the result of GeckoSimulation.get_values()). Both are flattened by flatten_dict() and indexed by name
+    and value, so queries like V_in = 60 and f_s > 500e3 only read the index and never touch the waveform data. A hash
+    of all parameters finds identical runs.
+
+    Waveforms are written as one directory per run in the npy format of write_scope_file(), before the run is added to
+    the database. So a row never refers to a partly written waveform.
+
+    Several processes can append to the same store, e.g. the workers of a GeckoSweep: the database uses write-ahead
+    logging and every append is a single transaction. Use a local file system, sqlite locking does not work reliably on
+    network drives. Every process and thread needs its own ResultStore object, a pickled store opens its own connection.
+
+    :Example:
+
+    >>> import pygeckocircuits2 as pgc
+    >>> store = pgc.ResultStore('path/to/store')
+    >>> buck_converter = pgc.GeckoSimulation('path/to/gecko_file.ipes')
+    >>> buck_converter.set_global_parameters({'V_in': 60, 'f_s': 600e3})
+    >>> buck_converter.run_simulation()
+    >>> store.append({'global_parameters': {'V_in': 60, 'f_s': 600e3}}, buck_converter.get_values(['i_L'], ['mean', 'rms']),
+    >>>              waveforms=buck_converter.get_scope_arrays(['i_L']), simfilepath='path/to/gecko_file.ipes')
+    >>> runs = store.query({'V_in': 60, 'f_s': ('>', 500e3)})
+    """
+
+    directory: str
+    waveform_dtype: type
+    timeout: float
+
+    def __init__(self, directory: str, waveform_dtype: type = np.float32, timeout: float = 60) -> None:
+        """
+        Open or create a result store.
+
+        :param directory: directory of the database and the waveforms, created if it does not exist
+        :type directory: str
+        :param waveform_dtype: data type of the stored waveforms. Default np.float32
+        :type waveform_dtype: type
+        :param timeout: time in seconds to wait for appends of other processes
+        :type timeout: float
+        """
+        self.directory = os.path.abspath(directory)
+        self.waveform_dtype = waveform_dtype
+        self.timeout = timeout
+        os.makedirs(os.path.join(self.directory, 'waveforms'), exist_ok=True)
+        self._connect()
+
+    def _connect(self) -> None:
+        """Open the database and create the tables and indices if needed."""
+        # simulation file hashes by (path, modification time), see append()
+        self._simfile_hashes: Dict[Tuple[str, float], str] = {}
+        self._connection = sqlite3.connect(os.path.join(self.directory, 'runs.sqlite'), timeout=self.timeout)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        with self._connection:
+            self._connection.executescript(_SCHEMA)
+
+    def __getstate__(self) -> Dict:
+        """
+        Return the state for pickling, without the database connection.
+
+        :return: state
+        :rtype: Dict
+        """
+        return {'directory': self.directory, 'waveform_dtype': self.waveform_dtype, 'timeout': self.timeout}
+
+    def __setstate__(self, state: Dict) -> None:
+        """
+        Restore a pickled store and open its own database connection.
+
+        :param state: state of __getstate__()
+        :type state: Dict
+        """
+        self.__dict__.update(state)
+        self._connect()
+
+    def __enter__(self) -> 'ResultStore':
+        """
+        Enter the context manager.
+
+        :return: the store itself
+        :rtype: ResultStore
+        """
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        """
+        Close the database when leaving the context manager.
+
+        :param exc_type: type of a raised exception, if any
+        :type exc_type: type
+        :param exc_value: raised exception, if any
+        :type exc_value: Exception
+        :param traceback: traceback of a raised exception, if any
+        :type traceback: traceback
+        """
+        self.close()
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self._connection.close()
+
+    def _simfile_hash(self, simfilepath: str) -> str:
+        """
+        Return the hash of a simulation file, calculated once per file version.
+
+        :param simfilepath: path of the simulation file
+        :type simfilepath: str
+        :return: hexadecimal hash value
+        :rtype: str
+        """
+        version = (os.path.abspath(simfilepath), os.path.getmtime(simfilepath))
+        if version not in self._simfile_hashes:
+            self._simfile_hashes[version] = file_hash(simfilepath)
+        return self._simfile_hashes[version]
+
+    def append(self, parameters: Dict, metrics: Dict, waveforms: Tuple[np.ndarray, Dict[str, np.ndarray]] = None,
+               simfilepath: str = None) -> int:
+        """
+        Add a run to the store.
+
+        :param parameters: input parameters, e.g. an operating point of GeckoSweep with 'global_parameters',
+            'component_values', 'sim_time' and 'loss_files'. Values are numbers, stored as float, or strings.
+        :type parameters: Dict
+        :param metrics: scalar results, e.g. the result of GeckoSimulation.get_values()
+        :type metrics: Dict
+        :param waveforms: (time, dict of node names and signal arrays), e.g. from GeckoSimulation.get_scope_arrays()
+        :type waveforms: Tuple[np.ndarray, Dict[str, np.ndarray]]
+        :param simfilepath: simulation file, its content hash is stored to tell runs of different circuit versions apart
+        :type simfilepath: str
+        :return: id of the run
+        :rtype: int
+        """
+        flat_parameters = _plain_parameters(flatten_dict(parameters))
+        flat_metrics = {name: float(value) for name, value in flatten_dict(metrics).items()}
+        parameter_hash = make_key(flat_parameters)
+        simfile_hash = None if simfilepath is None else self._simfile_hash(simfilepath)
+        waveform_directory = None
+        if waveforms is not None:
+            waveform_directory = f'{parameter_hash[:16]}_{uuid.uuid4().hex}'
+            write_scope_file(waveforms[0], waveforms[1], os.path.join(self.directory, 'waveforms', waveform_directory), file_format='npy',
+                             dtype=self.waveform_dtype, implicit_time=True)
+        with self._connection:
+            cursor = self._connection.execute('INSERT INTO runs (parameter_hash, simfile_hash, created, parameters, metrics, waveforms) '
+                                              'VALUES (?, ?, ?, ?, ?, ?)',
+                                              (parameter_hash, simfile_hash, time.time(), json.dumps(flat_parameters), json.dumps(flat_metrics),
+                                               waveform_directory))
+            run_id = cursor.lastrowid
+            self._connection.executemany('INSERT INTO parameters (run_id, name, value, text) VALUES (?, ?, ?, ?)',
+                                         [(run_id, name, value, None) if isinstance(value, float) else (run_id, name, None, str(value))
+                                          for name, value in flat_parameters.items()])
+            self._connection.executemany('INSERT INTO metrics (run_id, name, value) VALUES (?, ?, ?)',
+                                         [(run_id, name, value) for name, value in flat_metrics.items()])
+        logger.debug(f'Run {run_id} stored: {flat_parameters}')
+        return run_id
+
+    def find(self, parameters: Dict, simfilepath: str = None) -> List[int]:
+        """
+        Return the ids of the runs with exactly these parameters, e.g. to skip an operating point which was simulated before.
+
+        :param parameters: input parameters in the format of append()
+        :type parameters: Dict
+        :param simfilepath: simulation file. Default None: runs of any version of the simulation file
+        :type simfilepath: str
+        :return: ids of the runs
+        :rtype: List[int]
+        """
+        sql = 'SELECT id FROM runs WHERE parameter_hash = ?'
+        arguments = [make_key(_plain_parameters(flatten_dict(parameters)))]
+        if simfilepath is not None:
+            sql += ' AND simfile_hash = ?'
+            arguments.append(self._simfile_hash(simfilepath))
+        return [row[0] for row in self._connection.execute(sql, arguments)]
+
+    def query_ids(self, where: Dict[str, Any] = None) -> List[int]:
+        """
+        Return the ids of the runs which meet all conditions. Only the indices are read.
+
+        :param where: conditions by parameter or metric name. A value checks for equality, a tuple (operator, value)
+            compares by one of QUERY_OPERATORS, e.g. {'V_in': 60, 'f_s': ('>', 500e3), 'mean.i_L': ('<', 10)}
+        :type where: Dict[str, Any]
+        :raises Exception: for an unknown operator
+        :return: ids of the runs, ascending
+        :rtype: List[int]
+        """
+        subqueries = []
+        arguments = []
+        for name, condition in (where or {}).items():
+            operator, value = condition if isinstance(condition, tuple) else ('=', condition)
+            if operator not in QUERY_OPERATORS:
+                raise Exception(f'Unknown operator {operator!r}, use one of {QUERY_OPERATORS}')
+            if isinstance(value, numbers.Real):
+                subqueries.append(f'SELECT run_id FROM parameters WHERE name = ? AND value {operator} ? '
+                                  f'UNION SELECT run_id FROM metrics WHERE name = ? AND value {operator} ?')
+                arguments += [name, float(value), name, float(value)]
+            else:
+                # metrics are numbers only
+                subqueries.append(f'SELECT run_id FROM parameters WHERE name = ? AND text {operator} ?')
+                arguments += [name, str(value)]
+        sql = 'SELECT id FROM runs' + ''.join(f" {'AND' if index else 'WHERE'} id IN ({subquery})" for index, subquery in enumerate(subqueries))
+        return sorted(row[0] for row in self._connection.execute(sql, arguments))
+
+    def query(self, where: Dict[str, Any] = None) -> 'pd.DataFrame':
+        """
+        Return the runs which meet all conditions as table with one row per run and one column per parameter and metric.
+
+        :param where: conditions, see query_ids()
+        :type where: Dict[str, Any]
+        :return: runs with the columns 'run_id', 'created', 'simfile_hash', 'waveforms' (True if stored), the parameters
+            and the metrics
+        :rtype: pd.DataFrame
+        """
+        import pandas as pd
+        rows = [{'run_id': run['run_id'], 'created': run['created'], 'simfile_hash': run['simfile_hash'],
+                 'waveforms': run['waveforms'] is not None, **run['parameters'], **run['metrics']}
+                for run in self.get_runs(self.query_ids(where))]
+        return pd.DataFrame(rows)
+
+    def get_runs(self, run_ids: List[int]) -> List[Dict]:
+        """
+        Return stored runs.
+
+        :param run_ids: ids of the runs
+        :type run_ids: List[int]
+        :return: dicts with the keys 'run_id', 'parameter_hash', 'simfile_hash', 'created', 'parameters', 'metrics' and
+            'waveforms' (name of the waveform directory or None), in the order of run_ids
+        :rtype: List[Dict]
+        """
+        runs = {}
+        # sqlite limits the number of variables of a statement
+        for start in range(0, len(run_ids), 500):
+            batch = run_ids[start:start + 500]
+            sql = f"SELECT id, parameter_hash, simfile_hash, created, parameters, metrics, waveforms FROM runs WHERE id IN ({', '.join('?' * len(batch))})"
+            for row in self._connection.execute(sql, batch):
+                runs[row[0]] = {'run_id': row[0], 'parameter_hash': row[1], 'simfile_hash': row[2], 'created': row[3],
+                                'parameters': json.loads(row[4]), 'metrics': json.loads(row[5]), 'waveforms': row[6]}
+        return [runs[run_id] for run_id in run_ids if run_id in runs]
+
+    def get_waveforms(self, run_id: int) -> ScopeFile:
+        """
+        Open the waveforms of a run, single signals are memory-mapped by ScopeFile.signal().
+
+        :param run_id: id of the run
+        :type run_id: int
+        :raises KeyError: if the run does not exist or has no waveforms
+        :return: waveform file
+        :rtype: ScopeFile
+        """
+        runs = self.get_runs([run_id])
+        if not runs or runs[0]['waveforms'] is None:
+            raise KeyError(f'No waveforms stored for run {run_id}')
+        return ScopeFile(os.path.join(self.directory, 'waveforms', runs[0]['waveforms']))
+
+    def delete(self, run_ids: List[int]) -> None:
+        """
+        Remove runs and their waveforms from the store.
+
+        :param run_ids: ids of the runs
+        :type run_ids: List[int]
+        """
+        runs = self.get_runs(run_ids)
+        with self._connection:
+            for table, column in (('runs', 'id'), ('parameters', 'run_id'), ('metrics', 'run_id')):
+                self._connection.executemany(f'DELETE FROM {table} WHERE {column} = ?', [(run['run_id'],) for run in runs])
+        for run in runs:
+            if run['waveforms'] is not None:
+                shutil.rmtree(os.path.join(self.directory, 'waveforms', run['waveforms']), ignore_errors=True)
+
+    def __len__(self) -> int:
+        """
+        Return the number of stored runs.
+
+        :return: number of runs
+        :rtype: int
+        """
+        return self._connection.execute('SELECT COUNT(*) FROM runs').fetchone()[0]
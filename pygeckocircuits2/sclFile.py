@@ -0,0 +1,229 @@
+"""Read semiconductor loss files (.scl) and evaluate conduction and switching losses from simulated waveforms."""
+# python libraries
+import hashlib
+from typing import Dict, List, Union
+import logging
+
+# 3rd party libraries
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# parsed loss files by the sha256 hash of their content, see read_scl_file()
+_scl_cache: Dict[str, 'SclFile'] = {}
+
+
+class SclFile:
+    """
+    Measured loss curves of a semiconductor switch, as stored in a GeckoCIRCUITS .scl file.
+
+    Conduction curves (LeitverlusteMesskurve) give the forward voltage over the current, one curve per junction
+    temperature. Switching curves (SchaltverlusteMesskurve) give the turn-on and turn-off energy over the current,
+    measured at the blocking voltage u_block, one curve per junction temperature.
+
+    Between the temperatures of the curves, values are interpolated linearly. Outside, the nearest curve is used.
+    Switching energies are scaled linearly with the blocking voltage, as GeckoCIRCUITS does.
+    """
+
+    filepath: str
+    conduction_tj: np.ndarray
+    conduction_curves: List[np.ndarray]
+    switching_tj: np.ndarray
+    switching_u_block: np.ndarray
+    switching_curves: List[np.ndarray]
+
+    def __init__(self, filepath: str) -> None:
+        """
+        Read the .scl file.
+
+        :param filepath: path of the .scl file
+        :type filepath: str
+        """
+        self.filepath = filepath
+        with open(filepath, 'r', encoding='latin-1') as file:
+            self._parse(file.read().splitlines())
+
+    def _parse(self, lines: List[str]) -> None:
+        """
+        Parse the curve blocks of the file.
+
+        :param lines: lines of the file
+        :type lines: List[str]
+        :raises Exception: if a data field does not match its dimensions
+        """
+        conduction = []
+        switching = []
+        curve = {}
+        for line in lines:
+            line = line.strip()
+            if line in ('<LeitverlusteMesskurve>', '<SchaltverlusteMesskurve>'):
+                curve = {}
+            elif line.startswith('data[][]'):
+                rows, columns, *values = line.split()[1:]
+                if len(values) != int(rows) * int(columns):
+                    raise Exception(f'{self.filepath}: data[][] with {len(values)} values instead of {rows} x {columns}')
+                curve['data'] = np.array(values, dtype=np.float64).reshape(int(rows), int(columns))
+            elif line.startswith(('tj ', 'uBlock ')):
+                key, value = line.split()
+                curve[key] = float(value)
+            elif line == '<\\LeitverlusteMesskurve>':
+                conduction.append(curve)
+            elif line == '<\\SchaltverlusteMesskurve>':
+                switching.append(curve)
+
+        conduction.sort(key=lambda curve: curve['tj'])
+        switching.sort(key=lambda curve: curve['tj'])
+        self.conduction_tj = np.array([curve['tj'] for curve in conduction])
+        # rows: voltage, current. Sorted by the current for the interpolation.
+        self.conduction_curves = [curve['data'][:, np.argsort(curve['data'][1])] for curve in conduction]
+        self.switching_tj = np.array([curve['tj'] for curve in switching])
+        self.switching_u_block = np.array([curve['uBlock'] for curve in switching])
+        # rows: current, turn-on energy, turn-off energy
+        self.switching_curves = [curve['data'][:, np.argsort(curve['data'][0])] for curve in switching]
+
+    def __repr__(self) -> str:
+        """
+        Return a short description of the loss file.
+
+        :return: description
+        :rtype: str
+        """
+        return f'SclFile({self.filepath!r}, conduction tj={self.conduction_tj.tolist()}, switching tj={self.switching_tj.tolist()})'
+
+    @staticmethod
+    def _interpolate_temperature(values: List[np.ndarray], temperatures: np.ndarray, tj: float) -> np.ndarray:
+        """
+        Interpolate linearly between the values of the two curves next to the junction temperature.
+
+        :param values: values of every curve, evaluated at the same points
+        :type values: List[np.ndarray]
+        :param temperatures: junction temperatures of the curves, ascending
+        :type temperatures: np.ndarray
+        :param tj: junction temperature
+        :type tj: float
+        :return: interpolated values
+        :rtype: np.ndarray
+        """
+        if len(temperatures) == 1 or tj <= temperatures[0]:
+            return values[0]
+        if tj >= temperatures[-1]:
+            return values[-1]
+        upper = int(np.searchsorted(temperatures, tj))
+        weight = (tj - temperatures[upper - 1]) / (temperatures[upper] - temperatures[upper - 1])
+        return (1 - weight) * values[upper - 1] + weight * values[upper]
+
+    def conduction_voltage(self, current: np.ndarray, tj: float = 25) -> np.ndarray:
+        """
+        Return the forward voltage of the switch for the given currents.
+
+        :param current: current through the switch
+        :type current: np.ndarray
+        :param tj: junction temperature in °C
+        :type tj: float
+        :raises Exception: if the file has no conduction curve
+        :return: forward voltage
+        :rtype: np.ndarray
+        """
+        if not self.conduction_curves:
+            raise Exception(f'{self.filepath} has no conduction curve')
+        voltages = [np.interp(current, curve[1], curve[0]) for curve in self.conduction_curves]
+        return self._interpolate_temperature(voltages, self.conduction_tj, tj)
+
+    def switching_energy(self, current: np.ndarray, voltage: np.ndarray, tj: float = 25) -> np.ndarray:
+        """
+        Return the turn-on and turn-off energy for the given switched currents and blocking voltages.
+
+        :param current: switched current
+        :type current: np.ndarray
+        :param voltage: blocking voltage before turn-on or after turn-off
+        :type voltage: np.ndarray
+        :param tj: junction temperature in °C
+        :type tj: float
+        :raises Exception: if the file has no switching curve
+        :return: energies of shape (2, number of currents), turn-on energy and turn-off energy
+        :rtype: np.ndarray
+        """
+        if not self.switching_curves:
+            raise Exception(f'{self.filepath} has no switching curve')
+        current = np.abs(np.asarray(current, dtype=np.float64))
+        voltage = np.abs(np.asarray(voltage, dtype=np.float64))
+        energies = [np.vstack([np.interp(current, curve[0], curve[1]), np.interp(current, curve[0], curve[2])]) * voltage / self.switching_u_block[index]
+                    for index, curve in enumerate(self.switching_curves)]
+        return self._interpolate_temperature(energies, self.switching_tj, tj)
+
+
+def read_scl_file(filepath: str) -> SclFile:
+    """
+    Read a .scl file, files with the same content are parsed only once per process.
+
+    :param filepath: path of the .scl file
+    :type filepath: str
+    :return: parsed loss file
+    :rtype: SclFile
+    """
+    with open(filepath, 'rb') as file:
+        key = hashlib.sha256(file.read()).hexdigest()
+    if key not in _scl_cache:
+        _scl_cache[key] = SclFile(filepath)
+    return _scl_cache[key]
+
+
+def calculate_switch_losses(time: np.ndarray, current: np.ndarray, voltage: np.ndarray, loss_files: Union[Dict[str, str], List[str]],
+                            tj: float = 25, blocking_threshold: float = None) -> Dict[str, Dict[str, float]]:
+    """
+    Evaluate the average conduction and switching losses of many devices for the waveforms of one simulation.
+
+    The switch is conducting while its voltage is below blocking_threshold. A turn-on is the transition from blocking to
+    conducting, its energy uses the current after and the voltage before the transition. A turn-off uses the current
+    before and the voltage after the transition. The conduction loss uses the forward voltage of the device instead of
+    the simulated voltage, so the simulation can be done with any (e.g. ideal) switch.
+
+    :param time: time vector
+    :type time: np.ndarray
+    :param current: current through the switch
+    :type current: np.ndarray
+    :param voltage: voltage across the switch
+    :type voltage: np.ndarray
+    :param loss_files: .scl files of the devices, as dict of device names to paths or as list of paths
+    :type loss_files: Dict[str, str] or List[str]
+    :param tj: junction temperature in °C
+    :type tj: float
+    :param blocking_threshold: voltage above which the switch blocks. Default None: 10 % of the maximum voltage
+    :type blocking_threshold: float
+    :return: dict of device names to dicts with the average losses 'conduction', 'turn_on', 'turn_off', 'switching'
+        and 'total' in W, sorted by the total losses
+    :rtype: Dict[str, Dict[str, float]]
+
+    :Example:
+
+    >>> import pygeckocircuits2 as pgc
+    >>> buck_converter = pgc.GeckoSimulation('path/to/gecko_file.ipes')
+    >>> buck_converter.run_simulation()
+    >>> time, signals = buck_converter.get_scope_arrays(['i_HS', 'v_HS'])
+    >>> losses = pgc.calculate_switch_losses(time, signals['i_HS'], signals['v_HS'], ['device_1.scl', 'device_2.scl'], tj=100)
+    """
+    loss_files = {path: path for path in loss_files} if isinstance(loss_files, list) else loss_files
+    time = np.asarray(time, dtype=np.float64)
+    current = np.asarray(current, dtype=np.float64)
+    voltage = np.asarray(voltage, dtype=np.float64)
+    duration = time[-1] - time[0]
+    blocking_threshold = 0.1 * np.abs(voltage).max() if blocking_threshold is None else blocking_threshold
+    blocking = np.abs(voltage) > blocking_threshold
+    turn_on = np.flatnonzero(blocking[:-1] & ~blocking[1:])
+    turn_off = np.flatnonzero(~blocking[:-1] & blocking[1:])
+    # the current flows only while the switch conducts
+    conducting_current = np.where(blocking, 0, current)
+    segment_time = np.diff(time)
+
+    losses = {}
+    for device, filepath in loss_files.items():
+        scl_file = read_scl_file(filepath)
+        power = scl_file.conduction_voltage(conducting_current, tj) * conducting_current
+        conduction = float(0.5 * np.sum((power[1:] + power[:-1]) * segment_time) / duration)
+        turn_on_energy = scl_file.switching_energy(current[turn_on + 1], voltage[turn_on], tj)[0].sum() if scl_file.switching_curves else 0
+        turn_off_energy = scl_file.switching_energy(current[turn_off], voltage[turn_off + 1], tj)[1].sum() if scl_file.switching_curves else 0
+        losses[device] = {'conduction': conduction, 'turn_on': float(turn_on_energy / duration), 'turn_off': float(turn_off_energy / duration)}
+        losses[device]['switching'] = losses[device]['turn_on'] + losses[device]['turn_off']
+        losses[device]['total'] = losses[device]['conduction'] + losses[device]['switching']
+        logger.debug(f'{device}: {losses[device]}')
+    return dict(sorted(losses.items(), key=lambda item: item[1]['total']))
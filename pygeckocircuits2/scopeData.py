@@ -0,0 +1,502 @@
+"""Write and process scope data, e.g. the chunks of GeckoSimulation.iter_scope_data()."""
+# python libraries
+import glob
+import json
+import os
+import struct
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+# 3rd party libraries
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# header size of .npy files written by NpyAppender. Large enough for any 1-D shape, a multiple of 64 as numpy recommends.
+_NPY_HEADER_SIZE = 128
+
+# file formats of write_scope_file() and their file extensions. 'npy' is a directory with one file per signal.
+SCOPE_FILE_FORMATS = {'npz': '.npz', 'npy': '', 'hdf5': '.h5', 'parquet': '.parquet'}
+
+# description of the signals, stored in every file of write_scope_file(): as 'scope.json' for npy, under this name otherwise
+_SCOPE_METADATA = 'pygeckocircuits2_scope'
+
+# methods of decimate_scope_data()
+DECIMATION_METHODS = ('minmax', 'lttb')
+
+
+class NpyAppender:
+    """
+    Write a 1-D .npy file piece by piece, without knowing the final length in advance.
+
+    The header is written with a fixed size and updated with the final length when the file is closed. The file can be
+    memory-mapped afterwards by np.load(file_name, mmap_mode='r').
+    """
+
+    file_name: str
+    dtype: np.dtype
+    length: int
+
+    def __init__(self, file_name: str, dtype: type) -> None:
+        """
+        Create the file and write a provisional header.
+
+        :param file_name: name of the .npy file
+        :type file_name: str
+        :param dtype: data type of the array
+        :type dtype: type
+        """
+        self.file_name = file_name
+        self.dtype = np.dtype(dtype)
+        self.length = 0
+        self._file = open(file_name, 'wb')
+        self._write_header()
+
+    def _write_header(self) -> None:
+        """Write the .npy header with the current length at the beginning of the file."""
+        header = repr({'descr': np.lib.format.dtype_to_descr(self.dtype), 'fortran_order': False, 'shape': (self.length,)})
+        # magic string, version 1.0, header length, header padded by spaces and terminated by a newline
+        header_length = _NPY_HEADER_SIZE - 10
+        self._file.seek(0)
+        self._file.write(b'\x93NUMPY\x01\x00' + struct.pack('<H', header_length) + header.ljust(header_length - 1).encode('latin-1') + b'\n')
+
+    def append(self, values: np.ndarray) -> None:
+        """
+        Append values to the end of the array.
+
+        :param values: values to append
+        :type values: np.ndarray
+        """
+        self._file.seek(0, os.SEEK_END)
+        self._file.write(np.ascontiguousarray(values, dtype=self.dtype).tobytes())
+        self.length += len(values)
+
+    def close(self) -> None:
+        """Write the final length to the header and close the file."""
+        self._write_header()
+        self._file.close()
+
+
+def write_scope_csv(chunks: Iterable[Tuple[np.ndarray, Dict[str, np.ndarray]]], file_name: str) -> int:
+    """
+    Write scope data chunk by chunk to a csv file in the format of GeckoSimulation.get_scope_data().
+
+    :param chunks: (time, dict of node names and signal arrays), e.g. from GeckoSimulation.iter_scope_data()
+    :type chunks: Iterable[Tuple[np.ndarray, Dict[str, np.ndarray]]]
+    :param file_name: name of the csv file, '.csv' is appended
+    :type file_name: str
+
+    :return: number of written points
+    :rtype: int
+    """
+    length = 0
+    with open(file_name + '.csv', 'w', encoding='utf-8') as file:
+        for time, signals in chunks:
+            if length == 0:
+                file.write(' '.join(['time'] + list(signals)) + '\n')
+            np.savetxt(file, np.column_stack([time] + list(signals.values())), fmt='%.17g', delimiter=' ')
+            length += len(time)
+    logger.debug(f'{length} points written to {file_name}.csv')
+    return length
+
+
+def write_scope_npy(chunks: Iterable[Tuple[np.ndarray, Dict[str, np.ndarray]]], directory: str, dtype: type = None) -> Dict[str, str]:
+    """
+    Write scope data chunk by chunk to one .npy file per signal, which can be memory-mapped afterwards.
+
+    :param chunks: (time, dict of node names and signal arrays), e.g. from GeckoSimulation.iter_scope_data()
+    :type chunks: Iterable[Tuple[np.ndarray, Dict[str, np.ndarray]]]
+    :param directory: directory of the .npy files, created if it does not exist. The time is written to 'time.npy'.
+    :type directory: str
+    :param dtype: data type of the signal files, e.g. np.float32. Defaults to the data type of the chunks. The time is always float64.
+    :type dtype: type
+
+    :return: dict of 'time' and node names to the written file names
+    :rtype: Dict[str, str]
+    """
+    os.makedirs(directory, exist_ok=True)
+    appenders = {}
+    try:
+        for time, signals in chunks:
+            if not appenders:
+                appenders['time'] = NpyAppender(os.path.join(directory, 'time.npy'), np.float64)
+                for node, values in signals.items():
+                    appenders[node] = NpyAppender(os.path.join(directory, f'{node}.npy'), values.dtype if dtype is None else dtype)
+            appenders['time'].append(time)
+            for node, values in signals.items():
+                appenders[node].append(values)
+    finally:
+        for appender in appenders.values():
+            appender.close()
+    return {name: appender.file_name for name, appender in appenders.items()}
+
+
+def _implicit_time_axis(time: np.ndarray) -> Optional[Tuple[float, float]]:
+    """
+    Return start and step of an equidistant time vector.
+
+    :param time: time vector
+    :type time: np.ndarray
+    :return: (start, step), None if the time steps differ by more than 0.1 % of the step
+    :rtype: Tuple[float, float]
+    """
+    if len(time) < 2:
+        return (float(time[0]) if len(time) else 0.0), 0.0
+    step = (time[-1] - time[0]) / (len(time) - 1)
+    if np.max(np.abs(time - (time[0] + step * np.arange(len(time))))) > 1e-3 * step:
+        return None
+    return float(time[0]), float(step)
+
+
+def write_scope_file(time: np.ndarray, signals: Dict[str, np.ndarray], file_name: str, file_format: str = 'npz', dtype: type = None,
+                     compress: bool = False, implicit_time: bool = False) -> str:
+    """
+    Write scope data to a binary file, which is much smaller and faster to read than a csv file. Read it by ScopeFile.
+
+    Formats:
+     * 'npz': single file, optionally compressed (zip deflate). Every signal can be loaded separately.
+     * 'npy': directory with one .npy file per signal, which can be memory-mapped. No compression.
+     * 'hdf5': single file, optionally compressed (gzip with shuffle filter). Needs h5py.
+     * 'parquet': single file with one column per signal, optionally compressed (zstd). Needs pyarrow.
+
+    With implicit_time, the time vector is not stored but only its start and step (time step x (skip_points + 1)). This
+    needs an equidistant time vector, otherwise the time vector is stored anyway and a warning is logged.
+
+    :param time: time vector
+    :type time: np.ndarray
+    :param signals: dict of node names and signal arrays
+    :type signals: Dict[str, np.ndarray]
+    :param file_name: name of the file without extension, see SCOPE_FILE_FORMATS for the appended extension
+    :type file_name: str
+    :param file_format: 'npz', 'npy', 'hdf5' or 'parquet'
+    :type file_format: str
+    :param dtype: data type of the signals, e.g. np.float32 to halve the size. Defaults to the data type of the arrays. The time is always float64.
+    :type dtype: type
+    :param compress: True for lossless compression
+    :type compress: bool
+    :param implicit_time: True to store start and step instead of the time vector
+    :type implicit_time: bool
+    :raises Exception: for an unknown file format or compression of the npy format
+    :raises ImportError: if h5py (hdf5) or pyarrow (parquet) is not installed
+    :return: name of the written file or directory
+    :rtype: str
+
+    :Example:
+
+    >>> import numpy as np
+    >>> import pygeckocircuits2 as pgc
+    >>> buck_converter = pgc.GeckoSimulation('path/to/gecko_file.ipes')
+    >>> buck_converter.run_simulation()
+    >>> time, signals = buck_converter.get_scope_arrays(['i_L', 'v_LS'], dtype=np.float32)
+    >>> pgc.write_scope_file(time, signals, 'scope_data', file_format='npy', implicit_time=True)
+    >>> i_L = pgc.ScopeFile('scope_data').signal('i_L')
+    """
+    if file_format not in SCOPE_FILE_FORMATS:
+        raise Exception(f'Unknown file format {file_format!r}, use one of {list(SCOPE_FILE_FORMATS)}')
+    if compress and file_format == 'npy':
+        raise Exception("The npy format can not be compressed, use 'npz', 'hdf5' or 'parquet'")
+    time = np.asarray(time, dtype=np.float64)
+    signals = {node: np.asarray(values, dtype=dtype) for node, values in signals.items()}
+    time_axis = _implicit_time_axis(time) if implicit_time else None
+    if implicit_time and time_axis is None:
+        logger.warning('The time vector is not equidistant, it is stored explicitly')
+    metadata = {'nodes': list(signals), 'length': len(time), 'start': time_axis[0] if time_axis else None,
+                'step': time_axis[1] if time_axis else None}
+    arrays = signals if time_axis else {'time': time, **signals}
+    path = file_name + SCOPE_FILE_FORMATS[file_format]
+
+    if file_format == 'npz':
+        save = np.savez_compressed if compress else np.savez
+        save(path, **{_SCOPE_METADATA: np.array(json.dumps(metadata))}, **arrays)
+    elif file_format == 'npy':
+        os.makedirs(path, exist_ok=True)
+        for name, values in arrays.items():
+            np.save(os.path.join(path, f'{name}.npy'), values)
+        with open(os.path.join(path, 'scope.json'), 'w', encoding='utf-8') as file:
+            json.dump(metadata, file)
+    elif file_format == 'hdf5':
+        import h5py
+        with h5py.File(path, 'w') as file:
+            file.attrs[_SCOPE_METADATA] = json.dumps(metadata)
+            for name, values in arrays.items():
+                file.create_dataset(name, data=values, compression='gzip' if compress else None, shuffle=compress)
+    else:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.table(arrays).replace_schema_metadata({_SCOPE_METADATA: json.dumps(metadata)})
+        pq.write_table(table, path, compression='zstd' if compress else 'none')
+    logger.debug(f'{len(time)} points of {len(signals)} signals written to {path}')
+    return path
+
+
+class ScopeFile:
+    """
+    Read scope data written by write_scope_file(), write_scope_npy(), write_scope_csv() or GeckoSimulation.get_scope_data().
+
+    Only the requested signals are read. Signals of the npy format are memory-mapped, so a single signal of a long
+    simulation can be evaluated without loading the file.
+    """
+
+    file_name: str
+    file_format: str
+    nodes: List[str]
+    length: int
+    start: Optional[float]
+    step: Optional[float]
+
+    def __init__(self, file_name: str) -> None:
+        """
+        Open the file and read the description of the signals.
+
+        :param file_name: name of the file or npy directory, with or without the extension of the format
+        :type file_name: str
+        :raises FileNotFoundError: if no file of a known format exists
+        """
+        extensions = {extension: file_format for file_format, extension in SCOPE_FILE_FORMATS.items() if extension}
+        extensions['.csv'] = 'csv'
+        paths = [path for path in [file_name] + [file_name + extension for extension in extensions] if os.path.exists(path)]
+        if not paths:
+            raise FileNotFoundError(f'No scope data file {file_name}')
+        self.file_name = paths[0]
+        self.file_format = 'npy' if os.path.isdir(self.file_name) else extensions.get(os.path.splitext(self.file_name)[1], 'csv')
+        metadata = self._read_metadata()
+        self.nodes = metadata['nodes']
+        self.length = metadata['length']
+        self.start = metadata['start']
+        self.step = metadata['step']
+
+    def _read_metadata(self) -> Dict:
+        """
+        Read the description of the signals, or derive it from the file content for files without description.
+
+        :return: dict with 'nodes', 'length', 'start' and 'step'
+        :rtype: Dict
+        """
+        if self.file_format == 'npy':
+            metadata_file = os.path.join(self.file_name, 'scope.json')
+            if os.path.exists(metadata_file):
+                with open(metadata_file, 'r', encoding='utf-8') as file:
+                    return json.load(file)
+            # directory of write_scope_npy()
+            nodes = sorted(os.path.splitext(os.path.basename(path))[0] for path in glob.glob(os.path.join(self.file_name, '*.npy')))
+            nodes.remove('time')
+            return {'nodes': nodes, 'length': len(np.load(os.path.join(self.file_name, 'time.npy'), mmap_mode='r')), 'start': None, 'step': None}
+        if self.file_format == 'npz':
+            with np.load(self.file_name) as data:
+                return json.loads(str(data[_SCOPE_METADATA]))
+        if self.file_format == 'hdf5':
+            import h5py
+            with h5py.File(self.file_name, 'r') as file:
+                return json.loads(file.attrs[_SCOPE_METADATA])
+        if self.file_format == 'parquet':
+            import pyarrow.parquet as pq
+            return json.loads(pq.read_schema(self.file_name).metadata[_SCOPE_METADATA.encode()])
+        with open(self.file_name, 'r', encoding='utf-8') as file:
+            nodes = file.readline().split()[1:]
+            length = sum(1 for _ in file)
+        return {'nodes': nodes, 'length': length, 'start': None, 'step': None}
+
+    def __repr__(self) -> str:
+        """
+        Return a short description of the file.
+
+        :return: description
+        :rtype: str
+        """
+        return f'ScopeFile({self.file_name!r}, format={self.file_format}, nodes={self.nodes}, length={self.length})'
+
+    def _read_array(self, name: str, mmap_mode: Optional[str]) -> np.ndarray:
+        """
+        Read a single stored array.
+
+        :param name: node name or 'time'
+        :type name: str
+        :param mmap_mode: memory-map mode of np.load() for the npy format
+        :type mmap_mode: str
+        :return: values
+        :rtype: np.ndarray
+        """
+        if self.file_format == 'npy':
+            return np.load(os.path.join(self.file_name, f'{name}.npy'), mmap_mode=mmap_mode)
+        if self.file_format == 'npz':
+            with np.load(self.file_name) as data:
+                return data[name]
+        if self.file_format == 'hdf5':
+            import h5py
+            with h5py.File(self.file_name, 'r') as file:
+                return file[name][()]
+        if self.file_format == 'parquet':
+            import pyarrow.parquet as pq
+            return pq.read_table(self.file_name, columns=[name]).column(name).to_numpy()
+        import pandas as pd
+        return pd.read_csv(self.file_name, sep=' ', usecols=[name])[name].to_numpy()
+
+    def signal(self, node: str, mmap_mode: Optional[str] = 'r') -> np.ndarray:
+        """
+        Read the values of a single signal.
+
+        :param node: node name
+        :type node: str
+        :param mmap_mode: memory-map mode of np.load() for the npy format, e.g. 'r' (default) or None to load into memory
+        :type mmap_mode: str
+        :raises KeyError: if the node is not part of the file
+        :return: values of the signal
+        :rtype: np.ndarray
+        """
+        if node not in self.nodes:
+            raise KeyError(f'{node} is not part of {self.file_name}, available: {self.nodes}')
+        return self._read_array(node, mmap_mode)
+
+    def time(self) -> np.ndarray:
+        """
+        Return the time vector, calculated from start and step for files with implicit time.
+
+        :return: time vector
+        :rtype: np.ndarray
+        """
+        if self.step is not None:
+            return self.start + self.step * np.arange(self.length)
+        return self._read_array('time', None)
+
+    def read(self, nodes: Optional[List[str]] = None) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Read the time vector and signals, in the format of GeckoSimulation.get_scope_arrays().
+
+        :param nodes: node names. Default None: all nodes of the file
+        :type nodes: List[str]
+        :return: time, dict of node names and signal arrays
+        :rtype: Tuple[np.ndarray, Dict[str, np.ndarray]]
+        """
+        nodes = self.nodes if nodes is None else nodes
+        return self.time(), {node: self.signal(node) for node in nodes}
+
+
+def _minmax_indices(data: np.ndarray, bucket_size: int) -> np.ndarray:
+    """
+    Return the indices of the minimum and maximum of every bucket, in the order of their occurrence.
+
+    :param data: signals, shape (nodes, n). A last incomplete bucket is padded with the last value.
+    :type data: np.ndarray
+    :param bucket_size: number of points per bucket
+    :type bucket_size: int
+    :return: indices, shape (nodes, 2 x number of buckets)
+    :rtype: np.ndarray
+    """
+    length = data.shape[1]
+    if bucket_size <= 2:
+        # minimum and maximum are all points of the bucket
+        return np.tile(np.arange(length), (data.shape[0], 1))
+    buckets = -(-length // bucket_size)
+    if buckets * bucket_size != length:
+        data = np.pad(data, ((0, 0), (0, buckets * bucket_size - length)), mode='edge')
+    data = data.reshape(data.shape[0], buckets, bucket_size)
+    offsets = np.arange(buckets) * bucket_size
+    indices = np.stack([np.argmin(data, axis=2) + offsets, np.argmax(data, axis=2) + offsets], axis=2)
+    # the padded points repeat the last point
+    return np.minimum(np.sort(indices, axis=2).reshape(data.shape[0], -1), length - 1)
+
+
+def _lttb(time: np.ndarray, data: np.ndarray, points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Select points by largest-triangle-three-buckets, for all rows at once.
+
+    The first and the last point are kept. In between, every bucket contributes the point which forms the largest triangle
+    with the point selected in the previous bucket and the average of the next bucket.
+
+    :param time: time of every row, shape (nodes, n)
+    :type time: np.ndarray
+    :param data: signals, shape (nodes, n)
+    :type data: np.ndarray
+    :param points: number of points per row, at least 3
+    :type points: int
+    :return: time and values of the selected points, shape (nodes, points)
+    :rtype: Tuple[np.ndarray, np.ndarray]
+    """
+    length = data.shape[1]
+    edges = np.linspace(1, length - 1, points - 1).astype(np.int64)
+    rows = np.arange(data.shape[0])
+    selected = np.zeros((data.shape[0], points), dtype=np.int64)
+    selected[:, -1] = length - 1
+    for bucket in range(points - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        next_stop = edges[bucket + 2] if bucket + 2 < len(edges) else length
+        next_time = time[:, stop:next_stop].mean(axis=1, keepdims=True)
+        next_value = data[:, stop:next_stop].mean(axis=1, keepdims=True)
+        previous_time = time[rows, selected[:, bucket]][:, np.newaxis]
+        previous_value = data[rows, selected[:, bucket]][:, np.newaxis]
+        # twice the triangle area, by the cross product of two edges
+        cross_1 = (previous_time - next_time) * (data[:, start:stop] - previous_value)
+        cross_2 = (previous_time - time[:, start:stop]) * (next_value - previous_value)
+        area = np.abs(cross_1 - cross_2)
+        selected[:, bucket + 1] = start + np.argmax(area, axis=1)
+    return np.take_along_axis(time, selected, axis=1), np.take_along_axis(data, selected, axis=1)
+
+
+def decimate_scope_data(chunks: Iterable[Tuple[np.ndarray, Dict[str, np.ndarray]]], points: int, length: int,
+                        method: str = 'minmax') -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """
+    Reduce long signals to about the given number of points per signal, keeping the peaks, e.g. for previews in dashboards.
+
+    Methods:
+     * 'minmax': the signal is split into points / 2 buckets of equal length, the minimum and the maximum of every bucket
+       are kept. All extreme values of the signal are preserved, so max/min checks on the result are exact.
+     * 'lttb': largest-triangle-three-buckets, which follows the visual shape of the signal more closely. The signal is
+       reduced to 4 x points by 'minmax' first, then by LTTB to points.
+
+    The chunks are processed one after another, so the memory is bounded by the chunk size. Every bucket is evaluated
+    vectorized for all signals at once. Unlike skip_points, no switching spike is dropped.
+
+    :param chunks: (time, dict of node names and signal arrays), e.g. from GeckoSimulation.iter_scope_data(), or a single
+        tuple in a list, e.g. [GeckoSimulation.get_scope_arrays(...)]
+    :type chunks: Iterable[Tuple[np.ndarray, Dict[str, np.ndarray]]]
+    :param points: target number of points per signal
+    :type points: int
+    :param length: number of points of all chunks together, an estimate is sufficient. Defines the bucket length.
+    :type length: int
+    :param method: 'minmax' or 'lttb'
+    :type method: str
+    :raises Exception: for an unknown method
+    :return: dict of node names to (time, values) of the kept points. The times differ from signal to signal.
+    :rtype: Dict[str, Tuple[np.ndarray, np.ndarray]]
+
+    :Example:
+
+    >>> import pygeckocircuits2 as pgc
+    >>> buck_converter = pgc.GeckoSimulation('path/to/gecko_file.ipes')
+    >>> buck_converter.run_simulation()
+    >>> time, signals = buck_converter.get_scope_arrays(['i_L', 'v_LS'])
+    >>> preview = pgc.decimate_scope_data([(time, signals)], points=5000, length=len(time))
+    >>> preview_time, preview_i_L = preview['i_L']
+    """
+    if method not in DECIMATION_METHODS:
+        raise Exception(f'Unknown decimation method {method!r}, use one of {DECIMATION_METHODS}')
+    minmax_points = points if method == 'minmax' else 4 * points
+    bucket_size = max(1, -(-length // max(1, minmax_points // 2)))
+    nodes = None
+    carry_time = np.empty(0)
+    carry = None
+    kept_time = []
+    kept = []
+    for time, signals in chunks:
+        if nodes is None:
+            nodes = list(signals)
+            carry = np.empty((len(nodes), 0))
+        time = np.concatenate([carry_time, time])
+        data = np.hstack([carry, np.vstack([signals[node] for node in nodes])])
+        complete = len(time) // bucket_size * bucket_size
+        if complete:
+            indices = _minmax_indices(data[:, :complete], bucket_size)
+            kept_time.append(time[indices])
+            kept.append(np.take_along_axis(data, indices, axis=1))
+        carry_time, carry = time[complete:], data[:, complete:]
+    if nodes is None:
+        return {}
+    if carry.shape[1]:
+        indices = _minmax_indices(carry, bucket_size)
+        kept_time.append(carry_time[indices])
+        kept.append(np.take_along_axis(carry, indices, axis=1))
+    time = np.hstack(kept_time) if kept_time else np.empty((len(nodes), 0))
+    data = np.hstack(kept) if kept else np.empty((len(nodes), 0))
+    if method == 'lttb' and data.shape[1] > max(points, 2):
+        time, data = _lttb(time, data, max(points, 3))
+    return {node: (time[row], data[row]) for row, node in enumerate(nodes)}
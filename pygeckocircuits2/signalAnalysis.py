@@ -0,0 +1,377 @@
+"""Vectorized analysis of scope signals (mean, rms, max, min, ripple, THD, shape) in python."""
+# python libraries
+from typing import Union, List, Dict, Tuple, TYPE_CHECKING
+import logging
+
+# 3rd party libraries
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# operations supported by GeckoSimulation.get_values()
+OPERATIONS = ('mean', 'rms', 'max', 'min', 'ripple', 'thd', 'shape')
+
+
+def _integrate(time: np.ndarray, data: np.ndarray) -> np.ndarray:
+    """
+    Integrate every row of data over time by the trapezoidal rule. Also non-uniform timesteps are integrated correctly.
+
+    :param time: time vector, length n
+    :type time: np.ndarray
+    :param data: signals, shape (nodes, n)
+    :type data: np.ndarray
+    :return: integral of every signal, length nodes
+    :rtype: np.ndarray
+    """
+    return 0.5 * ((data[:, 1:] + data[:, :-1]) @ np.diff(time))
+
+
+def _thd(data: np.ndarray) -> np.ndarray:
+    """
+    Calculate the total harmonic distortion of every row of data.
+
+    The fundamental is the strongest non-DC frequency, so the analyzed range may contain any integer number of periods.
+    THD is the ratio of the rms value of all harmonics (integer multiples of the fundamental) to the fundamental.
+
+    :param data: signals on a uniform time grid, shape (nodes, n)
+    :type data: np.ndarray
+    :return: THD of every signal, length nodes
+    :rtype: np.ndarray
+    """
+    amplitudes = np.abs(np.fft.rfft(data - data.mean(axis=1, keepdims=True), axis=1))
+    thd = np.full(data.shape[0], np.nan)
+    if amplitudes.shape[1] < 2:
+        return thd
+    fundamental_bins = np.argmax(amplitudes[:, 1:], axis=1) + 1
+    for row, fundamental_bin in enumerate(fundamental_bins):
+        fundamental = amplitudes[row, fundamental_bin]
+        if fundamental > 0:
+            harmonics = amplitudes[row, 2 * fundamental_bin::fundamental_bin]
+            thd[row] = np.sqrt(np.sum(harmonics ** 2)) / fundamental
+    return thd
+
+
+def calculate_values(time: np.ndarray, signals: Dict[str, np.ndarray], operations: Union[List, str]) -> Dict:
+    """
+    Calculate the given operations for all signals in one vectorized pass.
+
+    The result has the same structure as GeckoSimulation.get_values(). Definitions:
+     * mean: time average by the trapezoidal rule
+     * rms: square root of the time average of the squared signal
+     * max, min: maximum and minimum value
+     * ripple: peak-to-peak value max - min
+     * thd: total harmonic distortion, the fundamental is the strongest non-DC frequency within the range
+     * shape: form factor rms / abs(mean)
+
+    :param time: time vector, shared by all signals
+    :type time: np.ndarray
+    :param signals: dict of node names and signal arrays, e.g. from GeckoSimulation.get_scope_arrays()
+    :type signals: Dict[str, np.ndarray]
+    :param operations: Mean/RMS/THD/Ripple/Max/Min/Shape operations on the signals. Multiple operations can be provided as a list
+    :type operations: List or str
+    :raises Exception: in case of an invalid operation
+
+    :return: operation specific dict data, e.g. {'mean': {'signal_1': mean_signal_1}, 'rms': {'signal_1': rms_signal_1}}
+    :rtype: Dict
+    """
+    operations = [operations] if isinstance(operations, str) else operations
+    for operation_key in operations:
+        if operation_key.lower() not in OPERATIONS:
+            raise Exception('Invalid operator: ' + operation_key)
+    requested = {operation_key.lower() for operation_key in operations}
+    nodes = list(signals)
+    if not nodes or len(time) < 2:
+        return {operation_key: {} for operation_key in operations}
+
+    data = np.vstack([signals[node] for node in nodes]).astype(np.float64, copy=False)
+    duration = time[-1] - time[0]
+    results = {}
+    if requested & {'mean', 'shape'}:
+        results['mean'] = _integrate(time, data) / duration
+    if requested & {'rms', 'shape'}:
+        results['rms'] = np.sqrt(_integrate(time, data * data) / duration)
+    if requested & {'max', 'ripple'}:
+        results['max'] = data.max(axis=1)
+    if requested & {'min', 'ripple'}:
+        results['min'] = data.min(axis=1)
+    if 'ripple' in requested:
+        results['ripple'] = results['max'] - results['min']
+    if 'shape' in requested:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            results['shape'] = results['rms'] / np.abs(results['mean'])
+    if 'thd' in requested:
+        results['thd'] = _thd(data)
+
+    values = {}
+    for operation_key in operations:
+        values[operation_key] = {node: float(results[operation_key.lower()][row]) for row, node in enumerate(nodes)}
+        logger.debug(f'{operation_key}: {values[operation_key]}')
+    return values
+
+
+def fourier_coefficients(time: np.ndarray, signals: Dict[str, np.ndarray], fundamental: float,
+                         periods: int = None) -> Tuple[np.ndarray, Dict[str, np.ndarray], int]:
+    """
+    Calculate the complex Fourier coefficients of all signals over an integer number of periods by a single batched FFT.
+
+    The analyzed window is the last periods periods of the data. If the data points do not fit the window exactly, e.g.
+    for a variable time step or a period which is no multiple of the time step, the signals are resampled linearly to a
+    uniform grid within the window. So the fundamental and its harmonics fall exactly on FFT bins, without leakage.
+
+    :param time: time vector, shared by all signals
+    :type time: np.ndarray
+    :param signals: dict of node names and signal arrays, e.g. from GeckoSimulation.get_scope_arrays()
+    :type signals: Dict[str, np.ndarray]
+    :param fundamental: fundamental frequency in Hz, e.g. the switching frequency
+    :type fundamental: float
+    :param periods: number of periods to analyze. Default None: all complete periods of the data
+    :type periods: int
+    :raises Exception: if the data does not contain the requested number of periods, or not a single one
+    :return: frequencies of the bins (spacing fundamental / periods), dict of node names to the coefficients
+        (peak amplitude and phase of the cosine at every frequency, the mean value at 0 Hz) and the number of periods.
+        The phases refer to time 0 of the time vector, so they do not depend on the position of the window.
+    :rtype: Tuple[np.ndarray, Dict[str, np.ndarray], int]
+    """
+    time = np.asarray(time, dtype=np.float64)
+    period = 1 / fundamental
+    # small tolerance, so data of exactly n periods gives n periods despite rounding errors
+    available = int(np.floor((time[-1] - time[0]) / period + 1e-6)) if len(time) > 1 else 0
+    periods = available if periods is None else periods
+    if periods < 1 or periods > available:
+        raise Exception(f'{periods} periods of {period} s requested, the data contains {available} complete periods')
+    duration = periods * period
+    start = time[-1] - duration
+    dt = np.median(np.diff(time))
+    samples = max(int(round(duration / dt)), 2)
+    data = np.vstack([signals[node] for node in signals]).astype(np.float64, copy=False)
+    first = int(np.searchsorted(time, start - 1e-3 * dt))
+    window_time = time[first:first + samples]
+    grid = start + np.arange(samples) * (duration / samples)
+    if len(window_time) == samples and np.max(np.abs(window_time - grid)) < 1e-3 * dt:
+        data = data[:, first:first + samples]
+    else:
+        logger.debug(f'Resample {len(signals)} signals to {samples} points')
+        data = np.vstack([np.interp(grid, time, row) for row in data])
+
+    coefficients = np.fft.rfft(data, axis=1) / samples
+    coefficients[:, 1:] *= 2
+    if samples % 2 == 0:
+        # the Nyquist bin has no negative frequency counterpart
+        coefficients[:, -1] /= 2
+    frequencies = np.arange(coefficients.shape[1]) / duration
+    # shift the phase reference from the start of the window to time 0
+    coefficients *= np.exp(-2j * np.pi * frequencies * start)
+    return frequencies, {node: coefficients[row] for row, node in enumerate(signals)}, periods
+
+
+def harmonic_spectrum(coefficients: Dict[str, np.ndarray], fundamental: float, periods: int, harmonics: int = 50,
+                      bands: List[Tuple[float, float]] = None) -> Dict:
+    """
+    Evaluate the Fourier coefficients of fourier_coefficients(): harmonic amplitudes and phases, THD and power per frequency band.
+
+    :param coefficients: dict of node names to the coefficients of fourier_coefficients()
+    :type coefficients: Dict[str, np.ndarray]
+    :param fundamental: fundamental frequency in Hz
+    :type fundamental: float
+    :param periods: number of analyzed periods, as returned by fourier_coefficients()
+    :type periods: int
+    :param harmonics: highest harmonic order of the amplitudes and phases
+    :type harmonics: int
+    :param bands: frequency bands as (lower, upper) frequency in Hz, the upper frequency is excluded. Default None: no bands
+    :type bands: List[Tuple[float, float]]
+    :return: dict with
+        'frequencies' of the harmonic orders 0 (mean value) to harmonics,
+        'amplitude' and 'phase' (rad) by node, arrays over the harmonic orders (NaN above the Nyquist frequency),
+        'thd' by node, the rms of all harmonics up to the Nyquist frequency relative to the fundamental,
+        'band_power' by node, the mean square value of the signal components within every band (power into 1 Ω)
+    :rtype: Dict
+    """
+    nodes = list(coefficients)
+    data = np.vstack([coefficients[node] for node in nodes]) if nodes else np.empty((0, 1), dtype=complex)
+    bin_frequencies = np.arange(data.shape[1]) * fundamental / periods
+    orders = np.arange(harmonics + 1)
+    bins = orders * periods
+    valid = bins < data.shape[1]
+    amplitude = np.full((len(nodes), len(orders)), np.nan)
+    phase = np.full((len(nodes), len(orders)), np.nan)
+    amplitude[:, valid] = np.abs(data[:, bins[valid]])
+    phase[:, valid] = np.angle(data[:, bins[valid]])
+
+    # mean square value of every bin: squared mean value at 0 Hz, half the squared peak amplitude otherwise
+    power = np.abs(data) ** 2
+    power[:, 1:] /= 2
+    harmonic_bins = np.arange(2 * periods, data.shape[1], periods)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        thd = np.sqrt(power[:, harmonic_bins].sum(axis=1)) / np.sqrt(power[:, periods]) if data.shape[1] > periods else np.full(len(nodes), np.nan)
+    band_power = np.array([power[:, (bin_frequencies >= lower) & (bin_frequencies < upper)].sum(axis=1) for lower, upper in bands or []]).T
+
+    return {'frequencies': orders * fundamental,
+            'amplitude': {node: amplitude[row] for row, node in enumerate(nodes)},
+            'phase': {node: phase[row] for row, node in enumerate(nodes)},
+            'thd': {node: float(thd[row]) for row, node in enumerate(nodes)},
+            'band_power': {node: band_power[row] if bands else np.empty(0) for row, node in enumerate(nodes)}}
+
+
+def calculate_spectrum(time: np.ndarray, signals: Dict[str, np.ndarray], fundamental: float, periods: int = None, harmonics: int = 50,
+                       bands: List[Tuple[float, float]] = None) -> Dict:
+    """
+    Calculate the harmonic spectrum of all signals, see fourier_coefficients() and harmonic_spectrum().
+
+    :param time: time vector, shared by all signals
+    :type time: np.ndarray
+    :param signals: dict of node names and signal arrays, e.g. from GeckoSimulation.get_scope_arrays()
+    :type signals: Dict[str, np.ndarray]
+    :param fundamental: fundamental frequency in Hz
+    :type fundamental: float
+    :param periods: number of periods to analyze, at the end of the data. Default None: all complete periods
+    :type periods: int
+    :param harmonics: highest harmonic order of the amplitudes and phases
+    :type harmonics: int
+    :param bands: frequency bands as (lower, upper) frequency in Hz
+    :type bands: List[Tuple[float, float]]
+    :return: result of harmonic_spectrum(), with the number of analyzed 'periods'
+    :rtype: Dict
+
+    :Example:
+
+    >>> import pygeckocircuits2 as pgc
+    >>> buck_converter = pgc.GeckoSimulation('path/to/gecko_file.ipes')
+    >>> buck_converter.run_simulation()
+    >>> time, signals = buck_converter.get_scope_arrays(['i_L', 'v_LS'])
+    >>> spectrum = pgc.calculate_spectrum(time, signals, fundamental=200e3, harmonics=20, bands=[(150e3, 30e6)])
+    >>> spectrum['amplitude']['i_L'][1], spectrum['thd']['v_LS']
+    """
+    _, coefficients, periods = fourier_coefficients(time, signals, fundamental, periods)
+    return {**harmonic_spectrum(coefficients, fundamental, periods, harmonics, bands), 'periods': periods}
+
+
+def period_windows(start_time: float, stop_time: float, period: float) -> np.ndarray:
+    """
+    Split a time range into windows of one period each. A remaining incomplete period at the end is dropped.
+
+    :param start_time: start of the first window
+    :type start_time: float
+    :param stop_time: end of the time range
+    :type stop_time: float
+    :param period: length of a window, e.g. the switching period 1 / f_s
+    :type period: float
+    :return: windows as array of shape (number of windows, 2) with start and stop time
+    :rtype: np.ndarray
+    """
+    # small tolerance, so a range of exactly n periods gives n windows despite rounding errors
+    number_of_windows = int(np.floor((stop_time - start_time) / period + 1e-9))
+    starts = start_time + period * np.arange(number_of_windows)
+    return np.column_stack([starts, starts + period])
+
+
+def edge_windows(time: np.ndarray, signal: np.ndarray, threshold: float = None) -> np.ndarray:
+    """
+    Find the rising edges of a signal, e.g. a gate signal, and return the windows between two consecutive edges.
+
+    :param time: time vector
+    :type time: np.ndarray
+    :param signal: signal with edges, e.g. a gate signal
+    :type signal: np.ndarray
+    :param threshold: level of the edge detection. Default None: middle between minimum and maximum of the signal
+    :type threshold: float
+    :return: windows as array of shape (number of windows, 2) with start and stop time
+    :rtype: np.ndarray
+    """
+    threshold = (signal.max() + signal.min()) / 2 if threshold is None else threshold
+    above = signal > threshold
+    edges = time[1:][above[1:] & ~above[:-1]]
+    return np.column_stack([edges[:-1], edges[1:]])
+
+
+def calculate_window_values(time: np.ndarray, signals: Dict[str, np.ndarray], windows: np.ndarray, operations: Union[List, str]) -> np.ndarray:
+    """
+    Calculate the given operations for all signals over many time windows in one vectorized pass.
+
+    The operations are defined as in calculate_values(). Window boundaries are rounded to the data points inside the
+    window. Mean and rms use cumulative sums of the trapezoidal integral, max and min use np.maximum.reduceat() and
+    np.minimum.reduceat(), so the effort is independent of the number of windows, except for THD.
+
+    :param time: time vector, shared by all signals
+    :type time: np.ndarray
+    :param signals: dict of node names and signal arrays, e.g. from GeckoSimulation.get_scope_arrays()
+    :type signals: Dict[str, np.ndarray]
+    :param windows: start and stop times, shape (number of windows, 2), e.g. from period_windows()
+    :type windows: np.ndarray
+    :param operations: Mean/RMS/THD/Ripple/Max/Min/Shape operations on the signals. Multiple operations can be provided as a list
+    :type operations: List or str
+    :raises Exception: in case of an invalid operation or a window without two data points
+    :return: values of shape (number of windows, number of nodes, number of operations), in the order of signals and operations
+    :rtype: np.ndarray
+    """
+    operations = [operations] if isinstance(operations, str) else operations
+    for operation_key in operations:
+        if operation_key.lower() not in OPERATIONS:
+            raise Exception('Invalid operator: ' + operation_key)
+    requested = {operation_key.lower() for operation_key in operations}
+    windows = np.asarray(windows, dtype=np.float64).reshape(-1, 2)
+    data = np.vstack([signals[node] for node in signals]).astype(np.float64, copy=False)
+    start_index = np.searchsorted(time, windows[:, 0], side='left')
+    stop_index = np.searchsorted(time, windows[:, 1], side='right') - 1
+    if np.any(stop_index - start_index < 1):
+        raise Exception('Every window needs at least two data points')
+
+    results = {}
+    duration = time[stop_index] - time[start_index]
+    if requested & {'mean', 'shape', 'rms'}:
+        # cumulative trapezoidal integral, starting with 0 at the first data point
+        segment_time = np.diff(time)
+        if requested & {'mean', 'shape'}:
+            integral = np.zeros_like(data)
+            np.cumsum(0.5 * (data[:, 1:] + data[:, :-1]) * segment_time, axis=1, out=integral[:, 1:])
+            results['mean'] = ((integral[:, stop_index] - integral[:, start_index]) / duration).T
+        if requested & {'rms', 'shape'}:
+            squared = data * data
+            integral = np.zeros_like(data)
+            np.cumsum(0.5 * (squared[:, 1:] + squared[:, :-1]) * segment_time, axis=1, out=integral[:, 1:])
+            results['rms'] = np.sqrt(np.maximum((integral[:, stop_index] - integral[:, start_index]) / duration, 0)).T
+    if requested & {'max', 'min', 'ripple'}:
+        # reduceat over [start, stop + 1) of every window, the results between the windows are dropped. An additional
+        # column allows stop + 1 to point behind the last data point.
+        padded = np.concatenate([data, data[:, -1:]], axis=1)
+        indices = np.column_stack([start_index, stop_index + 1]).ravel()
+        results['max'] = np.maximum.reduceat(padded, indices, axis=1)[:, ::2].T
+        results['min'] = np.minimum.reduceat(padded, indices, axis=1)[:, ::2].T
+    if 'ripple' in requested:
+        results['ripple'] = results['max'] - results['min']
+    if 'shape' in requested:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            results['shape'] = results['rms'] / np.abs(results['mean'])
+    if 'thd' in requested:
+        results['thd'] = np.array([_thd(data[:, start:stop + 1]) for start, stop in np.column_stack([start_index, stop_index])])
+
+    return np.stack([results[operation_key.lower()] for operation_key in operations], axis=2)
+
+
+def window_values_to_dataframe(values: np.ndarray, windows: np.ndarray, nodes: List[str], operations: List[str]) -> 'pd.DataFrame':
+    """
+    Convert the result of calculate_window_values() to a tidy DataFrame with one row per window, node and operation.
+
+    :param values: result of calculate_window_values(), shape (number of windows, number of nodes, number of operations)
+    :type values: np.ndarray
+    :param windows: start and stop times of the windows, shape (number of windows, 2)
+    :type windows: np.ndarray
+    :param nodes: node names in the order of the values
+    :type nodes: List[str]
+    :param operations: operations in the order of the values
+    :type operations: List[str]
+    :return: DataFrame with the columns 'window', 'start', 'stop', 'node', 'operation' and 'value'
+    :rtype: pd.DataFrame
+    """
+    import pandas as pd
+    windows = np.asarray(windows, dtype=np.float64).reshape(-1, 2)
+    number_of_windows, number_of_nodes, number_of_operations = values.shape
+    window_index = np.repeat(np.arange(number_of_windows), number_of_nodes * number_of_operations)
+    return pd.DataFrame({'window': window_index,
+                         'start': windows[window_index, 0],
+                         'stop': windows[window_index, 1],
+                         'node': np.tile(np.repeat(np.asarray(nodes, dtype=object), number_of_operations), number_of_windows),
+                         'operation': np.tile(np.asarray(operations, dtype=object), number_of_windows * number_of_nodes),
+                         'value': values.ravel()})